@@ -0,0 +1,111 @@
+"""
+Benchmark for the FBDI journal builder and writer in prototype.py.
+
+Builds --lines correction lines from synthetic Mismatch / Missing in GTAS
+exceptions and times build_fbdi_journal and the FbdiWriter output as plain CSV,
+gzip and zip. The legacy iterrows builder is kept here as the reference: its
+output is compared against the vectorized builder on --reference-rows lines and
+its time there is extrapolated to --lines.
+
+Usage:
+    python benchmarks/bench_fbdi.py [--lines 1000000] [--reference-rows 20000] [--workdir /tmp/fedreconcile-bench]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'backend', 'python'))
+
+from prototype import FbdiWriter, build_fbdi_journal, write_fbdi_journal  # noqa: E402
+
+
+def build_fbdi_journal_rowwise(exceptions_df):
+    """The original per-row builder, used as the parity reference."""
+    if exceptions_df.empty:
+        return pd.DataFrame()
+    corrections_df = exceptions_df[exceptions_df['STATUS'].isin(['Mismatch', 'Missing in GTAS'])].copy()
+    if corrections_df.empty:
+        return pd.DataFrame()
+
+    fbdi_data = []
+    for index, row in corrections_df.iterrows():
+        correction_amount = -row['DIFFERENCE']
+        fbdi_data.append({
+            'STATUS_CODE': 'NEW',
+            'LEDGER_ID': 1,
+            'EFFECTIVE_DATE': '2025-06-30',
+            'JOURNAL_SOURCE': 'FedReconcile',
+            'JOURNAL_CATEGORY': 'Reconciliation',
+            'CURRENCY_CODE': 'USD',
+            'JOURNAL_ENTRY_CREATION_DATE': datetime.now().strftime('%Y-%m-%d'),
+            'ACTUAL_FLAG': 'A',
+            'SEGMENT1': '101',
+            'SEGMENT2': 'Finance',
+            'SEGMENT3': str(row['USSGL_ACCOUNT']),
+            'SEGMENT4': str(row.get('FUND', '')),
+            'SEGMENT5': str(row['TAS']),
+            'ENTERED_DEBIT_AMOUNT': max(0, correction_amount),
+            'ENTERED_CREDIT_AMOUNT': max(0, -correction_amount),
+            'REFERENCE_COLUMN_1': 'FedReconcile Correction',
+            'REFERENCE_COLUMN_2': f"Correcting {row['STATUS']}" + (f" ({row['GTAS_FATAL_ERROR']})" if row['GTAS_FATAL_ERROR'] else '')
+        })
+    return pd.DataFrame(fbdi_data)
+
+
+def make_exceptions(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    tas = np.array([f"0{i % 97:02d}{'X' if i % 11 == 0 else ''}{i:06d}" for i in range(max(1, rows // 50))])
+    return pd.DataFrame({
+        'TAS': pd.Categorical(rng.choice(tas, rows)),
+        'USSGL_ACCOUNT': pd.Categorical(rng.choice(['101000', '210100', '445000', '480100'], rows)),
+        'FUND': pd.Categorical(rng.choice([f'F{i:03d}' for i in range(40)], rows)),
+        'DIFFERENCE': np.round(rng.normal(0, 1e4, rows), 2),
+        'STATUS': rng.choice(np.array(['Mismatch', 'Missing in GTAS'], dtype=object), rows),
+        'GTAS_FATAL_ERROR': rng.choice(np.array(['', '', '', 'Canceled TAS must have 0 balance for USSGL 101000'],
+                                                dtype=object), rows),
+    })
+
+
+def timed(label, fn, lines):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f} s  {lines / elapsed:12,.0f} lines/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--reference-rows', type=int, default=20_000)
+    parser.add_argument('--workdir', default='/tmp/fedreconcile-bench')
+    args = parser.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+
+    sample = make_exceptions(args.reference_rows, seed=1)
+    start = time.perf_counter()
+    expected = build_fbdi_journal_rowwise(sample)
+    reference_seconds = time.perf_counter() - start
+    pd.testing.assert_frame_equal(build_fbdi_journal(sample), expected, check_dtype=False)
+    print(f"parity ok on {args.reference_rows:,} lines; iterrows builder at {args.lines:,} lines "
+          f"~{reference_seconds * args.lines / args.reference_rows:.1f} s (extrapolated)")
+
+    exceptions = make_exceptions(args.lines)
+    timed('build_fbdi_journal', lambda: build_fbdi_journal(exceptions), args.lines)
+    for name in ('fbdi.csv', 'fbdi.csv.gz', 'fbdi.zip'):
+        path = os.path.join(args.workdir, name)
+
+        def write():
+            with FbdiWriter(path) as writer:
+                return write_fbdi_journal(exceptions, writer)
+        written = timed(f'build + write {name}', write, args.lines)
+        print(f"{'':<28} {written:,} lines, {os.path.getsize(path) / 1024 ** 2:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Ingest benchmark for the typed trial balance loaders.
+
+Writes one synthetic ERP trial balance (with a few extra columns that the
+loaders project away) as CSV, Parquet and Feather. It then compares an untyped
+pd.read_csv with loaders.read_trial_balance on each format, reporting load time
+and in-memory size.
+
+Usage:
+    python benchmarks/bench_loaders.py [--rows 2000000] [--workdir /tmp/fedreconcile-bench]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'gcf_gtas_validator'))
+
+from loaders import ERP_SCHEMA, read_trial_balance  # noqa: E402
+
+
+def make_erp(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    tas = np.array([f"0{i % 97:02d}{'X' if i % 11 == 0 else ''}{i:06d}" for i in range(max(1, rows // 50))])
+    return pd.DataFrame({
+        'TAS': rng.choice(tas, rows),
+        'USSGL_ACCOUNT': rng.choice([101000, 210100, 310100, 411900, 445000, 480100, 570000], rows),
+        'FUND': rng.choice([f'F{i:03d}' for i in range(40)], rows),
+        'NET_BALANCE': np.round(rng.normal(0, 1e5, rows), 2),
+        'DESCRIPTION': rng.choice(['Accrual', 'Adjustment', 'Reclass', 'Closing'], rows),
+        'POSTED_BY': rng.choice([f'user{i}' for i in range(200)], rows),
+    })
+
+
+def timed(label, load):
+    start = time.perf_counter()
+    df = load()
+    elapsed = time.perf_counter() - start
+    mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{label:<26} {elapsed:8.3f} s  {mb:10.1f} MB in memory  ({len(df.columns)} columns)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workdir', default='/tmp/fedreconcile-bench')
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    paths = {fmt: os.path.join(args.workdir, f'erp.{fmt}') for fmt in ('csv', 'parquet', 'feather')}
+    erp = make_erp(args.rows)
+    erp.to_csv(paths['csv'], index=False)
+    erp.to_parquet(paths['parquet'], index=False)
+    erp.to_feather(paths['feather'])
+    for fmt, path in paths.items():
+        print(f"{fmt:<8} {os.path.getsize(path) / 1024 ** 2:8.1f} MB on disk")
+
+    baseline = timed('read_csv (inferred)', lambda: pd.read_csv(paths['csv']))
+    for fmt, path in paths.items():
+        elapsed = timed(f'read_trial_balance {fmt}', lambda: read_trial_balance(path, ERP_SCHEMA))
+        print(f"{'':<26} {baseline / elapsed:8.2f}x faster than inferred CSV")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Scaling benchmark for the process-pool reconciliation modes.
+
+Reconciles one synthetic GTAS/ERP pair serially and then with 1, 2, 4, ... N
+workers. It reports wall time, rows per second and speed-up against the serial
+run, and checks that every parallel run returns the same exceptions.
+
+    prototype  -> parallel.validate_and_reconcile_parallel
+    gcf        -> parallel.validate_erp_vs_gtas_parallel
+
+Usage:
+    python benchmarks/bench_parallel.py [--pipeline prototype|gcf] [--rows 2000000] [--max-workers 32]
+"""
+import argparse
+import contextlib
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+PROTOTYPE_DIR = os.path.join(ROOT, 'src', 'backend', 'python')
+GCF_DIR = os.path.join(ROOT, 'gcf_gtas_validator')
+
+
+def make_inputs(rows, seed=0, mismatch_rate=0.05, missing_rate=0.01):
+    """Synthetic GTAS/ERP pair with unique (TAS, USSGL_ACCOUNT) keys."""
+    rng = np.random.default_rng(seed)
+    tas_count = max(1, rows // 50)
+    tas = np.array([f"0{i % 97:02d}{'X' if i % 11 == 0 else ''}{i:06d}" for i in range(tas_count)])
+    ussgl = np.array([101000, 210100, 211000, 310100, 411900, 445000, 480100, 570000, 610000, 690000]
+                     + list(range(100000, 100040)))
+    keys = pd.DataFrame({
+        'TAS': np.repeat(tas, len(ussgl))[:rows],
+        'USSGL_ACCOUNT': np.tile(ussgl, tas_count)[:rows],
+    })
+    balance = np.round(rng.normal(0, 1e5, len(keys)), 2)
+    gtas = keys.assign(GTAS_BALANCE=balance)
+    erp = keys.assign(FUND='F' + (keys.index % 10).astype(str), NET_BALANCE=balance)
+    erp.loc[rng.random(len(erp)) < mismatch_rate, 'NET_BALANCE'] += 10
+    gtas = gtas[rng.random(len(gtas)) >= missing_rate].reset_index(drop=True)
+    erp = erp[rng.random(len(erp)) >= missing_rate].reset_index(drop=True)
+    return gtas, erp
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences stdout at the file-descriptor level, including in forked workers."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def load_pipeline(name):
+    """Imports the serial and parallel entry points of one pipeline."""
+    directory = PROTOTYPE_DIR if name == 'prototype' else GCF_DIR
+    sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(f'{name}_parallel', os.path.join(directory, 'parallel.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    if name == 'prototype':
+        from prototype import validate_and_reconcile
+
+        def serial(gtas, erp):
+            return len(validate_and_reconcile(gtas, erp))
+
+        def parallel(gtas, erp, workers):
+            return len(module.validate_and_reconcile_parallel(gtas, erp, workers=workers))
+    else:
+        from validation_logic import validate_erp_vs_gtas
+
+        def serial(gtas, erp):
+            return validate_erp_vs_gtas(erp.copy(), gtas.copy())[2]['errors']
+
+        def parallel(gtas, erp, workers):
+            return module.validate_erp_vs_gtas_parallel(erp.copy(), gtas.copy(), workers=workers)[2]['errors']
+    return serial, parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pipeline', choices=['prototype', 'gcf'], default='prototype')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    serial, parallel = load_pipeline(args.pipeline)
+    gtas, erp = make_inputs(args.rows)
+    print(f"{args.pipeline}: {len(gtas):,} GTAS rows, {len(erp):,} ERP rows, {os.cpu_count()} CPUs")
+
+    with quiet():
+        start = time.perf_counter()
+        expected = serial(gtas, erp)
+        baseline = time.perf_counter() - start
+    print(f"serial        {baseline:8.3f} s  {args.rows / baseline:>12,.0f} rows/s  exceptions={expected:,}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with quiet():
+            start = time.perf_counter()
+            found = parallel(gtas, erp, workers)
+            elapsed = time.perf_counter() - start
+        assert found == expected, f"{workers} workers returned {found} exceptions, serial returned {expected}"
+        print(f"workers={workers:<4} {elapsed:8.3f} s  {args.rows / elapsed:>12,.0f} rows/s  speed-up={baseline / elapsed:5.2f}x")
+        workers = workers * 2 if workers * 2 <= args.max_workers or workers == args.max_workers else args.max_workers
+
+
+if __name__ == '__main__':
+    main()
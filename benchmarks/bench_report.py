@@ -0,0 +1,102 @@
+"""
+Benchmark for prototype.generate_exception_report.
+
+Writes the same synthetic exception set with the legacy openpyxl/ExcelWriter
+report (kept here as the reference) and with the write-only streaming writer.
+For each, it reports the time and the peak memory growth, measured in a forked
+child process. The two workbooks are then compared cell for cell.
+
+Usage:
+    python benchmarks/bench_report.py [--rows 300000] [--workdir /tmp/fedreconcile-bench]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'backend', 'python'))
+
+from prototype import generate_exception_report  # noqa: E402
+
+
+def generate_exception_report_legacy(exceptions_df, output_path):
+    """The original report writer, used as the reference."""
+    report_columns = ['STATUS', 'TAS', 'USSGL_ACCOUNT', 'GTAS_BALANCE', 'NET_BALANCE', 'DIFFERENCE',
+                      'GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']
+    formatted_df = exceptions_df[report_columns].sort_values(by=['STATUS', 'TAS'])
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        formatted_df.to_excel(writer, sheet_name='Discrepancies', index=False)
+        worksheet = writer.sheets['Discrepancies']
+        for idx, col in enumerate(formatted_df.columns):
+            max_len = max((formatted_df[col].astype(str).map(len).max(), len(str(col)))) + 2
+            worksheet.column_dimensions[chr(65 + idx)].width = max_len
+    return output_path
+
+
+def make_exceptions(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    tas = np.array([f"0{i % 97:02d}{'X' if i % 11 == 0 else ''}{i:06d}" for i in range(max(1, rows // 50))])
+    gtas = np.round(rng.normal(0, 1e5, rows), 2)
+    net = gtas + rng.choice([0.0, 10.0, -250.5], rows)
+    return pd.DataFrame({
+        'STATUS': rng.choice(np.array(['Mismatch', 'Missing in GTAS', 'Missing in ERP'], dtype=object), rows),
+        'TAS': rng.choice(tas, rows),
+        'USSGL_ACCOUNT': rng.choice(['101000', '210100', '445000', '480100'], rows),
+        'GTAS_BALANCE': gtas,
+        'NET_BALANCE': net,
+        'DIFFERENCE': gtas - net,
+        'GTAS_FATAL_ERROR': rng.choice(np.array(['', '', 'Canceled TAS must have 0 balance for USSGL 101000'],
+                                                dtype=object), rows),
+        'GTAS_ADVISORY_NOTE': rng.choice(np.array(['', '210000 series should net to zero'], dtype=object), rows),
+    })
+
+
+def _rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _measure(writer, exceptions, path, queue):
+    start_rss = _rss_mb()
+    start = time.perf_counter()
+    writer(exceptions, path)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - start_rss))
+
+
+def measure(label, writer, exceptions, path):
+    queue = multiprocessing.get_context('fork').SimpleQueue()
+    child = multiprocessing.get_context('fork').Process(target=_measure, args=(writer, exceptions, path, queue))
+    child.start()
+    child.join()
+    elapsed, peak_mb = queue.get()
+    print(f"{label:<22} {elapsed:8.2f} s  {len(exceptions) / elapsed:10,.0f} rows/s  +{peak_mb:8.1f} MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--workdir', default='/tmp/fedreconcile-bench')
+    args = parser.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+
+    exceptions = make_exceptions(args.rows)
+    legacy_path = os.path.join(args.workdir, 'report_legacy.xlsx')
+    streaming_path = os.path.join(args.workdir, 'report_streaming.xlsx')
+    measure('legacy ExcelWriter', generate_exception_report_legacy, exceptions, legacy_path)
+    measure('write-only streaming', generate_exception_report, exceptions, streaming_path)
+
+    pd.testing.assert_frame_equal(pd.read_excel(legacy_path), pd.read_excel(streaming_path))
+    print(f"parity ok on {args.rows:,} rows")
+
+
+if __name__ == '__main__':
+    main()
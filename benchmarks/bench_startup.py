@@ -0,0 +1,98 @@
+"""
+Cold-start benchmark for the GTAS validator Cloud Function.
+
+Each run imports gcf_gtas_validator/main.py in a fresh interpreter (as a new
+instance would) and reports:
+
+- the wall time of `import main`, median over --runs, checked against
+  --budget-ms;
+- the heavy modules (pandas, numpy, pyarrow, google.cloud.storage) that the
+  import pulled in, which should be none;
+- the modules with the largest cumulative import time, from `python -X importtime`;
+- the time warm_up() then takes to load the validation engine and rule catalog,
+  which a warm instance pays once.
+
+Exits with status 1 when the import exceeds the budget or loads a heavy module.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 250] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gcf_gtas_validator')
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'google.cloud.storage']
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+start = time.perf_counter()
+main.warm_up()
+warmed = time.perf_counter() - start
+print(json.dumps({{
+    'import_ms': imported * 1000,
+    'warm_up_ms': warmed * 1000,
+    'heavy': heavy,
+}}))
+"""
+
+
+def _run(args, probe_env):
+    env = dict(os.environ, WARM_UP='lazy', RESULT_CACHE_MB='0', **probe_env)
+    return subprocess.run([sys.executable, *args], cwd=FUNCTION_DIR, env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def probe():
+    """Imports main, then warms it up, in a fresh interpreter."""
+    return json.loads(_run(['-c', PROBE], {}).stdout.splitlines()[-1])
+
+
+def import_profile():
+    """Cumulative import time per module, in ms, from -X importtime."""
+    # The heavy modules are imported by a warm_up() call in the same process, so the
+    # profile shows both what the cold import costs and what is deferred
+    stderr = _run(['-X', 'importtime', '-c', 'import main; main.warm_up()'], {}).stderr
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative_us) / 1000
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250.0)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.runs)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    warm_up_ms = statistics.median(run['warm_up_ms'] for run in runs)
+    heavy = sorted({module for run in runs for module in run['heavy']})
+
+    print(f"{'import main':<32} {import_ms:8.1f} ms  (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'warm_up()':<32} {warm_up_ms:8.1f} ms  (deferred to the warm-up thread / first request)")
+    print(f"{'heavy modules at import':<32} {', '.join(heavy) or 'none'}")
+
+    print("\nlargest cumulative import times (import main + warm_up):")
+    for name, ms in sorted(import_profile().items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<40} {ms:8.1f} ms")
+
+    if import_ms > args.budget_ms or heavy:
+        print("\nFAIL: cold import is over budget or loads a heavy module")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
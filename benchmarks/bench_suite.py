@@ -0,0 +1,280 @@
+"""
+Stage-by-stage reconciliation benchmark with a stored baseline.
+
+Generates one synthetic GTAS/ERP ledger (see ledger.py), writes it as CSV and
+runs both pipelines over it, each in a forked child so their same-named modules
+do not collide and their memory is measured separately:
+
+    prototype  load, merge, status, edits, exceptions, report (Excel), fbdi,
+               then run_validation end to end
+    gcf        load, merge, validate (validate_erp_vs_gtas, merge included),
+               edits (rule catalog on GTAS), report (exception CSV), fbdi
+
+Each stage reports wall time, rows per second and peak memory growth (the
+process high-water mark over the stage, reset before it starts).
+
+Results are compared with --baseline (default benchmarks/baseline.json). A
+stage regresses when it is more than --tolerance slower (and at least 50 ms) or
+uses more than --tolerance more peak memory (and at least 16 MB) than its
+baseline. Regressions make the script exit with status 1. --update-baseline
+records this run as the new baseline. Baselines are only compared when the
+ledger parameters match, and are machine-specific.
+
+Usage:
+    python benchmarks/bench_suite.py [--rows 500000] [--pipelines prototype gcf] [--tolerance 0.25]
+                                     [--update-baseline] [--json results.json]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ledger import make_ledger, write_ledger  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PIPELINE_DIRS = {
+    'prototype': os.path.join(ROOT, 'src', 'backend', 'python'),
+    'gcf': os.path.join(ROOT, 'gcf_gtas_validator'),
+}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIN_REGRESSION_SECONDS = 0.05
+MIN_REGRESSION_MB = 16.0
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences stdout at the file-descriptor level, including in forked workers."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def _status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+class StageTimer:
+    """Times named stages and records their peak memory growth (Linux VmHWM)."""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        """Times the block; the yielded record's rows may be set inside it."""
+        record = {'stage': name, 'rows': rows}
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')  # Reset the high-water mark to the current RSS
+        except OSError:
+            pass
+        start_kb = _status_kb('VmRSS:')
+        start = time.perf_counter()
+        with quiet():
+            yield record
+        seconds = time.perf_counter() - start
+        record.update(
+            seconds=round(seconds, 4),
+            rows_per_s=round(record['rows'] / seconds) if seconds else None,
+            peak_mb=round(max(_status_kb('VmHWM:') - start_kb, 0) / 1024, 1),
+        )
+        self.stages.append(record)
+
+
+def run_prototype(paths, workdir, timer):
+    import prototype as p
+
+    gtas_path, erp_path = paths
+    with timer.stage('load') as record:
+        gtas, erp = p.load_data(gtas_path, erp_path)
+        rows = record['rows'] = len(gtas) + len(erp)
+
+    with timer.stage('merge', rows):
+        merged = p.join_trial_balances(gtas, erp)
+    with timer.stage('status', len(merged)):
+        merged['GTAS_BALANCE'] = pd.to_numeric(merged['GTAS_BALANCE'], errors='coerce').fillna(0)
+        merged['NET_BALANCE'] = pd.to_numeric(merged['NET_BALANCE'], errors='coerce').fillna(0)
+        merged['DIFFERENCE'] = merged['GTAS_BALANCE'] - merged['NET_BALANCE']
+        merged['STATUS'] = p.classify_status(merged['IN_GTAS'], merged['IN_ERP'], merged['DIFFERENCE'])
+    with timer.stage('edits', len(merged)):
+        validated = p.apply_gtas_edits_expanded_safe(merged)
+    with timer.stage('exceptions', len(validated)):
+        exceptions = p.select_exceptions(validated)
+    with timer.stage('report', len(exceptions)):
+        p.generate_exception_report(exceptions, os.path.join(workdir, 'exceptions.xlsx'))
+    with timer.stage('fbdi', len(exceptions)):
+        p.generate_fbdi_file(exceptions, os.path.join(workdir, 'fbdi.csv'))
+    outcome = {'exceptions': len(exceptions)}
+    del gtas, erp, merged, validated, exceptions
+
+    with timer.stage('run_validation', rows):
+        result = p.run_validation(gtas_path, erp_path, os.path.join(workdir, 'run.xlsx'),
+                                  os.path.join(workdir, 'run_fbdi.csv'))
+    assert result['success'], result['message']
+    return outcome
+
+
+def run_gcf(paths, workdir, timer):
+    from fbdi import FbdiWriter
+    from keys import outer_join
+    from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories, read_trial_balance
+    from validation_logic import validate_erp_vs_gtas
+    from validators.registry import load_registry
+
+    gtas_path, erp_path = paths
+    with timer.stage('load') as record:
+        erp = read_trial_balance(erp_path, ERP_SCHEMA)
+        gtas = read_trial_balance(gtas_path, GTAS_SCHEMA)
+        align_key_categories(erp, gtas)
+        rows = record['rows'] = len(gtas) + len(erp)
+
+    with timer.stage('merge', rows):
+        outer_join(erp, gtas, on=['USSGL_ACCOUNT', 'TAS'], indicator=True, suffixes=('_ERP', '_GTAS'))
+    with timer.stage('validate', rows):
+        is_valid, errors, summary, fbdi_corrections = validate_erp_vs_gtas(erp, gtas)
+    with timer.stage('edits', len(gtas)):
+        load_registry().run(gtas)
+    with timer.stage('report', len(errors)):
+        errors.to_frame().to_csv(os.path.join(workdir, 'exception_report.csv'), index=False)
+    with timer.stage('fbdi', len(fbdi_corrections)):
+        with FbdiWriter(os.path.join(workdir, 'fbdi_journal_corrections.csv')) as writer:
+            writer.write(fbdi_corrections)
+    return {'exceptions': summary['errors']}
+
+
+PIPELINES = {'prototype': run_prototype, 'gcf': run_gcf}
+
+
+def _child(name, paths, workdir, queue):
+    sys.path.insert(0, PIPELINE_DIRS[name])
+    timer = StageTimer()
+    try:
+        outcome = PIPELINES[name](paths, workdir, timer)
+        queue.put({'stages': timer.stages, **outcome})
+    except Exception as e:
+        queue.put({'stages': timer.stages, 'error': repr(e)})
+
+
+def run_pipeline(name, paths, workdir):
+    """Runs one pipeline in a forked child and returns its stage records."""
+    context = multiprocessing.get_context('fork')
+    queue = context.SimpleQueue()
+    out_dir = os.path.join(workdir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    child = context.Process(target=_child, args=(name, paths, out_dir, queue))
+    child.start()
+    child.join()
+    if queue.empty():
+        raise RuntimeError(f"{name} benchmark exited with code {child.exitcode}")
+    return queue.get()
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for every stage slower or larger than its baseline."""
+    regressions = []
+    for name, result in results.items():
+        reference = {s['stage']: s for s in baseline.get(name, {}).get('stages', [])}
+        for stage in result['stages']:
+            base = reference.get(stage['stage'])
+            if base is None:
+                continue
+            if (stage['seconds'] > base['seconds'] * (1 + tolerance)
+                    and stage['seconds'] - base['seconds'] >= MIN_REGRESSION_SECONDS):
+                regressions.append(f"{name}.{stage['stage']}: {stage['seconds']:.3f} s vs {base['seconds']:.3f} s baseline")
+            if (stage['peak_mb'] > base['peak_mb'] * (1 + tolerance)
+                    and stage['peak_mb'] - base['peak_mb'] >= MIN_REGRESSION_MB):
+                regressions.append(f"{name}.{stage['stage']}: {stage['peak_mb']:.0f} MB vs {base['peak_mb']:.0f} MB baseline")
+    return regressions
+
+
+def print_results(results, baseline):
+    for name, result in results.items():
+        reference = {s['stage']: s for s in baseline.get(name, {}).get('stages', [])}
+        print(f"\n{name}" + (f"  ({result['exceptions']:,} exceptions)" if 'exceptions' in result else ''))
+        print(f"  {'stage':<16} {'seconds':>9} {'rows/s':>13} {'peak MB':>9} {'vs baseline':>12}")
+        for stage in result['stages']:
+            base = reference.get(stage['stage'])
+            delta = f"{stage['seconds'] / base['seconds']:.2f}x" if base and base['seconds'] else ''
+            rate = f"{stage['rows_per_s']:,}" if stage['rows_per_s'] else ''
+            print(f"  {stage['stage']:<16} {stage['seconds']:9.3f} {rate:>13} {stage['peak_mb']:9.1f} {delta:>12}")
+        if 'error' in result:
+            print(f"  FAILED: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--tas-count', type=int)
+    parser.add_argument('--mismatch-rate', type=float, default=0.05)
+    parser.add_argument('--missing-rate', type=float, default=0.01, help='share of keys dropped from each side')
+    parser.add_argument('--x-tas-rate', type=float, default=0.1)
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--workdir', default='/tmp/fedreconcile-bench/suite')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    config = {
+        'rows': args.rows, 'tas_count': args.tas_count, 'mismatch_rate': args.mismatch_rate,
+        'missing_rate': args.missing_rate, 'x_tas_rate': args.x_tas_rate,
+    }
+    gtas, erp = make_ledger(args.rows, args.tas_count, args.mismatch_rate, args.missing_rate, args.missing_rate,
+                            args.x_tas_rate)
+    paths = write_ledger(gtas, erp, args.workdir)
+    print(f"ledger: {len(gtas):,} GTAS rows, {len(erp):,} ERP rows -> {args.workdir}")
+    del gtas, erp
+
+    results = {name: run_pipeline(name, paths, args.workdir) for name in args.pipelines}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get('config') == config:
+            baseline = stored['results']
+        else:
+            print(f"\nbaseline {args.baseline} was recorded with {stored.get('config')}; not comparing")
+    print_results(results, baseline)
+
+    record = {'config': config, 'machine': platform.platform(), 'python': platform.python_version(),
+              'pandas': pd.__version__, 'results': results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(record, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    failed = [name for name, result in results.items() if 'error' in result]
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Synthetic GTAS / ERP trial balance generator for the benchmarks.
+
+make_ledger builds a GTAS trial balance and the matching ERP trial balance with
+unique (TAS, USSGL_ACCOUNT) keys and control over:
+
+- rows and TAS cardinality (tas_count; default one TAS per 50 rows);
+- mismatch_rate: share of keys on both sides whose ERP balance is off by more
+  than the reconciliation tolerance;
+- missing_gtas_rate / missing_erp_rate: share of keys dropped from one side;
+- x_tas_rate: share of TAS that are canceled X-TAS (TAS text starting with 'X');
+- account_mix: share of rows per account class, which drives the GTAS edits:
+  'cash' (101000 first, then 101xxx), '210' (210xxx), '445' (445000 first, then
+  445xxx), 'budgetary' (other 4xxxxx) and 'other' (5xxxxx);
+- zero_rate: share of balances that are exactly zero.
+
+Both frames use the normalized column names (TAS, USSGL_ACCOUNT, GTAS_BALANCE /
+FUND, NET_BALANCE) that both pipelines read.
+
+Usage (writes gtas.csv and erp.csv):
+    python benchmarks/ledger.py [--rows 1000000] [--format csv|parquet|feather] [--out /tmp/fedreconcile-bench]
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ACCOUNT_CLASSES = {
+    # class: (first account, step between accounts of the same TAS)
+    'cash': (101000, 100),
+    '210': (210000, 10),
+    '445': (445000, 100),
+    'budgetary': (480000, 100),
+    'other': (500000, 100),
+}
+DEFAULT_ACCOUNT_MIX = {'cash': 0.10, '210': 0.15, '445': 0.05, 'budgetary': 0.40, 'other': 0.30}
+
+
+def make_tas(tas_count, x_tas_rate=0.1, seed=0):
+    """tas_count distinct TAS strings, a share x_tas_rate of them canceled X-TAS."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(tas_count)
+    agency = rng.integers(10, 100, tas_count)
+    year = rng.integers(2015, 2026, tas_count)
+    canceled = rng.random(tas_count) < x_tas_rate
+    return np.where(
+        canceled,
+        [f"X{a:03d}{i:07d}" for a, i in zip(agency, ids)],
+        [f"0{a:02d}{y}{i:07d}" for a, y, i in zip(agency, year, ids)],
+    ).astype(object)
+
+
+def make_ledger(rows, tas_count=None, mismatch_rate=0.05, missing_gtas_rate=0.01, missing_erp_rate=0.01,
+                x_tas_rate=0.1, account_mix=None, zero_rate=0.05, seed=0):
+    """
+    Returns (gtas_df, erp_df) for rows keys before the missing-side drops.
+    See the module docstring for the parameters.
+    """
+    rng = np.random.default_rng(seed)
+    tas_count = tas_count or max(1, rows // 50)
+    mix = account_mix or DEFAULT_ACCOUNT_MIX
+    classes = list(mix)
+    shares = np.array([mix[c] for c in classes], dtype=float)
+
+    tas = make_tas(tas_count, x_tas_rate, seed)[rng.integers(0, tas_count, rows)]
+    account_class = rng.choice(len(classes), rows, p=shares / shares.sum())
+    # Accounts count up within each (TAS, class), so every key is unique
+    sequence = pd.DataFrame({'t': tas, 'c': account_class}).groupby(['t', 'c'], sort=False).cumcount().to_numpy()
+    first = np.array([ACCOUNT_CLASSES[c][0] for c in classes])[account_class]
+    step = np.array([ACCOUNT_CLASSES[c][1] for c in classes])[account_class]
+    ussgl = (first + sequence * step).astype(str).astype(object)
+
+    balance = np.round(rng.normal(0, 1e5, rows), 2)
+    balance[rng.random(rows) < zero_rate] = 0.0
+    net_balance = balance.copy()
+    mismatched = rng.random(rows) < mismatch_rate
+    net_balance[mismatched] += np.round(rng.choice([-1, 1], mismatched.sum()) * rng.uniform(1, 5000, mismatched.sum()), 2)
+
+    gtas = pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl, 'GTAS_BALANCE': balance})
+    erp = pd.DataFrame({
+        'TAS': tas,
+        'USSGL_ACCOUNT': ussgl,
+        'FUND': rng.choice([f'F{i:03d}' for i in range(40)], rows).astype(object),
+        'NET_BALANCE': net_balance,
+    })
+    gtas = gtas[rng.random(rows) >= missing_gtas_rate].reset_index(drop=True)
+    erp = erp[rng.random(rows) >= missing_erp_rate].reset_index(drop=True)
+    return gtas, erp
+
+
+def write_ledger(gtas, erp, out_dir, fmt='csv'):
+    """Writes gtas.<fmt> and erp.<fmt> under out_dir and returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, df in (('gtas', gtas), ('erp', erp)):
+        path = os.path.join(out_dir, f'{name}.{fmt}')
+        if fmt == 'csv':
+            df.to_csv(path, index=False)
+        elif fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_feather(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--tas-count', type=int)
+    parser.add_argument('--mismatch-rate', type=float, default=0.05)
+    parser.add_argument('--missing-rate', type=float, default=0.01, help='share of keys dropped from each side')
+    parser.add_argument('--x-tas-rate', type=float, default=0.1)
+    parser.add_argument('--format', choices=['csv', 'parquet', 'feather'], default='csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='/tmp/fedreconcile-bench')
+    args = parser.parse_args()
+
+    gtas, erp = make_ledger(args.rows, args.tas_count, args.mismatch_rate, args.missing_rate, args.missing_rate,
+                            args.x_tas_rate, seed=args.seed)
+    for path in write_ledger(gtas, erp, args.out, args.format):
+        print(f"{path}  {os.path.getsize(path) / 1024 ** 2:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
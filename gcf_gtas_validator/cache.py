@@ -0,0 +1,182 @@
+# cache.py
+
+import hashlib
+import importlib
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from parallel import combine_results, split_by_key, validate_shards
+from validation_logic import (
+    REQUIRED_ERP_COLUMNS,
+    REQUIRED_GTAS_COLUMNS,
+    normalize_columns,
+    validate_erp_vs_gtas,
+)
+
+# Fixed so that an unchanged key range lands in the same partition on every submission
+CACHE_PARTITIONS = 16
+READ_BLOCK = 1024 * 1024
+# Bump when results change for a reason the digested sources below do not show
+CACHE_VERSION = 1
+# Every module whose code shapes a cached result: loading, joining, validation,
+# error and FBDI construction, partitioning and combining, and this module
+RESULT_MODULES = ('loaders', 'keys', 'validation_logic', 'validators.results', 'fbdi', 'parallel', __name__)
+
+
+def _logic_version():
+    """
+    Digest of CACHE_VERSION, the pandas and numpy versions and the source of
+    RESULT_MODULES, so cached results expire when any of them changes.
+    """
+    digest = hashlib.sha256(f"{CACHE_VERSION}|{pd.__version__}|{np.__version__}".encode())
+    for name in RESULT_MODULES:
+        with open(importlib.import_module(name).__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+LOGIC_VERSION = _logic_version()
+
+
+def file_digest(source):
+    """SHA-256 of a file's bytes, read in blocks. source is a path or a seekable binary stream."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b''):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(READ_BLOCK), b''):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def frame_digest(df):
+    """
+    SHA-256 of a frame's columns, dtypes and values. Categoricals hash by value,
+    so the digest does not depend on which other keys share the categories.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(col, str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(*digests):
+    """Cache key for a result computed from the given input digests."""
+    return hashlib.sha256('|'.join((LOGIC_VERSION,) + digests).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed store of validation results on the local file system.
+
+    Each entry is one pickle named by its key. Reads refresh the entry's mtime,
+    so eviction is least-recently-used: entries older than max_age_seconds are
+    dropped, then the oldest entries until the cache fits in max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024, max_age_seconds=24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss or an expired entry."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def put(self, key, value):
+        """Stores value under key, then evicts by age and size."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))  # Readers never see a partial entry
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                os.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def validate_cached(erp_df, gtas_df, cache, partitions=CACHE_PARTITIONS, workers=1, executor=None):
+    """
+    Runs validate_erp_vs_gtas partition by partition, reusing cached partitions.
+
+    Both inputs are split into the same (TAS, USSGL_ACCOUNT) hash partitions as
+    the parallel validator. Each partition pair is keyed by the digests of its
+    two halves, so a re-submission that changed a few lines only recomputes the
+    partitions holding those keys. Results are combined as in
+    validate_erp_vs_gtas_parallel, so error rows are numbered in partition order
+    and differ from the row numbers validate_erp_vs_gtas reports.
+
+    Args:
+        erp_df (DataFrame): ERP trial balance.
+        gtas_df (DataFrame): GTAS trial balance.
+        cache (ResultCache): Store for per-partition results.
+        partitions (int): Number of key partitions.
+        workers (int): Processes used for the partitions that miss the cache.
+        executor (ProcessPoolExecutor): Optional running pool to reuse across calls.
+
+    Returns:
+        tuple: (is_valid, errors, summary, fbdi_corrections), as validate_erp_vs_gtas.
+            The summary also reports cached_partitions.
+    """
+    erp_df.columns = normalize_columns(erp_df.columns)
+    gtas_df.columns = normalize_columns(gtas_df.columns)
+    if not (REQUIRED_ERP_COLUMNS.issubset(erp_df.columns) and REQUIRED_GTAS_COLUMNS.issubset(gtas_df.columns)):
+        return validate_erp_vs_gtas(erp_df, gtas_df)
+
+    erp_parts = split_by_key(erp_df, partitions)
+    gtas_parts = split_by_key(gtas_df, partitions)
+    keys = [result_key('partition', frame_digest(e), frame_digest(g)) for e, g in zip(erp_parts, gtas_parts)]
+    results = [cache.get(key) for key in keys]
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    computed = validate_shards([erp_parts[i] for i in misses], [gtas_parts[i] for i in misses], workers, executor)
+    for i, result in zip(misses, computed):
+        cache.put(keys[i], result)
+        results[i] = result
+
+    is_valid, errors, summary, fbdi_corrections = combine_results(results)
+    summary["cached_partitions"] = partitions - len(misses)
+    return is_valid, errors, summary, fbdi_corrections
@@ -0,0 +1,165 @@
+# fbdi.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Oracle GL interface (FBDI) journal columns, in file order
+FBDI_COLUMNS = [
+    "STATUS_CODE", "LEDGER_ID", "EFFECTIVE_DATE", "JOURNAL_SOURCE", "JOURNAL_CATEGORY", "CURRENCY_CODE",
+    "JOURNAL_ENTRY_CREATION_DATE", "ACTUAL_FLAG", "SEGMENT1", "SEGMENT2", "SEGMENT3", "SEGMENT4", "SEGMENT5",
+    "ENTERED_DEBIT_AMOUNT", "ENTERED_CREDIT_AMOUNT", "REFERENCE_COLUMN_1", "REFERENCE_COLUMN_2",
+]
+# Values shared by every line, broadcast rather than repeated per row
+FBDI_CONSTANTS = {
+    "STATUS_CODE": "NEW",
+    "LEDGER_ID": 1,
+    "EFFECTIVE_DATE": "2025-06-30",
+    "JOURNAL_SOURCE": "FedReconcile",
+    "JOURNAL_CATEGORY": "Reconciliation",
+    "CURRENCY_CODE": "USD",
+    "ACTUAL_FLAG": "A",
+    "SEGMENT1": "101",
+    "SEGMENT2": "Finance",
+    "REFERENCE_COLUMN_1": "FedReconcile Correction",
+}
+COMPRESSION_SUFFIXES = {None: ".csv", "gzip": ".csv.gz", "zip": ".zip"}
+COMPRESSION_CONTENT_TYPES = {None: "text/csv", "gzip": "application/gzip", "zip": "application/zip"}
+DEFAULT_ENTRY_NAME = "fbdi_journal_corrections.csv"
+
+
+def _text(values):
+    """str() of every value; categoricals are formatted once per category."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Code -1 (missing) picks the trailing "nan", as str() of a missing value gives
+        labels = np.append(values.cat.categories.astype(object).astype(str).to_numpy(dtype=object), "nan")
+        return labels[values.cat.codes.to_numpy()]
+    return values.astype(object).astype(str).to_numpy(dtype=object)
+
+
+def build_fbdi_journal(ussgl, fund, tas, correction_amount, reference, run_date=None):
+    """
+    Builds FBDI journal lines a column at a time.
+
+    Args:
+        ussgl, fund, tas (array-like): Segment values per line (SEGMENT3-5).
+        correction_amount (array-like): Signed amount per line; positive amounts are
+            debits and negative amounts credits.
+        reference (str | array-like): REFERENCE_COLUMN_2 per line, or one value for all.
+        run_date (datetime): JOURNAL_ENTRY_CREATION_DATE (defaults to now).
+
+    Returns:
+        DataFrame: One row per line with FBDI_COLUMNS.
+    """
+    amount = np.asarray(correction_amount, dtype=float)
+    with np.errstate(invalid="ignore"):
+        columns = dict(
+            FBDI_CONSTANTS,
+            JOURNAL_ENTRY_CREATION_DATE=(run_date or datetime.now()).strftime("%Y-%m-%d"),
+            SEGMENT3=_text(ussgl),
+            SEGMENT4=_text(fund),
+            SEGMENT5=_text(tas),
+            ENTERED_DEBIT_AMOUNT=np.where(amount > 0, amount, 0.0),
+            ENTERED_CREDIT_AMOUNT=np.where(amount < 0, -amount, 0.0),
+            REFERENCE_COLUMN_2=reference,
+        )
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(amount)), columns=FBDI_COLUMNS)
+
+
+def infer_compression(path):
+    """None, "gzip" or "zip", from a .gz or .zip suffix of path."""
+    return {".gz": "gzip", ".zip": "zip"}.get(os.path.splitext(path)[1].lower())
+
+
+def zip_entry_name(path):
+    """The CSV entry of a zipped journal: journal.zip and journal.csv.zip both hold journal.csv."""
+    entry = os.path.splitext(os.path.basename(path))[0]
+    return entry if entry.lower().endswith(".csv") else entry + ".csv"
+
+
+class FbdiWriter:
+    """
+    Streams FBDI journal lines into one CSV, optionally gzip- or zip-compressed.
+
+    The target is a path or a binary stream such as io.BytesIO; a stream is left
+    open for the caller to upload. A zip holds a single CSV entry, as the FBDI
+    upload expects. The header is written with the first lines (or on close when
+    there are none, so the file stays loadable). Every line is stamped with the
+    writer's run date, so lines built earlier, for example by a cached partition,
+    carry the date the file was produced. Lines are encoded by the pyarrow CSV
+    writer when it is installed (text fields are then quoted) and by pandas
+    otherwise.
+
+    Args:
+        target (str | file-like): Output path or binary stream.
+        compression (str): None, "gzip", "zip" or "infer" (from the suffix of a
+            path target; a stream is then written uncompressed).
+        run_date (datetime): JOURNAL_ENTRY_CREATION_DATE of every line (defaults to now).
+        entry_name (str): CSV entry name when zipping into a stream (a path's own
+            name is used otherwise, see zip_entry_name).
+    """
+
+    def __init__(self, target, compression="infer", run_date=None, entry_name=DEFAULT_ENTRY_NAME):
+        if compression == "infer":
+            compression = infer_compression(target) if isinstance(target, str) else None
+        self.lines = 0
+        self.run_date = (run_date or datetime.now()).strftime("%Y-%m-%d")
+        self._zip = None
+        self._owned = None
+        if isinstance(target, str):
+            entry_name = zip_entry_name(target)
+            if compression != "zip":
+                target = self._owned = open(target, "wb")
+        self._target = target
+        if compression == "gzip":
+            import gzip
+            self._handle = gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6)
+        elif compression == "zip":
+            import zipfile
+            self._zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+            self._handle = self._zip.open(entry_name, "w")
+        elif compression is None:
+            self._handle = target
+        else:
+            if self._owned is not None:
+                self._owned.close()
+            raise ValueError(f"Unsupported FBDI compression: {compression}")
+
+    def write(self, journal):
+        """Appends journal lines (a frame with FBDI_COLUMNS, e.g. from build_fbdi_journal)."""
+        if journal.empty:
+            return
+        journal = journal.assign(JOURNAL_ENTRY_CREATION_DATE=self.run_date)
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as csv
+        except ImportError:
+            journal.to_csv(self._handle, header=self.lines == 0, index=False)
+        else:
+            csv.write_csv(pa.Table.from_pandas(journal, preserve_index=False), self._handle,
+                          csv.WriteOptions(include_header=self.lines == 0))
+        self.lines += len(journal)
+
+    def close(self):
+        if self.lines == 0:
+            self._handle.write((",".join(FBDI_COLUMNS) + "\n").encode())
+        if self._handle is not self._target:
+            self._handle.close()  # gzip trailer or zip entry
+        if self._zip is not None:
+            self._zip.close()
+        if self._owned is not None:
+            self._owned.close()
+        elif hasattr(self._target, "flush"):
+            self._target.flush()  # A caller's stream stays open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
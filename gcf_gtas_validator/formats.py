@@ -0,0 +1,25 @@
+# formats.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+#
+# Standard library only: the Cloud Function detects upload formats before it
+# imports pandas.
+
+import os
+
+# Input file formats, by file extension
+FORMATS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+
+
+def detect_format(name, default="csv"):
+    """Maps a file name to 'csv', 'parquet' or 'feather' by extension."""
+    return FORMATS.get(os.path.splitext(name or "")[1].lower(), default)
@@ -0,0 +1,345 @@
+# jobs.py
+
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+JOB_STATES = ("queued", "running", "succeeded", "failed")
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+# --------------------
+# Job stores
+# --------------------
+
+class InMemoryJobStore:
+    """
+    Job records in a dict; visible only to the process that created them.
+    Records not updated for max_age_seconds are dropped as new jobs arrive.
+    """
+
+    def __init__(self, max_age_seconds=24 * 3600):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.max_age_seconds = max_age_seconds
+
+    def create(self, job_id, record):
+        with self._lock:
+            cutoff = time.time() - self.max_age_seconds
+            for old_id in [i for i, r in self._jobs.items() if r.get("updated_at", 0) < cutoff]:
+                del self._jobs[old_id]
+            self._jobs[job_id] = dict(record)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+
+class FileJobStore:
+    """
+    Job records as JSON files under root, one per job. Any process that mounts
+    root can read and update them, so the API and the workers may be separate
+    processes. Records not updated for max_age_seconds are removed as new jobs
+    are created.
+    """
+
+    def __init__(self, root, max_age_seconds=24 * 3600):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def _write(self, job_id, record):
+        tmp_path = self._path(job_id) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(job_id))  # Pollers never read a partial record
+
+    def create(self, job_id, record):
+        with self._lock:
+            self.prune()
+            self._write(job_id, record)
+
+    def prune(self):
+        """Removes the records (and stray temporary files) last written more than max_age_seconds ago."""
+        cutoff = time.time() - self.max_age_seconds
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # Removed by another process
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self.get(job_id)
+            if record is None:
+                return  # Pruned
+            record.update(fields, updated_at=time.time())
+            self._write(job_id, record)
+
+    def get(self, job_id):
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+# --------------------
+# Queues
+# --------------------
+
+class InMemoryQueue:
+    """Job ids in a queue.Queue, for a single process. Nothing to acknowledge or recover."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, job_id):
+        self._queue.put(job_id)
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def heartbeat(self, job_id):
+        pass
+
+    def ack(self, job_id):
+        pass
+
+    def recover(self):
+        return [], []
+
+
+class FileQueue:
+    """
+    Job ids as files in root/pending, claimed by renaming them into root/claimed.
+    The rename is atomic, so several worker processes can share one queue
+    directory and each job is claimed once. Jobs are taken in submission order.
+
+    A claim is a lease: the worker refreshes it with heartbeat() while the job
+    runs and removes it with ack() when the job is done. recover() puts claims
+    not refreshed for lease_seconds (their worker died) back in pending, until a
+    job has been claimed max_attempts times.
+    """
+
+    def __init__(self, root, poll_seconds=0.5, lease_seconds=300, max_attempts=3):
+        self.pending = os.path.join(root, "pending")
+        self.claimed = os.path.join(root, "claimed")
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._claims = {}  # job_id -> claim file name, for the jobs this process holds
+        os.makedirs(self.pending, exist_ok=True)
+        os.makedirs(self.claimed, exist_ok=True)
+
+    @staticmethod
+    def _name(submitted, attempts, job_id):
+        # Submission time first, so a re-queued job keeps its place
+        return f"{submitted}-{attempts}-{job_id}"
+
+    @staticmethod
+    def _parse(name):
+        submitted, attempts, job_id = name.split("-", 2)
+        return submitted, int(attempts), job_id
+
+    def put(self, job_id):
+        name = self._name(f"{time.time_ns():020d}", 0, job_id)
+        open(os.path.join(self.pending, name), "w").close()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for name in sorted(os.listdir(self.pending)):
+                claim = os.path.join(self.claimed, name)
+                try:
+                    os.rename(os.path.join(self.pending, name), claim)
+                except OSError:
+                    continue  # Claimed by another worker first
+                os.utime(claim)  # The lease starts now, not at submission
+                job_id = self._parse(name)[2]
+                self._claims[job_id] = name
+                return job_id
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_seconds)
+
+    def heartbeat(self, job_id):
+        """Extends the lease on a job this process claimed."""
+        name = self._claims.get(job_id)
+        if name is not None:
+            try:
+                os.utime(os.path.join(self.claimed, name))
+            except OSError:
+                pass  # Recovered by another worker after a stall; it runs the job again
+
+    def ack(self, job_id):
+        """Removes the claim of a finished job."""
+        name = self._claims.pop(job_id, None)
+        if name is not None:
+            try:
+                os.remove(os.path.join(self.claimed, name))
+            except OSError:
+                pass
+
+    def recover(self):
+        """
+        Re-queues expired claims. Returns (requeued, abandoned) job ids; abandoned
+        jobs reached max_attempts and are dropped from the queue.
+        """
+        requeued, abandoned = [], []
+        cutoff = time.time() - self.lease_seconds
+        for name in os.listdir(self.claimed):
+            claim = os.path.join(self.claimed, name)
+            try:
+                if os.path.getmtime(claim) >= cutoff:
+                    continue
+                submitted, attempts, job_id = self._parse(name)
+                if attempts + 1 >= self.max_attempts:
+                    os.remove(claim)
+                    abandoned.append(job_id)
+                else:
+                    os.rename(claim, os.path.join(self.pending, self._name(submitted, attempts + 1, job_id)))
+                    requeued.append(job_id)
+            except (OSError, ValueError):
+                continue  # Recovered by another worker first, or not a claim
+        return requeued, abandoned
+
+
+# --------------------
+# Worker pool
+# --------------------
+
+class JobRunner:
+    """
+    Submit/poll front end over a job store, a queue and a pool of worker threads.
+
+    handler(job_id, payload, progress) does the work and returns a JSON-able result;
+    progress(stage, **details) records where the job is for pollers. Workers
+    start on the first submit, so importing the module costs nothing; with
+    workers=0 this process only submits and polls, and jobs run wherever
+    serve() drains the same store and queue. abandon(job_id, payload), when
+    given, is called for a job whose worker died max_attempts times, so its
+    inputs can be removed.
+    """
+
+    def __init__(self, handler, store, job_queue, workers=2, abandon=None):
+        self.handler = handler
+        self.store = store
+        self.queue = job_queue
+        self.workers = workers
+        self.abandon = abandon
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def serve(self):
+        """Runs the workers in this process until it is stopped."""
+        self.start()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, payload):
+        """Records a queued job for payload and returns its id."""
+        job_id = new_job_id()
+        now = time.time()
+        self.store.create(job_id, {
+            "job_id": job_id,
+            "status": "queued",
+            "progress": {"stage": "queued"},
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self.queue.put(job_id)
+        self.start()
+        return job_id
+
+    def status(self, job_id):
+        """The job record without its payload, or None for an unknown id."""
+        record = self.store.get(job_id)
+        if record is not None:
+            record.pop("payload", None)
+        return record
+
+    def _heartbeat(self, job_id, stop):
+        interval = getattr(self.queue, "lease_seconds", 300) / 3
+        while not stop.wait(interval):
+            self.queue.heartbeat(job_id)
+
+    def run_one(self, job_id):
+        record = self.store.get(job_id)
+        if record is None or record["status"] in ("succeeded", "failed"):
+            self.queue.ack(job_id)  # Pruned, or finished before a re-queue
+            return
+
+        def progress(stage, **details):
+            self.store.update(job_id, progress=dict(details, stage=stage))
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, stop), daemon=True)
+        heartbeat.start()
+        self.store.update(job_id, status="running", progress={"stage": "started"},
+                          attempts=record.get("attempts", 0) + 1)
+        try:
+            result = self.handler(job_id, record["payload"], progress)
+        except Exception as e:
+            print(f"[JOB] {job_id} failed: {e}\n{traceback.format_exc()}")
+            self.store.update(job_id, status="failed", error=str(e))
+        else:
+            self.store.update(job_id, status="succeeded", result=result, progress={"stage": "done"})
+        finally:
+            stop.set()
+            self.queue.ack(job_id)
+
+    def recover(self):
+        """Re-queues jobs whose worker died and fails those out of attempts."""
+        requeued, abandoned = self.queue.recover()
+        for job_id in requeued:
+            print(f"[JOB] {job_id} lost its worker; re-queued")
+            self.store.update(job_id, status="queued", progress={"stage": "requeued"})
+        for job_id in abandoned:
+            print(f"[JOB] {job_id} lost its worker too often; giving up")
+            record = self.store.get(job_id)
+            self.store.update(job_id, status="failed", error="The job's worker stopped before it finished.")
+            if self.abandon is not None and record is not None:
+                self.abandon(job_id, record["payload"])
+
+    def _work(self):
+        while True:
+            self.recover()
+            job_id = self.queue.get(timeout=1.0)
+            if job_id is not None:
+                self.run_one(job_id)
@@ -0,0 +1,240 @@
+# keys.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, union_categoricals
+
+KEY_COLUMNS = ["TAS", "USSGL_ACCOUNT"]
+MERGE_SOURCES = ["left_only", "right_only", "both"]
+# A whole number written with a zero fraction, as a float column prints it: 101000.0
+ZERO_FRACTION = r"^(-?[0-9]+)\.0+$"
+
+
+def canonical_key_text(values):
+    """
+    Key values as a categorical of their canonical text.
+
+    Each value becomes str(value) without a zero fraction, so 101000, 101000.0,
+    "101000" and "101000.0" are all "101000". Missing values stay missing. Only
+    the distinct values are formatted (for a categorical with more categories
+    than rows, only the categories in use); a categorical that is already
+    canonical text is returned as it is.
+
+    Args:
+        values (Series): Key column.
+
+    Returns:
+        Categorical: The canonical text of every value.
+    """
+    categorical = isinstance(values.dtype, pd.CategoricalDtype)
+    if categorical and len(values.cat.categories) > len(values):
+        # A few rows of a large dictionary: format only the categories they use
+        values = values.cat.remove_unused_categories()
+    if categorical:
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str).str.replace(ZERO_FRACTION, r"\1", regex=True).to_numpy()
+    if categorical and uniques.dtype == object and np.array_equal(text, uniques.to_numpy()):
+        return values.array
+    text_codes, categories = pd.factorize(text)
+    return pd.Categorical.from_codes(np.append(text_codes, -1)[codes], categories=categories)
+
+
+def _plain_numeric(dtype):
+    return is_numeric_dtype(dtype) and not is_bool_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+
+
+def comparable_keys(left, right):
+    """
+    One key column of both sides as categoricals of the same kind.
+
+    Numeric columns on both sides join by value, as in pd.merge: integer and
+    float columns are compared as float64. Any other combination (text, a
+    categorical, numbers against text) is compared as canonical_key_text.
+    """
+    if _plain_numeric(left.dtype) and _plain_numeric(right.dtype):
+        if left.dtype != right.dtype:
+            left, right = (values.to_numpy(dtype=float, na_value=np.nan) for values in (left, right))
+        return pd.Categorical(left), pd.Categorical(right)
+    return canonical_key_text(left), canonical_key_text(right)
+
+
+def key_hashes(df, on=KEY_COLUMNS):
+    """
+    Stable 64-bit hash of each row's key, taken over canonical_key_text.
+
+    Keys that join (see comparable_keys) hash equally whatever the column types,
+    so 101000 in an int column and "101000.0" in a text column land in the same
+    shard or bucket.
+
+    Args:
+        df (DataFrame): Rows to hash.
+        on (list): Key columns.
+
+    Returns:
+        ndarray: uint64 hash per row.
+    """
+    canonical = pd.DataFrame({col: canonical_key_text(df[col]) for col in on}, index=pd.RangeIndex(len(df)))
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+def bucket_ids(df, n_buckets, on=KEY_COLUMNS):
+    """Stable bucket number per row, derived from key_hashes."""
+    return key_hashes(df, on) % n_buckets
+
+
+def encode_keys(left, right, on):
+    """
+    Encodes the key columns of every row as one int64 key.
+
+    Each key column is brought to one comparable type (see comparable_keys) and
+    mapped onto a shared, sorted dictionary (the aligned categories when the
+    loaders produced them); the key is the mixed-radix number of those codes,
+    with one extra slot per column for missing values. Integer order is
+    therefore the order pd.merge sorts an outer join into (missing keys first
+    when both sides share one categorical dtype, last otherwise), and missing
+    keys match each other, as they do there.
+
+    Args:
+        left, right (DataFrame): The two sides of the join.
+        on (list): Key columns.
+
+    Returns:
+        tuple: (left_keys, right_keys, dictionaries); dictionaries maps each key
+            column to its (categories, nulls_first) pair for decode_keys.
+    """
+    left_keys = np.zeros(len(left), dtype=np.int64)
+    right_keys = np.zeros(len(right), dtype=np.int64)
+    dictionaries = {}
+    for col in on:
+        # pd.merge keeps (and sorts missing first) only keys of one categorical dtype
+        nulls_first = isinstance(left[col].dtype, pd.CategoricalDtype) and left[col].dtype == right[col].dtype
+        left_codes, right_codes = comparable_keys(left[col], right[col])
+        if not (left_codes.categories.equals(right_codes.categories)
+                and left_codes.categories.is_monotonic_increasing):
+            categories = union_categoricals([left_codes, right_codes], sort_categories=True).categories
+            left_codes = left_codes.set_categories(categories)
+            right_codes = right_codes.set_categories(categories)
+        categories = left_codes.categories
+        dictionaries[col] = (categories, nulls_first)
+
+        slots = len(categories) + 1
+        missing = -1 if nulls_first else len(categories)
+        for keys, codes in ((left_keys, left_codes.codes), (right_keys, right_codes.codes)):
+            keys *= slots
+            keys += np.where(codes < 0, missing, codes) + nulls_first
+    return left_keys, right_keys, dictionaries
+
+
+def decode_keys(keys, dictionaries):
+    """Inverse of encode_keys: one categorical per key column."""
+    decoded = {}
+    for col in reversed(list(dictionaries)):
+        categories, nulls_first = dictionaries[col]
+        keys, codes = np.divmod(keys, len(categories) + 1)
+        codes = codes - 1 if nulls_first else np.where(codes == len(categories), -1, codes)
+        decoded[col] = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+    return {col: decoded[col] for col in dictionaries}
+
+
+def outer_join_indexers(left_keys, right_keys):
+    """
+    Sorted outer join of two int64 key arrays.
+
+    Args:
+        left_keys, right_keys (ndarray): Keys from encode_keys.
+
+    Returns:
+        tuple: (left_rows, right_rows, keys), one entry per joined row in key order,
+            with -1 for the side a key is missing from. Keys repeated on both sides
+            give every pairing, left row major, as pd.merge does.
+    """
+    # Unstable sorts are enough unless a side repeats a key
+    left_order = np.argsort(left_keys)
+    right_order = np.argsort(right_keys)
+    left_sorted = left_keys[left_order]
+    right_sorted = right_keys[right_order]
+    left_repeats = bool(np.any(left_sorted[1:] == left_sorted[:-1]))
+    right_repeats = bool(np.any(right_sorted[1:] == right_sorted[:-1]))
+    if left_repeats:
+        left_order = np.argsort(left_keys, kind="stable")
+    if right_repeats:
+        right_order = np.argsort(right_keys, kind="stable")
+
+    keys = np.union1d(left_sorted, right_sorted)
+    left_at = np.searchsorted(keys, left_sorted)
+    right_at = np.searchsorted(keys, right_sorted)
+    if not (left_repeats or right_repeats):
+        left_rows = np.full(len(keys), -1, dtype=np.int64)
+        right_rows = np.full(len(keys), -1, dtype=np.int64)
+        left_rows[left_at] = left_order
+        right_rows[right_at] = right_order
+        return left_rows, right_rows, keys
+
+    left_count = np.bincount(left_at, minlength=len(keys))
+    right_count = np.bincount(right_at, minlength=len(keys))
+    left_width = np.maximum(left_count, 1)
+    right_width = np.maximum(right_count, 1)
+    rows = left_width * right_width
+
+    key_of_row = np.repeat(np.arange(len(keys)), rows)
+    offset = np.arange(len(key_of_row)) - np.repeat(np.cumsum(rows) - rows, rows)
+    width = right_width[key_of_row]
+    joined = []
+    for order, count, position in ((left_order, left_count, offset // width), (right_order, right_count, offset % width)):
+        start = (np.cumsum(count) - count)[key_of_row]
+        picked = order[np.minimum(start + position, len(order) - 1)] if len(order) else -1
+        joined.append(np.where(count[key_of_row] > 0, picked, -1))
+    return joined[0], joined[1], keys[key_of_row]
+
+
+def _take(values, rows):
+    if not isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        values = values.to_numpy()
+    else:
+        values = values.array
+    return take(values, rows, allow_fill=True)
+
+
+def outer_join(left, right, on, suffixes=("_x", "_y"), indicator=False):
+    """
+    pd.merge(left, right, on=on, how="outer") through integer keys.
+
+    Same rows, row order and columns, including the "_merge" indicator column when
+    indicator is set. Keys come back as categoricals when both sides had the same
+    categorical dtype and as objects otherwise. Unlike pd.merge, key columns of
+    different types on the two sides still join, as canonical text (see
+    comparable_keys).
+
+    Args:
+        left, right (DataFrame): The two sides of the join.
+        on (list): Key columns.
+        suffixes (tuple): Appended to non-key columns present on both sides.
+        indicator (bool): Add the "_merge" column.
+
+    Returns:
+        DataFrame: The joined rows with a RangeIndex.
+    """
+    left_keys, right_keys, dictionaries = encode_keys(left, right, on)
+    left_rows, right_rows, keys = outer_join_indexers(left_keys, right_keys)
+    decoded = decode_keys(keys, dictionaries)
+
+    columns = {}
+    for side, rows, other, suffix in ((left, left_rows, right, suffixes[0]), (right, right_rows, left, suffixes[1])):
+        for col in side.columns:
+            if col in on:
+                if side is left:
+                    categorical = dictionaries[col][1]  # Both sides of one categorical dtype
+                    columns[col] = decoded[col] if categorical else np.asarray(decoded[col], dtype=object)
+                continue
+            columns[col + suffix if col in other.columns else col] = _take(side[col], rows)
+    joined = pd.DataFrame(columns, index=pd.RangeIndex(len(keys)))
+    if indicator:
+        source = np.where((left_rows >= 0) & (right_rows >= 0), 2, np.where(left_rows >= 0, 0, 1))
+        joined["_merge"] = pd.Categorical.from_codes(source, categories=MERGE_SOURCES)
+    return joined
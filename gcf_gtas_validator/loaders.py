@@ -0,0 +1,213 @@
+# loaders.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from formats import FORMATS, detect_format  # noqa: F401  (re-exported)
+from keys import KEY_COLUMNS
+
+# Declared input schemas, by normalized column name. Keys and FUND are
+# dictionary-encoded text. Balances are "number": int64 when every value is a
+# whole number written without a fraction, float64 otherwise, so messages print
+# them as the file has them ("100", not "100.0"); a column with text in it stays
+# text, so validation can report the offending rows. A schema may also pin a
+# column to "int64", "float64" or "text" (see partitions.Partitions).
+ERP_SCHEMA = {"TAS": "category", "USSGL_ACCOUNT": "category", "FUND": "category", "NET_BALANCE": "number"}
+GTAS_SCHEMA = {"TAS": "category", "USSGL_ACCOUNT": "category", "GTAS_BALANCE": "number"}
+PINNED_TYPES = {"int64": "int64", "float64": "float64", "text": "string"}
+
+def normalize_columns(columns):
+    """Column names stripped and upper-cased, as every input is matched by them."""
+    return [col.strip().upper() for col in columns]
+
+
+def column_names(header, renames=None):
+    """
+    Maps raw column names to the names the schemas use.
+
+    Args:
+        header (list): Column names as they are in the file.
+        renames (dict): Raw name -> schema name, applied before normalizing.
+
+    Returns:
+        dict: Raw name -> normalized name.
+    """
+    renames = renames or {}
+    raw = list(header)
+    return dict(zip(raw, normalize_columns([renames.get(col, col) for col in raw])))
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _header(source, fmt):
+    if fmt == "csv":
+        header = list(pd.read_csv(source, nrows=0).columns)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        header = pq.read_schema(source).names
+    else:
+        import pyarrow.ipc as ipc
+        header = ipc.open_file(source).schema.names
+    _rewind(source)
+    return header
+
+
+def _dictionary_text(column):
+    """Arrow column -> dictionary<string>, so pandas receives a categorical of text."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_dictionary(column.type):
+        if pa.types.is_string(column.type.value_type) or pa.types.is_large_string(column.type.value_type):
+            return column
+        column = column.cast(column.type.value_type)
+    if pa.types.is_floating(column.type):
+        try:
+            column = pc.cast(column, pa.int64())  # 101000.0 -> 101000 when nulls forced a float column
+        except pa.ArrowInvalid:
+            pass
+    if not pa.types.is_string(column.type):
+        column = pc.cast(column, pa.string())
+    return column.dictionary_encode()
+
+
+def _number(column):
+    """Arrow column -> int64 or float64 where it holds numbers; text is left as it is."""
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if pa.types.is_null(column.type):
+        return column.cast(pa.float64())
+    if pa.types.is_integer(column.type):
+        return column.cast(pa.int64())
+    if pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+        return column.cast(pa.float64())
+    return column
+
+
+def _read_arrow(source, fmt, projected, schema, names):
+    import pyarrow as pa
+
+    if fmt == "csv":
+        import pyarrow.csv as csv
+        # Keys are parsed straight into dictionaries; balances are inferred (int64,
+        # double, or text when a value does not parse) so their formatting is kept
+        types = {raw: pa.dictionary(pa.int32(), pa.string()) if schema.get(names[raw]) == "category"
+                 else pa.type_for_alias(PINNED_TYPES[schema[names[raw]]])
+                 for raw in projected if schema.get(names[raw]) in ("category", *PINNED_TYPES)}
+        numbers = [raw for raw in projected if schema.get(names[raw]) == "number"]
+
+        def read(number_type=None):
+            _rewind(source)
+            column_types = dict(types, **{raw: number_type for raw in numbers}) if number_type else types
+            return csv.read_csv(source, convert_options=csv.ConvertOptions(
+                include_columns=projected, column_types=column_types, strings_can_be_null=True))
+        try:
+            table = read()
+        except pa.ArrowInvalid:
+            # Inference saw only the first block: a later fraction needs float64,
+            # a later non-numeric value needs text
+            try:
+                table = read(pa.float64())
+            except pa.ArrowInvalid:
+                table = read(pa.string())
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(source, columns=projected)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(source, columns=projected)
+
+    for i, raw in enumerate(table.column_names):
+        column = table.column(i)
+        if schema.get(names[raw]) == "category":
+            table = table.set_column(i, raw, _dictionary_text(column))
+        elif schema.get(names[raw]) == "number":
+            table = table.set_column(i, raw, _number(column))
+        elif schema.get(names[raw]) in PINNED_TYPES:
+            table = table.set_column(i, raw, column.cast(PINNED_TYPES[schema[names[raw]]]))
+    df = table.to_pandas()
+    for raw in df.columns:
+        if schema.get(names[raw]) in ("number", "text") and df[raw].dtype == object:
+            # Arrow's null text cells arrive as None; pd.read_csv gives NaN, which float() accepts
+            df[raw] = df[raw].where(df[raw].notna(), float("nan"))
+    return df
+
+
+def _read_pandas_csv(source, projected, schema, names):
+    pandas_types = {"category": "category", "int64": "int64", "float64": "float64", "text": str}
+    dtypes = {raw: pandas_types[schema[names[raw]]] for raw in projected if schema.get(names[raw]) in pandas_types}
+    return pd.read_csv(source, usecols=projected, dtype=dtypes)
+
+
+def read_trial_balance(source, schema, fmt=None, filename=None, columns=None, renames=None):
+    """
+    Loads a trial balance with the declared schema and column projection.
+
+    Parquet and Feather are read through pyarrow; CSV uses the pyarrow reader
+    when it is installed and the pandas C parser otherwise. Either way, only the
+    projected columns are parsed, and keys are parsed straight into dictionaries.
+
+    Columns outside the schema are dropped unless they are listed in columns,
+    which is what keeps ingest fast on wide ERP extracts; nothing downstream
+    reads them.
+
+    Args:
+        source (str | file-like): Path or open binary stream.
+        schema (dict): Column -> "category", "number" or a pinned type, e.g. ERP_SCHEMA.
+        fmt (str): 'csv', 'parquet' or 'feather'; detected from the file name when omitted.
+        filename (str): Name used for format detection when source is a stream.
+        columns (list): Normalized columns to load (defaults to the schema columns);
+            columns outside the schema load with their inferred types.
+        renames (dict): Raw column name -> schema name, for sources that name a
+            column differently (GTAS extracts' "USSGL").
+
+    Returns:
+        DataFrame: Normalized (stripped, upper-case) columns, keys as categoricals
+            of text, balances as int64 or float64 (or text, see ERP_SCHEMA).
+    """
+    fmt = fmt or detect_format(filename or (source if isinstance(source, str) else None))
+    if fmt not in ("csv", "parquet", "feather"):
+        raise ValueError(f"Unsupported input format: {fmt}")
+
+    header = _header(source, fmt)
+    names = column_names(header, renames)
+    wanted = set(columns) if columns is not None else set(schema)
+    projected = [raw for raw in header if names[raw] in wanted]
+
+    try:
+        import pyarrow  # noqa: F401
+        df = _read_arrow(source, fmt, projected, schema, names)
+    except ImportError:
+        if fmt != "csv":
+            raise
+        df = _read_pandas_csv(source, projected, schema, names)
+
+    df.columns = [names[raw] for raw in df.columns]
+    for col, dtype in schema.items():
+        if col in df.columns and dtype == "category" and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str).where(df[col].notna()).astype("category")
+    return df
+
+
+def align_key_categories(*frames):
+    """
+    Gives the key columns of every frame the same categories, so merges join on
+    the integer codes and the merged keys stay categorical. Categories are sorted,
+    so ordering by a key column is still lexical.
+    """
+    for col in KEY_COLUMNS:
+        present = [df for df in frames if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)]
+        if len(present) < 2:
+            continue
+        categories = union_categoricals([df[col] for df in present], sort_categories=True).categories
+        for df in present:
+            df[col] = df[col].cat.set_categories(categories)
+    return frames
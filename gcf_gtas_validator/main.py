@@ -1,18 +1,415 @@
 import functions_framework
 from flask import request, jsonify
-import pandas as pd
 import tempfile
 import os
-from validation_logic import validate_erp_vs_gtas
-from utils import upload_and_get_signed_url  # ✅ import from your new utils.py
+import shutil
+import threading
+import uuid
+# Only stdlib-backed modules load with the function; pandas, numpy, pyarrow and
+# google-cloud-storage are imported by warm_up() and the upload backend on first use
+from exception_store import ExceptionStore
+from formats import detect_format
+from jobs import FileJobStore, FileQueue, InMemoryJobStore, InMemoryQueue, JobRunner
+from instrumentation import Instrumentation
+from utils import GcsStorage, LocalStorage, upload_all
 
 # Config
 BUCKET_NAME = 'fedreconcile-reports'
+# Where outputs go: 'gcs' (BUCKET_NAME, signed URLs) or 'local' (LOCAL_STORAGE_DIR, file:// URLs)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'gcs')
+LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR', '/tmp/fedreconcile-storage')
+# Outputs are uploaded concurrently; large ones in resumable chunks of this size
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', '4'))
+UPLOAD_CHUNK_MB = int(os.environ.get('UPLOAD_CHUNK_MB', '8'))
+# Uploads larger than this (combined) are validated partition by partition
+STREAMING_THRESHOLD_MB = float(os.environ.get('STREAMING_THRESHOLD_MB', '256'))
+MEMORY_BUDGET_MB = float(os.environ.get('MEMORY_BUDGET_MB', '512'))
+# Where partition buckets are spilled; /tmp is memory-backed on Cloud Functions
+SPILL_DIR = os.environ.get('SPILL_DIR') or None
+# Worker processes for in-memory validation; 1 keeps it in the request process
+VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS', '1'))
+# Outputs stay in memory up to this size, then spill to SPILL_DIR
+OUTPUT_SPOOL_MB = float(os.environ.get('OUTPUT_SPOOL_MB', '64'))
+# FBDI journal compression: '' (plain CSV), 'gzip' or 'zip'
+FBDI_COMPRESSION = os.environ.get('FBDI_COMPRESSION') or None
+# Result cache for re-submissions, off unless RESULT_CACHE_MB is set. Cached runs validate
+# partition by partition, so error row numbers follow partition order, not the serial path's
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', '/tmp/fedreconcile-cache')
+RESULT_CACHE_MB = float(os.environ.get('RESULT_CACHE_MB', '0'))
+RESULT_CACHE_TTL_HOURS = float(os.environ.get('RESULT_CACHE_TTL_HOURS', '24'))
+# Indexed per-run exception store, paged through GET ?run_id=.... Off unless EXCEPTION_STORE_DIR
+# names a directory every instance shares (a mounted volume, as JOB_DIR): a run_id polled on
+# another instance has to find its run. Off, responses carry every error inline
+EXCEPTION_STORE_DIR = os.environ.get('EXCEPTION_STORE_DIR', '')
+EXCEPTION_STORE_TTL_HOURS = float(os.environ.get('EXCEPTION_STORE_TTL_HOURS', '24'))
+# With the store on, a response lists only the first RESPONSE_ERRORS errors
+RESPONSE_ERRORS = int(os.environ.get('RESPONSE_ERRORS', '1000'))
+# GTAS edit catalog (validators/registry.py), compiled at warm-up and run over every GTAS
+# upload; a response lists its first RESPONSE_ERRORS hits under 'edits'. '' turns it off
+GTAS_EDIT_RULES = os.environ.get('GTAS_EDIT_RULES',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validation_rules.json'))
+
+# Engine warm-up: 'background' imports the validation modules in a thread as the
+# instance loads; 'lazy' waits for the first request that needs them
+WARM_UP = os.environ.get('WARM_UP', 'background')
+
+# Async jobs (POST ?mode=async, then GET ?job_id=...). Job records, the queue and the saved
+# uploads live under JOB_DIR, which has to be a directory every instance and every job worker
+# shares (a mounted volume, standing in for a cloud queue): a poll may reach any instance.
+# Async mode is off while JOB_DIR is unset. JOB_BACKEND=memory keeps jobs in this instance,
+# for local testing only
+JOB_BACKEND = os.environ.get('JOB_BACKEND', 'filesystem')
+JOB_DIR = os.environ.get('JOB_DIR', '')
+# Jobs run in worker.py processes. The function's CPU is throttled once it has sent the 202,
+# so worker threads in the function (JOB_WORKERS > 0) only suit instances with CPU always on
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or (2 if JOB_BACKEND == 'memory' else 0))
+JOB_TTL_HOURS = float(os.environ.get('JOB_TTL_HOURS', '24'))
+# A claimed job whose worker stops heart-beating for this long is re-queued, up to JOB_MAX_ATTEMPTS runs
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '300'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+# Errors kept in a job's stored result; the exception report holds all of them
+JOB_RESULT_ERRORS = int(os.environ.get('JOB_RESULT_ERRORS', '1000'))
+
+# ?profile=1 and ?trace_memory=1 slow down every request on the instance (cProfile,
+# process-wide tracemalloc), so they are ignored unless an operator sets ALLOW_PROFILING=1
+ALLOW_PROFILING = os.environ.get('ALLOW_PROFILING', '').lower() in ('1', 'true', 'yes')
+
+if STORAGE_BACKEND == 'local':
+    storage = LocalStorage(LOCAL_STORAGE_DIR)
+else:
+    storage = GcsStorage(BUCKET_NAME, chunk_size=UPLOAD_CHUNK_MB * 1024 * 1024)
+
+exception_store = None
+if EXCEPTION_STORE_DIR:
+    exception_store = ExceptionStore(EXCEPTION_STORE_DIR, max_age_seconds=EXCEPTION_STORE_TTL_HOURS * 3600)
+
+result_cache = None
+rule_registry = None
+_warm_lock = threading.Lock()
+_warm = False
+
+def warm_up():
+    """
+    Imports the validation engine and prepares its shared state, once per instance.
+
+    Loads pandas and the validation modules, compiles the GTAS edit catalog and
+    opens the result cache. Later calls return at once; warm invocations reuse
+    all of it.
+    """
+    global _warm, result_cache, rule_registry
+    with _warm_lock:
+        if _warm:
+            return
+        import loaders  # noqa: F401  (pandas, pyarrow)
+        import parallel  # noqa: F401
+        import streaming  # noqa: F401
+        from cache import ResultCache
+
+        if GTAS_EDIT_RULES:
+            from validators.registry import load_registry
+            rule_registry = load_registry(GTAS_EDIT_RULES)
+        if RESULT_CACHE_MB > 0:
+            result_cache = ResultCache(RESULT_CACHE_DIR, max_bytes=int(RESULT_CACHE_MB * 1024 * 1024),
+                                       max_age_seconds=RESULT_CACHE_TTL_HOURS * 3600)
+        _warm = True
+
+if WARM_UP == 'background':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def _no_progress(stage, **details):
+    pass
+
+def _output_buffer():
+    return tempfile.SpooledTemporaryFile(max_size=int(OUTPUT_SPOOL_MB * 1024 * 1024), dir=SPILL_DIR)
+
+def reconcile_files(erp_path, erp_format, gtas_path, gtas_format, blob_prefix=None, progress=_no_progress,
+                    instrumentation=None):
+    """
+    Validates two trial balances, then serializes and uploads the outputs.
+
+    Outputs are written to spooled buffers (in memory up to OUTPUT_SPOOL_MB) and
+    streamed to storage, so nothing lands at a fixed local path.
+
+    Args:
+        erp_path, gtas_path (str | file-like): Saved uploads or seekable upload streams.
+        erp_format, gtas_format (str): 'csv', 'parquet' or 'feather'.
+        blob_prefix (str): Prefix of the uploaded blob names (defaults to a unique runs/<id>/).
+        progress (callable): progress(stage, **details), called as the run advances.
+        instrumentation (Instrumentation): Records and logs each stage (defaults to a new one);
+            closed when the run ends, so a failed run leaves no profiler or tracing behind.
+
+    Returns:
+        dict: The response body: is_valid, summary, errors, fbdi_file, exception_file,
+            metrics (per-stage wall/CPU time, rows and memory) and, with the exception
+            store on, run_id, under which every error can be queried; errors then
+            holds only the first RESPONSE_ERRORS. With the GTAS edit catalog on, edits
+            holds its first RESPONSE_ERRORS hits (row numbers are GTAS rows) and
+            summary counts them as edit_hits.
+    """
+    stages = instrumentation or Instrumentation()
+    try:
+        return _reconcile_files(erp_path, erp_format, gtas_path, gtas_format, blob_prefix, progress, stages)
+    finally:
+        stages.close()
+
+def _reconcile_files(erp_path, erp_format, gtas_path, gtas_format, blob_prefix, progress, stages):
+    with stages.stage('warm_up'):
+        warm_up()
+    from cache import file_digest, result_key, validate_cached
+    from fbdi import COMPRESSION_CONTENT_TYPES, COMPRESSION_SUFFIXES, FbdiWriter
+    from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories, read_trial_balance
+    from parallel import shared_executor, validate_erp_vs_gtas_parallel
+    from partitions import input_size
+    from streaming import validate_streaming
+    from validation_logic import validate_erp_vs_gtas
+
+    if blob_prefix is None:
+        blob_prefix = f'runs/{uuid.uuid4().hex}/'
+    fbdi_name = 'fbdi_journal_corrections' + COMPRESSION_SUFFIXES[FBDI_COMPRESSION]
+    fbdi_buffer = _output_buffer()
+    exceptions_buffer = _output_buffer()
+
+    input_mb = (input_size(erp_path) + input_size(gtas_path)) / (1024 * 1024)
+    if input_mb > STREAMING_THRESHOLD_MB and erp_format == gtas_format == 'csv':
+        # Validate partition by partition; outputs are written as each bucket finishes
+        progress('validating', streaming=True, input_mb=round(input_mb, 1))
+        store_writer = exception_store.writer(stages.run_id) if exception_store is not None else None
+        with stages.stage('validate_streaming') as record:
+            try:
+                is_valid, errors, summary, edits = validate_streaming(
+                    erp_path, gtas_path, exceptions_buffer, fbdi_buffer,
+                    memory_budget_mb=MEMORY_BUDGET_MB, spill_dir=SPILL_DIR, fbdi_compression=FBDI_COMPRESSION,
+                    max_errors=RESPONSE_ERRORS, registry=rule_registry,
+                    on_errors=None if store_writer is None else (
+                        lambda bucket_errors: store_writer.add(bucket_errors.to_frame(details=True)))
+                )
+            except BaseException:
+                if store_writer is not None:
+                    store_writer.abort()
+                raise
+            record['rows'] = summary['total_rows']
+        if store_writer is not None:
+            with stages.stage('store', rows=summary['errors']):
+                store_writer.close(summary)
+    else:
+        submission_key = None
+        cached = None
+        if result_cache is not None:
+            with stages.stage('cache_lookup'):
+                # The edit hits are cached with the results, so the catalog is part of the key
+                submission_key = result_key('submission', erp_format, file_digest(erp_path),
+                                            gtas_format, file_digest(gtas_path),
+                                            file_digest(GTAS_EDIT_RULES) if rule_registry is not None else '')
+                cached = result_cache.get(submission_key)
+
+        if cached is not None:
+            # Identical re-submission: skip loading and validation entirely
+            is_valid, errors, summary, fbdi_corrections, edits = cached
+            summary = dict(summary, cached=True)
+        else:
+            # Load with the declared schemas (projected columns, categorical keys, int64 or float64 balances)
+            progress('loading', input_mb=round(input_mb, 1))
+            with stages.stage('load') as record:
+                erp_df = read_trial_balance(erp_path, ERP_SCHEMA, fmt=erp_format)
+                gtas_df = read_trial_balance(gtas_path, GTAS_SCHEMA, fmt=gtas_format)
+                align_key_categories(erp_df, gtas_df)
+                record['rows'] = len(erp_df) + len(gtas_df)
+
+            # GTAS edits, in one pass over the upload with the catalog compiled at warm-up
+            edits = None
+            if rule_registry is not None:
+                with stages.stage('edits', rows=len(gtas_df)):
+                    edits = rule_registry.run(gtas_df)
+
+            # Validate; with the cache, only partitions whose keys changed are recomputed
+            progress('validating', erp_rows=len(erp_df), gtas_rows=len(gtas_df))
+            with stages.stage('validate', rows=len(erp_df) + len(gtas_df)):
+                # One pool per instance, started by the first parallel run and reused after
+                executor = shared_executor(VALIDATION_WORKERS) if VALIDATION_WORKERS > 1 else None
+                if result_cache is not None:
+                    is_valid, errors, summary, fbdi_corrections = validate_cached(
+                        erp_df, gtas_df, result_cache, workers=VALIDATION_WORKERS, executor=executor
+                    )
+                    result_cache.put(submission_key, (is_valid, errors, summary, fbdi_corrections, edits))
+                elif VALIDATION_WORKERS > 1:
+                    is_valid, errors, summary, fbdi_corrections = validate_erp_vs_gtas_parallel(
+                        erp_df, gtas_df, workers=VALIDATION_WORKERS, executor=executor
+                    )
+                else:
+                    is_valid, errors, summary, fbdi_corrections = validate_erp_vs_gtas(
+                        erp_df, gtas_df, instrumentation=stages
+                    )
+
+        # Serialize the correction files
+        progress('writing', errors=len(errors))
+        with stages.stage('write', rows=len(errors)):
+            with FbdiWriter(fbdi_buffer, FBDI_COMPRESSION) as fbdi:
+                fbdi.write(fbdi_corrections)
+            errors.to_frame().to_csv(exceptions_buffer, index=False)
+
+        if exception_store is not None:
+            # Every error goes to the store; the response carries the first RESPONSE_ERRORS
+            with stages.stage('store', rows=len(errors)):
+                exception_store.add(stages.run_id, errors.to_frame(details=True), summary)
+            summary = dict(summary, errors_truncated=len(errors) > RESPONSE_ERRORS)
+            errors = errors.head(RESPONSE_ERRORS)
+        if edits is not None:
+            summary = dict(summary, edit_hits=len(edits))
+            edits = edits.head(RESPONSE_ERRORS)
+
+    # Stream both buffers to storage concurrently & get their URLs
+    progress('uploading')
+    with stages.stage('upload'), fbdi_buffer, exceptions_buffer:
+        fbdi_url, exceptions_url = upload_all(storage, [
+            (fbdi_buffer, blob_prefix + fbdi_name, COMPRESSION_CONTENT_TYPES[FBDI_COMPRESSION]),
+            (exceptions_buffer, blob_prefix + 'exception_report.csv', 'text/csv'),
+        ], workers=UPLOAD_WORKERS)
+
+    with stages.stage('serialize', rows=len(errors)):
+        records = errors.to_records()
+    result = {
+        'is_valid': is_valid,
+        'summary': summary,
+        'errors': records,
+        'fbdi_file': fbdi_url,
+        'exception_file': exceptions_url,
+    }
+    if rule_registry is not None:
+        result['edits'] = edits.to_records()
+    if exception_store is not None:
+        result['run_id'] = stages.run_id
+    result['metrics'] = stages.summary()
+    return result
+
+def run_job(job_id, payload, progress):
+    """Job handler: reconciles the uploads saved at submit time, then removes them."""
+    try:
+        # Built in the worker thread, which is the one the profiler has to watch
+        instrumentation = Instrumentation(run_id=job_id, profile=payload.get('profile', False),
+                                          trace_memory=payload.get('trace_memory', False))
+        result = reconcile_files(
+            payload['erp_path'], payload['erp_format'], payload['gtas_path'], payload['gtas_format'],
+            blob_prefix=f'jobs/{job_id}/', progress=progress, instrumentation=instrumentation
+        )
+    finally:
+        _discard_inputs(job_id, payload)
+    # The record is re-read on every poll: keep it small
+    if len(result['errors']) > JOB_RESULT_ERRORS:
+        result['errors'] = result['errors'][:JOB_RESULT_ERRORS]
+        result['summary'] = dict(result['summary'], errors_truncated=True)
+    return result
+
+def _discard_inputs(job_id, payload):
+    shutil.rmtree(payload['input_dir'], ignore_errors=True)
+
+def make_job_runner(workers=JOB_WORKERS):
+    """The job runner for this configuration, or None while async mode is off."""
+    if JOB_BACKEND == 'memory':
+        store, job_queue = InMemoryJobStore(max_age_seconds=JOB_TTL_HOURS * 3600), InMemoryQueue()
+    elif JOB_DIR:
+        store = FileJobStore(os.path.join(JOB_DIR, 'records'), max_age_seconds=JOB_TTL_HOURS * 3600)
+        job_queue = FileQueue(os.path.join(JOB_DIR, 'queue'), lease_seconds=JOB_LEASE_SECONDS,
+                              max_attempts=JOB_MAX_ATTEMPTS)
+    else:
+        return None
+    return JobRunner(run_job, store, job_queue, workers=workers, abandon=_discard_inputs)
+
+JOBS_OFF = 'Async jobs are not enabled: JOB_DIR must name a directory shared by every instance and job worker.'
+job_runner = make_job_runner()
+
+def _flag(request, name):
+    # Per-request switches, from the query string or the form: ?profile=1
+    return (request.args.get(name) or request.form.get(name) or '').lower() in ('1', 'true', 'yes')
+
+def _diagnostics(request):
+    # The profiling switches of this request, honoured only where ALLOW_PROFILING is set
+    if not ALLOW_PROFILING:
+        return {'profile': False, 'trace_memory': False}
+    return {'profile': _flag(request, 'profile'), 'trace_memory': _flag(request, 'trace_memory')}
+
+def _submit_job(request, erp_file, erp_format, gtas_file, gtas_format):
+    if job_runner is None:
+        return jsonify({'error': JOBS_OFF}), 400
+    # Uploads must outlive the request, so they go to a job input directory the workers share
+    inputs_root = os.path.join(JOB_DIR, 'inputs') if JOB_DIR else None
+    if inputs_root is not None:
+        os.makedirs(inputs_root, exist_ok=True)
+    input_dir = tempfile.mkdtemp(dir=inputs_root)
+    erp_path = os.path.join(input_dir, f'erp.{erp_format}')
+    gtas_path = os.path.join(input_dir, f'gtas.{gtas_format}')
+    erp_file.save(erp_path)
+    gtas_file.save(gtas_path)
+
+    job_id = job_runner.submit({
+        'input_dir': input_dir,
+        'erp_path': erp_path, 'erp_format': erp_format,
+        'gtas_path': gtas_path, 'gtas_format': gtas_format,
+        **_diagnostics(request),
+    })
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'{request.base_url}?job_id={job_id}',
+    }), 202
+
+def _list_arg(args, name):
+    # ?status=Mismatch&status=Missing%20in%20ERP or ?status=Mismatch,Missing%20in%20ERP
+    return [value for raw in args.getlist(name) for value in raw.split(',') if value] or None
+
+def _number_arg(args, name, convert, default=None):
+    raw = args.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        return convert(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be a number, got {raw!r}')
+
+def _query_exceptions(args):
+    """GET ?run_id=...: one page of a run's stored errors, filtered by the query parameters."""
+    if exception_store is None:
+        return jsonify({'error': 'The exception store is not enabled.'}), 404
+    run_id = args['run_id']
+    try:
+        page = exception_store.query(
+            run_id,
+            status=_list_arg(args, 'status'),
+            severity=_list_arg(args, 'severity'),
+            tas_prefix=args.get('tas_prefix') or None,
+            ussgl_min=_number_arg(args, 'ussgl_min', int),
+            ussgl_max=_number_arg(args, 'ussgl_max', int),
+            min_amount=_number_arg(args, 'min_amount', float),
+            limit=_number_arg(args, 'limit', int, default=100),
+            cursor=_number_arg(args, 'cursor', int),
+            count=args.get('count', '').lower() in ('1', 'true', 'yes'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if page is None:
+        return jsonify({'error': f'Unknown or expired run: {run_id}'}), 404
+    return jsonify(page)
 
 @functions_framework.http
 def validate_gtas(request):
+    if request.method == 'GET':
+        if request.args.get('run_id'):
+            # Paged, filtered exceptions of a finished run: status, severity, tas_prefix,
+            # ussgl_min/ussgl_max, min_amount, limit and the previous page's cursor
+            return _query_exceptions(request.args)
+
+        # Job status poll
+        job_id = request.args.get('job_id')
+        if not job_id:
+            return jsonify({'error': 'job_id or run_id must be provided.'}), 400
+        if job_runner is None:
+            return jsonify({'error': JOBS_OFF}), 404
+        status = job_runner.status(job_id)
+        if status is None:
+            return jsonify({'error': f'Unknown job: {job_id}'}), 404
+        return jsonify(status)
+
     if request.method != 'POST':
-        return jsonify({'error': 'Only POST method is allowed.'}), 405
+        return jsonify({'error': 'Only GET and POST methods are allowed.'}), 405
 
     try:
         # Check for files in request
@@ -22,46 +419,20 @@ def validate_gtas(request):
         erp_file = request.files['erp_file']
         gtas_file = request.files['gtas_file']
 
-        # Save to temporary files
-        erp_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-        gtas_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-        erp_file.save(erp_temp.name)
-        gtas_file.save(gtas_temp.name)
-
-        # Load CSVs
-        erp_df = pd.read_csv(erp_temp.name)
-        gtas_df = pd.read_csv(gtas_temp.name)
+        # CSV, Parquet or Feather, detected from the uploaded file names
+        erp_format = detect_format(erp_file.filename)
+        gtas_format = detect_format(gtas_file.filename)
 
-        # Validate
-        is_valid, errors, summary, fbdi_corrections = validate_erp_vs_gtas(erp_df, gtas_df)
+        if (request.args.get('mode') or request.form.get('mode')) == 'async':
+            # Return a job id at once; a worker runs the reconciliation
+            return _submit_job(request, erp_file, erp_format, gtas_file, gtas_format)
 
-        # Save correction files locally
-        fbdi_path = '/tmp/fbdi_journal_corrections.csv'
-        fbdi_corrections.to_csv(fbdi_path, index=False)
-
-        exceptions_path = '/tmp/exception_report.csv'
-        pd.DataFrame(errors).to_csv(exceptions_path, index=False)
-
-        # Upload files & get signed URLs
-        fbdi_url = upload_and_get_signed_url(fbdi_path, BUCKET_NAME, 'fbdi_journal_corrections.csv')
-        exceptions_url = upload_and_get_signed_url(exceptions_path, BUCKET_NAME, 'exception_report.csv')
-
-        return jsonify({
-            'is_valid': is_valid,
-            'summary': summary,
-            'errors': errors,
-            'fbdi_file': fbdi_url,
-            'exception_file': exceptions_url,
-        })
+        # Parse the upload streams directly; no temp-file round trip. With ALLOW_PROFILING,
+        # ?profile=1 and ?trace_memory=1 add cProfile and tracemalloc figures to the metrics
+        instrumentation = Instrumentation(**_diagnostics(request))
+        return jsonify(reconcile_files(erp_file.stream, erp_format, gtas_file.stream, gtas_format,
+                                       instrumentation=instrumentation))
 
     except Exception as e:
         print(f"[ERROR] Exception during validation: {e}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
-
-    finally:
-        # Clean up
-        for path in [erp_temp.name, gtas_temp.name]:
-            try:
-                os.remove(path)
-            except Exception:
-                pass
\ No newline at end of file
@@ -0,0 +1,107 @@
+# parallel.py
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from keys import bucket_ids
+from validators.results import ErrorTable
+from validation_logic import (
+    REQUIRED_ERP_COLUMNS,
+    REQUIRED_GTAS_COLUMNS,
+    normalize_columns,
+    validate_erp_vs_gtas,
+)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executor(workers):
+    """
+    The process pool of this instance for the given worker count.
+
+    The pool is started on first use and kept for the life of the instance, so
+    warm invocations do not pay for forking and importing pandas in fresh workers.
+
+    Args:
+        workers (int): Process count.
+
+    Returns:
+        ProcessPoolExecutor: A running pool, shared by every caller with this count.
+    """
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+        return executor
+
+
+def split_by_key(df, n_shards):
+    """Splits a frame into n_shards frames by (TAS, USSGL_ACCOUNT) hash."""
+    ids = bucket_ids(df, n_shards)
+    return [df[ids == shard].reset_index(drop=True) for shard in range(n_shards)]
+
+
+def validate_erp_vs_gtas_parallel(erp_df, gtas_df, workers=None, shards=None, executor=None):
+    """
+    Runs validate_erp_vs_gtas over key shards in a process pool.
+
+    Each key lives in exactly one shard, so per-shard results are complete. Shards
+    are combined in shard order and error row numbers are offset by the rows of
+    the shards before them, so the output is the same whatever the worker timing.
+
+    Args:
+        erp_df (DataFrame): ERP trial balance.
+        gtas_df (DataFrame): GTAS trial balance.
+        workers (int): Process count (defaults to the CPU count).
+        shards (int): Number of key shards (defaults to workers).
+        executor (ProcessPoolExecutor): Optional running pool to reuse across calls.
+
+    Returns:
+        tuple: (is_valid, errors, summary, fbdi_corrections), as validate_erp_vs_gtas.
+    """
+    erp_df.columns = normalize_columns(erp_df.columns)
+    gtas_df.columns = normalize_columns(gtas_df.columns)
+    if not (REQUIRED_ERP_COLUMNS.issubset(erp_df.columns) and REQUIRED_GTAS_COLUMNS.issubset(gtas_df.columns)):
+        # Let the serial path report the missing columns
+        return validate_erp_vs_gtas(erp_df, gtas_df)
+
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    erp_shards = split_by_key(erp_df, shards)
+    gtas_shards = split_by_key(gtas_df, shards)
+
+    return combine_results(validate_shards(erp_shards, gtas_shards, workers, executor))
+
+
+def validate_shards(erp_shards, gtas_shards, workers=1, executor=None):
+    """validate_erp_vs_gtas for each shard pair, in a process pool when workers > 1."""
+    if (workers == 1 and executor is None) or len(erp_shards) <= 1:
+        return [validate_erp_vs_gtas(e, g) for e, g in zip(erp_shards, gtas_shards)]
+    pool = executor or ProcessPoolExecutor(max_workers=min(workers, len(erp_shards)))
+    try:
+        return list(pool.map(validate_erp_vs_gtas, erp_shards, gtas_shards))
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+
+def combine_results(results):
+    """
+    Combines per-shard validate_erp_vs_gtas results in shard order, offsetting
+    each shard's error rows by the rows of the shards before it.
+    """
+    errors = ErrorTable()
+    corrections = []
+    total_rows = 0
+    for _, shard_errors, shard_summary, shard_fbdi in results:
+        errors.extend(shard_errors.shift_rows(total_rows))
+        corrections.append(shard_fbdi)
+        total_rows += shard_summary["total_rows"]
+
+    fbdi_corrections = pd.concat(corrections, ignore_index=True)
+    summary = {"total_rows": total_rows, "errors": len(errors)}
+    return len(errors) == 0, errors, summary, fbdi_corrections
@@ -0,0 +1,165 @@
+# partitions.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import math
+import os
+
+import pandas as pd
+
+from keys import KEY_COLUMNS, bucket_ids
+from loaders import column_names, read_trial_balance
+
+# A validated bucket (both sides, the outer join and the result columns) takes
+# roughly this many times the CSV bytes it was parsed from.
+WORKING_SET_FACTOR = 8
+# Fraction of the budget a single chunk may use while partitioning.
+CHUNK_BUDGET_SHARE = 0.25
+SAMPLE_ROWS = 1000
+# File-wide type of a "number" column, from the narrowest to the widest
+NUMBER_TYPES = ["int64", "float64", "text"]
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def input_size(source):
+    """Size in bytes of a path or a seekable binary stream."""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    size = source.seek(0, os.SEEK_END)
+    source.seek(0)
+    return size
+
+
+def plan_partitions(sources, memory_budget_mb):
+    """
+    Chooses a bucket count and chunk size that keep every step within the budget.
+
+    Args:
+        sources (list): CSV inputs that will be partitioned (paths or seekable streams).
+        memory_budget_mb (float): Peak memory allowed for one bucket.
+
+    Returns:
+        tuple: (number of buckets, rows per read chunk).
+    """
+    budget = memory_budget_mb * 1024 * 1024
+    input_bytes = sum(input_size(source) for source in sources)
+    n_buckets = max(1, math.ceil(input_bytes * WORKING_SET_FACTOR / budget))
+
+    row_bytes = 1
+    for source in sources:
+        sample = pd.read_csv(source, nrows=SAMPLE_ROWS)
+        _rewind(source)
+        if len(sample):
+            row_bytes = max(row_bytes, sample.memory_usage(deep=True).sum() / len(sample))
+    chunksize = max(SAMPLE_ROWS, int(budget * CHUNK_BUDGET_SHARE / row_bytes))
+    return n_buckets, chunksize
+
+
+def read_header(source, renames=None):
+    """The normalized column names of a CSV (see loaders.column_names), without reading its rows."""
+    header = list(column_names(pd.read_csv(source, nrows=0).columns, renames).values())
+    _rewind(source)
+    return header
+
+
+def number_type(values):
+    """
+    The type read_trial_balance infers for a "number" column holding values.
+
+    Args:
+        values (Series): Cells as read from the CSV, as text (missing as NaN).
+
+    Returns:
+        str: "int64", "float64" or "text" (see NUMBER_TYPES).
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    if (numbers.isna() & values.notna()).any():
+        return "text"
+    return "int64" if numbers.dtype.kind in "iu" else "float64"
+
+
+class Partitions:
+    """
+    One CSV input, hash-partitioned into bucket files by partition_csv.
+
+    Attributes:
+        paths (list): Bucket file per bucket number; empty buckets have no file.
+        header (list): Normalized names of the partitioned columns.
+        schema (dict): The input schema, with every "number" column pinned to the
+            type it has over the whole file.
+    """
+
+    def __init__(self, paths, header, schema):
+        self.paths = paths
+        self.header = header
+        self.schema = schema
+
+    def read(self, bucket):
+        """
+        Loads one bucket through read_trial_balance, so it has the dtypes the
+        whole file would have in memory: categorical keys, and balances of the
+        file-wide type (a bucket of whole numbers from a file that has fractions
+        elsewhere is still float64).
+        """
+        path = self.paths[bucket]
+        if os.path.exists(path):
+            return read_trial_balance(path, self.schema, fmt="csv")
+        dtypes = {"category": "category", "int64": "int64", "float64": "float64", "text": object}
+        return pd.DataFrame({col: pd.Series(dtype=dtypes[self.schema[col]]) for col in self.header})
+
+
+def partition_csv(source, out_dir, prefix, n_buckets, chunksize, schema, renames=None):
+    """
+    Hash-partitions a CSV by (TAS, USSGL_ACCOUNT) into bucket files.
+
+    Only the schema's columns are kept (column projection, as in the in-memory
+    loaders), with their names normalized. Every cell is copied as the text it
+    was, and keys are hashed as canonical key text (keys.bucket_ids), so equal
+    keys land in the same bucket on both sides whatever their formatting. The
+    type each "number" column has over the whole file is recorded on the way.
+
+    Args:
+        source (str | file-like): CSV to partition; a stream is read in chunks as it is.
+        out_dir (str): Directory that receives the bucket files.
+        prefix (str): File name prefix for this input's buckets.
+        n_buckets (int): Number of buckets.
+        chunksize (int): Rows read per chunk.
+        schema (dict): Input schema (loaders.ERP_SCHEMA or GTAS_SCHEMA).
+        renames (dict): Raw column name -> schema name (see loaders.read_trial_balance).
+
+    Returns:
+        Partitions: The bucket files.
+
+    Raises:
+        ValueError: A key column is missing.
+    """
+    names = column_names(pd.read_csv(source, nrows=0).columns, renames)
+    _rewind(source)
+    missing = set(KEY_COLUMNS) - set(names.values())
+    if missing:
+        label = os.path.basename(source) if isinstance(source, str) else prefix
+        raise ValueError(f"{label} is missing key columns: {', '.join(sorted(missing))}")
+
+    projected = [raw for raw, name in names.items() if name in schema]
+    header = [names[raw] for raw in projected]
+    numbers = [col for col in header if schema[col] == "number"]
+    types = {}
+
+    bucket_paths = [os.path.join(out_dir, f"{prefix}_{i:04d}.csv") for i in range(n_buckets)]
+    written = set()
+    for chunk in pd.read_csv(source, chunksize=chunksize, usecols=projected, dtype=str):
+        chunk.columns = [names[raw] for raw in chunk.columns]
+        for col in numbers:
+            types[col] = max(types.get(col, 0), NUMBER_TYPES.index(number_type(chunk[col])))
+        for bucket, part in chunk.groupby(bucket_ids(chunk, n_buckets), sort=False):
+            part.to_csv(bucket_paths[bucket], mode="a", header=bucket not in written, index=False)
+            written.add(bucket)
+
+    # A file without rows reads as float64, as an all-null column does in memory
+    pinned = {col: NUMBER_TYPES[types.get(col, 1)] for col in numbers}
+    return Partitions(bucket_paths, header, {col: pinned.get(col, schema[col]) for col in header})
@@ -0,0 +1,116 @@
+# streaming.py
+
+import tempfile
+
+import pandas as pd
+
+from fbdi import FbdiWriter
+from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories
+from partitions import partition_csv, plan_partitions, read_header
+from validators.results import ErrorTable
+from validation_logic import (
+    REQUIRED_ERP_COLUMNS,
+    REQUIRED_GTAS_COLUMNS,
+    validate_erp_vs_gtas,
+)
+
+
+def _append_csv(df, target, first):
+    if isinstance(target, str):
+        df.to_csv(target, mode='w' if first else 'a', header=first, index=False)
+    else:
+        df.to_csv(target, header=first, index=False)  # An open stream just keeps growing
+
+
+def validate_streaming(erp_path, gtas_path, exceptions_path, fbdi_path,
+                       memory_budget_mb=512, spill_dir=None, max_errors=1000, fbdi_compression=None,
+                       on_errors=None, registry=None):
+    """
+    Validates ERP vs GTAS CSVs one hash partition at a time.
+
+    Errors and FBDI corrections are appended to their CSV outputs as each bucket
+    finishes, so neither the inputs nor the full error list are ever held in memory.
+    Error row numbers are offset per bucket so they stay unique across the run.
+    With a registry, its GTAS edits run over each GTAS bucket as it is loaded;
+    their row numbers are offset by the GTAS rows of the buckets before.
+
+    Buckets are loaded with the dtypes of the in-memory path (see
+    partitions.Partitions.read). Balances that the join upcasts because a key is
+    missing on one side are upcast per bucket, though, so a message may print
+    "100" here where the in-memory run of the same files prints "100.0".
+
+    Args:
+        erp_path (str | file-like): ERP trial balance CSV, as a path or an upload stream.
+        gtas_path (str | file-like): GTAS trial balance CSV, as a path or an upload stream.
+        exceptions_path (str | file-like): CSV that receives every error.
+        fbdi_path (str | file-like): Target of the FBDI corrections (see FbdiWriter).
+        memory_budget_mb (float): Peak memory allowed for one bucket.
+        spill_dir (str): Directory for bucket files (defaults to the system temp dir).
+        max_errors (int): Number of errors returned in memory for the response.
+        fbdi_compression (str): None, 'gzip' or 'zip' for the FBDI output.
+        on_errors (callable): Called with each bucket's ErrorTable (row ids already
+            offset), e.g. to persist the errors as they are found.
+        registry (RuleRegistry): GTAS edit catalog to run (see validators.registry).
+
+    Returns:
+        tuple: (is_valid, ErrorTable of the first max_errors errors, summary, ErrorTable
+            of the first max_errors edit hits). With a registry, summary counts them
+            as edit_hits.
+    """
+    erp_header = read_header(erp_path)
+    gtas_header = read_header(gtas_path)
+    for label, header, required in (("ERP", erp_header, REQUIRED_ERP_COLUMNS),
+                                    ("GTAS", gtas_header, REQUIRED_GTAS_COLUMNS)):
+        if not required.issubset(header):
+            missing = required - set(header)
+            errors = ErrorTable().append({"row": None, "message": f"Missing {label} columns: {', '.join(missing)}"})
+            errors.to_frame().to_csv(exceptions_path, index=False)
+            if on_errors is not None:
+                on_errors(errors)
+            FbdiWriter(fbdi_path, fbdi_compression).close()
+            return False, errors, {"total_rows": 0, "errors": len(errors)}, ErrorTable()
+
+    n_buckets, chunksize = plan_partitions([erp_path, gtas_path], memory_budget_mb)
+    summary = {"total_rows": 0, "errors": 0, "partitions": n_buckets}
+    error_sample = ErrorTable()
+    edit_sample = ErrorTable()
+    gtas_rows = 0
+    if registry is not None:
+        summary["edit_hits"] = 0
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as work_dir, FbdiWriter(fbdi_path, fbdi_compression) as fbdi:
+        erp_parts = partition_csv(erp_path, work_dir, "erp", n_buckets, chunksize, ERP_SCHEMA)
+        gtas_parts = partition_csv(gtas_path, work_dir, "gtas", n_buckets, chunksize, GTAS_SCHEMA)
+
+        for bucket in range(n_buckets):
+            # Loaded as the in-memory path loads whole files: categorical keys, file-wide balance types
+            erp_df = erp_parts.read(bucket)
+            gtas_df = gtas_parts.read(bucket)
+            if erp_df.empty and gtas_df.empty:
+                continue
+            align_key_categories(erp_df, gtas_df)
+
+            if registry is not None:
+                edits = registry.run(gtas_df).shift_rows(gtas_rows)
+                edit_sample.extend(edits.head(max_errors - len(edit_sample)))
+                summary["edit_hits"] += len(edits)
+            gtas_rows += len(gtas_df)
+
+            _, errors, bucket_summary, fbdi_corrections = validate_erp_vs_gtas(erp_df, gtas_df)
+            errors = errors.shift_rows(summary["total_rows"])
+
+            if len(errors):
+                _append_csv(errors.to_frame(), exceptions_path, first=summary["errors"] == 0)
+                if on_errors is not None:
+                    on_errors(errors)
+                error_sample.extend(errors.head(max_errors - len(error_sample)))
+                summary["errors"] += len(errors)
+            fbdi.write(fbdi_corrections)
+            summary["total_rows"] += bucket_summary["total_rows"]
+
+    # Keep the exceptions output present even when nothing was written
+    if summary["errors"] == 0:
+        _append_csv(pd.DataFrame(), exceptions_path, first=True)
+
+    summary["errors_truncated"] = summary["errors"] > len(error_sample)
+    return summary["errors"] == 0, error_sample, summary, edit_sample
@@ -1,12 +1,151 @@
 # utils.py
 
-from google.cloud import storage
-from google.auth import default
+import mimetypes
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from pathlib import Path
+
+# Uploads at least this large go up as chunked, resumable sessions
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+# Resumable chunk size; GCS requires a multiple of 256 KiB
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+# Content types of compressed files, by the encoding mimetypes reports for their suffix
+ENCODING_CONTENT_TYPES = {"gzip": "application/gzip", "bzip2": "application/x-bzip2", "xz": "application/x-xz"}
+
+_client_lock = threading.Lock()
+_credentials = None
+_client = None
+
+
+def get_storage_client():
+    """
+    The process-wide GCS client and its credentials, created on first use.
+
+    Warm invocations reuse both, so auth discovery and connection setup are paid
+    once per instance rather than once per upload.
+
+    Returns:
+        tuple: (storage.Client, credentials)
+    """
+    global _client, _credentials
+    with _client_lock:
+        if _client is None:
+            from google.auth import default
+            from google.cloud import storage
+
+            # Use default credentials — picks up your deployed service account
+            _credentials, _ = default()
+            _client = storage.Client(credentials=_credentials)
+        return _client, _credentials
+
+
+def _stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+class GcsStorage:
+    """
+    Google Cloud Storage backend. Objects are returned as signed URLs.
+
+    Streams of RESUMABLE_THRESHOLD bytes or more are sent as resumable uploads in
+    chunk_size pieces; a failed chunk is retried from the last committed offset
+    instead of restarting the whole object.
+    """
+
+    def __init__(self, bucket_name, chunk_size=DEFAULT_CHUNK_SIZE, expiration_minutes=60):
+        self.bucket_name = bucket_name
+        self.chunk_size = chunk_size
+        self.expiration_minutes = expiration_minutes
+
+    def upload(self, stream, blob_name, content_type):
+        """
+        Uploads a seekable binary stream and returns a signed URL for it.
+
+        Args:
+            stream (file-like): Binary stream; it is rewound before the upload.
+            blob_name (str): Destination path for the blob in the bucket.
+            content_type (str): MIME type stored on the blob and served with the
+                signed URL (text/csv, application/gzip, application/zip, ...).
+
+        Returns:
+            str: Signed URL for the uploaded blob.
+        """
+        from google.cloud.storage.retry import DEFAULT_RETRY
+
+        if not content_type:
+            raise ValueError(f"No content type given for {blob_name}")
+        print(f"[UPLOAD] Uploading to gs://{self.bucket_name}/{blob_name}")
+        client, credentials = get_storage_client()
+        stream.seek(0)
+        chunk_size = self.chunk_size if _stream_size(stream) >= RESUMABLE_THRESHOLD else None
+        blob = client.bucket(self.bucket_name).blob(blob_name, chunk_size=chunk_size)
+        # Blob names are unique per run, so retrying an interrupted upload is safe
+        blob.upload_from_file(stream, content_type=content_type, retry=DEFAULT_RETRY)
+
+        url = blob.generate_signed_url(
+            expiration=timedelta(minutes=self.expiration_minutes),
+            credentials=credentials
+        )
+        print(f"[UPLOAD] Generated signed URL: {url}")
+        return url
+
+
+class LocalStorage:
+    """
+    Filesystem stand-in for GcsStorage, for local runs, tests and benchmarks.
+    Objects are written under root and returned as file:// URLs.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def upload(self, stream, blob_name, content_type):
+        path = os.path.join(self.root, blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stream.seek(0)
+        with open(path + ".part", "wb") as f:
+            shutil.copyfileobj(stream, f, DEFAULT_CHUNK_SIZE)
+        os.replace(path + ".part", path)
+        return Path(path).resolve().as_uri()
+
+
+def upload_all(storage, uploads, workers=4):
+    """
+    Uploads several streams concurrently.
+
+    Args:
+        storage (GcsStorage | LocalStorage): Backend to upload to.
+        uploads (list): (stream, blob_name, content_type) tuples.
+        workers (int): Maximum concurrent uploads.
+
+    Returns:
+        list: One URL per upload, in input order.
+    """
+    if workers <= 1 or len(uploads) <= 1:
+        return [storage.upload(*upload) for upload in uploads]
+    with ThreadPoolExecutor(max_workers=min(workers, len(uploads))) as pool:
+        return list(pool.map(lambda upload: storage.upload(*upload), uploads))
+
+
+def guess_content_type(name):
+    """The MIME type of a file name: a compressed file is its compression's type (data.csv.gz is application/gzip)."""
+    content_type, encoding = mimetypes.guess_type(name)
+    if encoding is not None:
+        return ENCODING_CONTENT_TYPES.get(encoding, "application/octet-stream")
+    return content_type or "application/octet-stream"
+
 
 def upload_and_get_signed_url(local_path, bucket_name, blob_name, expiration_minutes=60):
     """
     Uploads a local file to a Google Cloud Storage bucket and generates a signed URL.
+    The content type is guessed from the blob name (see guess_content_type).
 
     Args:
         local_path (str): Absolute path to the local file.
@@ -17,21 +156,7 @@ def upload_and_get_signed_url(local_path, bucket_name, blob_name, expiration_min
     Returns:
         str: Signed URL for the uploaded file.
     """
-    print(f"[UPLOAD] Uploading {local_path} to gs://{bucket_name}/{blob_name}")
-
-    # Use default credentials — picks up your deployed service account
-    credentials, _ = default()
-
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-
-    blob.upload_from_filename(local_path)
-
-    url = blob.generate_signed_url(
-        expiration=timedelta(minutes=expiration_minutes),
-        credentials=credentials
-    )
-
-    print(f"[UPLOAD] Generated signed URL: {url}")
-    return url
\ No newline at end of file
+    with open(local_path, "rb") as f:
+        return GcsStorage(bucket_name, expiration_minutes=expiration_minutes).upload(
+            f, blob_name, guess_content_type(blob_name)
+        )
@@ -1,75 +1,127 @@
 import pandas as pd
 import numpy as np
 
-def validate_erp_vs_gtas(erp_df: pd.DataFrame, gtas_df: pd.DataFrame):
-    errors = []
+from fbdi import build_fbdi_journal
+from instrumentation import no_instrumentation
+from keys import outer_join
+from loaders import normalize_columns
+from validators.results import ErrorTable
 
-    # --- Normalize column names ---
-    erp_df.columns = [col.strip().upper() for col in erp_df.columns]
-    gtas_df.columns = [col.strip().upper() for col in gtas_df.columns]
+REQUIRED_ERP_COLUMNS = {"USSGL_ACCOUNT", "FUND", "TAS", "NET_BALANCE"}
+REQUIRED_GTAS_COLUMNS = {"USSGL_ACCOUNT", "TAS", "GTAS_BALANCE"}
 
-    print("ERP columns after uppercasing:", list(erp_df.columns))
-    print("GTAS columns after uppercasing:", list(gtas_df.columns))
+def parse_floats(values):
+    """
+    float() of every value, parsed once per distinct value. Returns the floats and
+    the float() error message for values it rejects (None where it succeeds).
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = np.full(len(uniques), np.nan)
+    messages = np.full(len(uniques), None, dtype=object)
+    for i, value in enumerate(uniques):
+        try:
+            parsed[i] = float(value)
+        except Exception as e:
+            messages[i] = str(e)
+    floats, errors = parsed[codes], messages[codes]
 
-    # --- Check required columns ---
-    required_erp_cols = {"USSGL_ACCOUNT", "FUND", "TAS", "NET_BALANCE"}
-    required_gtas_cols = {"USSGL_ACCOUNT", "TAS", "GTAS_BALANCE"}
+    # factorize folds NaN, None and pd.NA together; check those cells individually
+    for i in np.flatnonzero(pd.isna(values)):
+        try:
+            floats[i], errors[i] = float(values[i]), None
+        except Exception as e:
+            floats[i], errors[i] = np.nan, str(e)
+    return floats, errors
+
+def validate_erp_vs_gtas(erp_df: pd.DataFrame, gtas_df: pd.DataFrame, instrumentation=None):
+    errors = ErrorTable()
+    stages = instrumentation or no_instrumentation()
 
-    if not required_erp_cols.issubset(erp_df.columns):
-        missing = required_erp_cols - set(erp_df.columns)
+    # --- Normalize column names ---
+    erp_df.columns = normalize_columns(erp_df.columns)
+    gtas_df.columns = normalize_columns(gtas_df.columns)
+
+    # --- Check required columns ---
+    if not REQUIRED_ERP_COLUMNS.issubset(erp_df.columns):
+        missing = REQUIRED_ERP_COLUMNS - set(erp_df.columns)
         errors.append({"row": None, "message": f"Missing ERP columns: {', '.join(missing)}"})
         return False, errors, {"total_rows": 0, "errors": len(errors)}, pd.DataFrame()
 
-    if not required_gtas_cols.issubset(gtas_df.columns):
-        missing = required_gtas_cols - set(gtas_df.columns)
+    if not REQUIRED_GTAS_COLUMNS.issubset(gtas_df.columns):
+        missing = REQUIRED_GTAS_COLUMNS - set(gtas_df.columns)
         errors.append({"row": None, "message": f"Missing GTAS columns: {', '.join(missing)}"})
         return False, errors, {"total_rows": 0, "errors": len(errors)}, pd.DataFrame()
 
-    # --- Merge DataFrames on USSGL_ACCOUNT & TAS ---
-    merged_df = pd.merge(
-        erp_df,
-        gtas_df,
-        on=["USSGL_ACCOUNT", "TAS"],
-        how="outer",
-        indicator=True,
-        suffixes=('_ERP', '_GTAS'),
-    )
+    # --- Outer-join on USSGL_ACCOUNT & TAS through integer keys ---
+    with stages.stage("merge", rows=len(erp_df) + len(gtas_df)):
+        merged_df = outer_join(
+            erp_df,
+            gtas_df,
+            on=["USSGL_ACCOUNT", "TAS"],
+            indicator=True,
+            suffixes=('_ERP', '_GTAS'),
+        )
 
-    print("Merged DataFrame dtypes:\n", merged_df.dtypes)
-    print("First few rows of merged DataFrame:\n", merged_df.head())
+    with stages.stage("compare", rows=len(merged_df)):
+        # --- Check for unmatched rows ---
+        source = merged_df["_merge"].to_numpy()
+        unmatched = source != "both"
+        only_gtas = (source[unmatched] != "left_only").astype(np.int8)
+        errors.add(
+            merged_df.index[unmatched],
+            ["Row mismatch: exists only in ERP data.", "Row mismatch: exists only in GTAS data."],
+            codes=only_gtas,
+            # Not in the messages; kept for the exception store's filters (to_frame(details=True))
+            values={
+                "STATUS": np.array(["Missing in GTAS", "Missing in ERP"], dtype=object)[only_gtas],
+                "USSGL_ACCOUNT": merged_df["USSGL_ACCOUNT"].to_numpy(dtype=object)[unmatched],
+                "TAS": merged_df["TAS"].to_numpy(dtype=object)[unmatched],
+                "NET_BALANCE": merged_df["NET_BALANCE"].to_numpy(dtype=object)[unmatched],
+                "GTAS_BALANCE": merged_df["GTAS_BALANCE"].to_numpy(dtype=object)[unmatched],
+            },
+        )
 
-    # --- Check for unmatched rows ---
-    unmatched_rows = merged_df[merged_df["_merge"] != "both"]
-    for idx, row in unmatched_rows.iterrows():
-        errors.append({
-            "row": int(idx),
-            "message": f"Row mismatch: exists only in {'ERP' if row['_merge'] == 'left_only' else 'GTAS'} data."
-        })
+        # --- Compare balances with zero tolerance ---
+        matched = ~unmatched
+        matched_rows = merged_df[matched]
+        net_bal = matched_rows["NET_BALANCE"].to_numpy(dtype=object)
+        gtas_bal = matched_rows["GTAS_BALANCE"].to_numpy(dtype=object)
+        net_float, net_error = parse_floats(net_bal)
+        gtas_float, gtas_error = parse_floats(gtas_bal)
+        compare_error = np.where(net_error != None, net_error, gtas_error)  # noqa: E711
+        failed = compare_error != None  # noqa: E711
+        mismatch = ~failed & ~np.isclose(net_float, gtas_float, atol=0.0)
 
-    # --- Compare balances with zero tolerance ---
-    matched_rows = merged_df[merged_df["_merge"] == "both"]
-    for idx, row in matched_rows.iterrows():
-        net_bal = row["NET_BALANCE"]
-        gtas_bal = row["GTAS_BALANCE"]
-
-        try:
-            if not np.isclose(float(net_bal), float(gtas_bal), atol=0.0):
-                errors.append({
-                    "row": int(idx),
-                    "message": (
-                        f"Balance mismatch at USSGL {row['USSGL_ACCOUNT']}, TAS {row['TAS']}: "
-                        f"ERP NET_BALANCE={net_bal}, GTAS_BALANCE={gtas_bal}"
-                    )
-                })
-        except Exception as e:
-            errors.append({
-                "row": int(idx),
-                "message": f"Error comparing balances at row {idx}: {str(e)}"
-            })
+        # One code per matched row keeps mismatches and comparison errors in row order
+        flagged = mismatch | failed
+        errors.add(
+            matched_rows.index[flagged],
+            [
+                "Balance mismatch at USSGL {USSGL_ACCOUNT}, TAS {TAS}: ERP NET_BALANCE={NET_BALANCE}, GTAS_BALANCE={GTAS_BALANCE}",
+                "Error comparing balances at row {ROW}: {ERROR}",
+            ],
+            codes=failed[flagged].astype(np.int8),
+            values={
+                "USSGL_ACCOUNT": matched_rows["USSGL_ACCOUNT"].to_numpy(dtype=object)[flagged],
+                "TAS": matched_rows["TAS"].to_numpy(dtype=object)[flagged],
+                "NET_BALANCE": net_bal[flagged],
+                "GTAS_BALANCE": gtas_bal[flagged],
+                "ROW": matched_rows.index.to_numpy()[flagged],
+                "ERROR": compare_error[flagged],
+                "STATUS": np.where(failed[flagged], "Comparison error", "Mismatch").astype(object),
+                "DIFFERENCE": (net_float - gtas_float)[flagged],
+            },
+        )
 
-    # --- Build corrected FBDI DataFrame ---
-    fbdi_corrections = matched_rows.copy()
-    fbdi_corrections["CORRECTED_AMOUNT"] = matched_rows["GTAS_BALANCE"]
+    # --- Build FBDI correction lines for the balance mismatches ---
+    with stages.stage("fbdi", rows=int(mismatch.sum())):
+        fbdi_corrections = build_fbdi_journal(
+            matched_rows["USSGL_ACCOUNT"].array[mismatch],
+            matched_rows["FUND"].array[mismatch],
+            matched_rows["TAS"].array[mismatch],
+            net_float[mismatch] - gtas_float[mismatch],
+            "Correcting Mismatch",
+        )
 
     is_valid = len(errors) == 0
     summary = {"total_rows": len(merged_df), "errors": len(errors)}
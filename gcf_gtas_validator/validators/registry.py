@@ -0,0 +1,243 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from keys import canonical_key_text
+from .results import ErrorTable
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'validation_rules.json')
+
+# --------------------
+# Prepared frame
+# --------------------
+
+class PreparedFrame:
+    """
+    Read-only view of a submission shared by every rule in a catalog run.
+
+    String and numeric casts are computed once per column, on first use, and then
+    reused. String tests are evaluated once per distinct value and broadcast back
+    to the rows through the factorized codes. Six-digit account values are also
+    held as int32 numbers, so account prefix and equality tests are integer range
+    comparisons.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        if 'row_identifier' in df.columns:
+            self.row_ids = df['row_identifier'].to_numpy()
+        else:
+            self.row_ids = df.index.to_numpy()
+        self._factorized = {}
+        self._accounts = {}
+        self._numbers = {}
+        self._nulls = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def has(self, column: str) -> bool:
+        return column in self.df.columns
+
+    def null(self, column: str) -> np.ndarray:
+        if column not in self._nulls:
+            self._nulls[column] = self.df[column].isna().to_numpy()
+        return self._nulls[column]
+
+    def number(self, column: str) -> np.ndarray:
+        if column not in self._numbers:
+            self._numbers[column] = pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float)
+        return self._numbers[column]
+
+    def _dictionary(self, column: str):
+        if column not in self._factorized:
+            # As the key join reads values: 101000, 101000.0 and "101000" are all "101000"
+            text = canonical_key_text(self.df[column])
+            self._factorized[column] = (text.codes, pd.Series(text.categories, dtype=object))
+        return self._factorized[column]
+
+    def text_test(self, column: str, test: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+        """
+        Applies test to the text of each distinct value (canonical_key_text, so
+        without a zero fraction). Missing values never match.
+        """
+        codes, text = self._dictionary(column)
+        outcomes = np.asarray(test(text), dtype=bool)
+        return np.append(outcomes, False)[codes]
+
+    def account_test(self, column: str, low: int, high: int, test: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+        """
+        text_test for a test equivalent to low <= account < high on six-digit values.
+        Distinct values that are not six digits fall back to test.
+        """
+        codes, text = self._dictionary(column)
+        if column not in self._accounts:
+            six_digits = text.str.fullmatch(r"[0-9]{6}").to_numpy(dtype=bool)
+            numbers = np.full(len(text), -1, dtype=np.int32)
+            numbers[six_digits] = text[six_digits].astype(np.int32).to_numpy()
+            self._accounts[column] = numbers
+        numbers = self._accounts[column]
+        outcomes = (numbers >= low) & (numbers < high)
+        odd = numbers < 0
+        if odd.any():
+            outcomes[odd] = np.asarray(test(text[odd]), dtype=bool)
+        return np.append(outcomes, False)[codes]
+
+# --------------------
+# Predicate compilation
+# --------------------
+
+def _text(test_factory, account_range=None):
+    def op(column, value):
+        test = test_factory(value)
+        bounds = account_range(value) if account_range is not None else None
+        if bounds is not None:
+            return lambda frame: frame.account_test(column, *bounds, test)
+        return lambda frame: frame.text_test(column, test)
+    return op
+
+
+def _account_prefix(value, exact=False):
+    """[low, high) of the six-digit accounts starting with (or equal to) value, or None."""
+    value = str(value)
+    if not re.fullmatch(r"[0-9]{6}" if exact else r"[0-9]{1,6}", value):
+        return None
+    scale = 10 ** (6 - len(value))
+    return int(value) * scale, (int(value) + 1) * scale
+
+
+def _numeric(compare):
+    def op(column, value):
+        def evaluate(frame):
+            with np.errstate(invalid='ignore'):
+                return compare(frame.number(column), value)
+        return evaluate
+    return op
+
+
+PREDICATE_OPS = {
+    "is_null": lambda column, value: lambda frame: frame.null(column),
+    "not_null": lambda column, value: lambda frame: ~frame.null(column),
+    "equals": _text(lambda value: lambda s: s == str(value), lambda value: _account_prefix(value, exact=True)),
+    "in": _text(lambda values: lambda s: s.isin([str(v) for v in values])),
+    "starts_with": _text(lambda value: lambda s: s.str.startswith(str(value)), _account_prefix),
+    "shorter_than": _text(lambda length: lambda s: s.str.len() < int(length)),
+    # Missing balances count as non-zero, as np.isclose(NaN, 0) is False
+    "nonzero": _numeric(lambda x, _: ~np.isclose(x, 0)),
+    "lt": _numeric(lambda x, v: x < float(v)),
+    "gt": _numeric(lambda x, v: x > float(v)),
+    "between": _numeric(lambda x, v: (x >= float(v[0])) & (x <= float(v[1]))),
+}
+
+
+def compile_predicate(spec: Dict):
+    """
+    Compiles a declarative predicate into a function of a PreparedFrame that
+    returns a boolean mask. A predicate is a leaf
+    {"column": ..., "op": ..., "value": ...} or a combination
+    {"all": [...]}, {"any": [...]} or {"not": {...}}.
+
+    Returns:
+        tuple: (compiled function, set of columns the predicate reads).
+    """
+    if "all" in spec or "any" in spec:
+        combine = np.logical_and if "all" in spec else np.logical_or
+        parts = [compile_predicate(part) for part in spec["all" if "all" in spec else "any"]]
+        columns = set().union(*(cols for _, cols in parts))
+        fns = [fn for fn, _ in parts]
+        return (lambda frame: combine.reduce([fn(frame) for fn in fns]) if fns else np.ones(len(frame), bool)), columns
+    if "not" in spec:
+        fn, columns = compile_predicate(spec["not"])
+        return (lambda frame: ~fn(frame)), columns
+
+    op = spec.get("op")
+    if op not in PREDICATE_OPS:
+        raise ValueError(f"Unknown predicate op: {op!r}")
+    return PREDICATE_OPS[op](spec["column"], spec.get("value")), {spec["column"]}
+
+# --------------------
+# Registry
+# --------------------
+
+class CompiledRule:
+    """One catalog edit with its predicate compiled."""
+
+    def __init__(self, rule: Dict):
+        predicate = rule["Predicate"]
+        if isinstance(predicate, str):  # Tables such as CSV/Excel hold the predicate as JSON text
+            predicate = json.loads(predicate)
+        self.rule = rule
+        self.edit_number = str(rule.get("Edit Number"))
+        self.validation_number = rule.get("Validation Number")
+        self.severity = rule.get("Severity")
+        self.message = rule.get("Edit Message")
+        self.predicate, self.columns = compile_predicate(predicate)
+
+    def evaluate(self, frame: PreparedFrame) -> np.ndarray:
+        return np.asarray(self.predicate(frame), dtype=bool)
+
+
+class RuleRegistry:
+    """
+    Compiled catalog of USSGL-level edits. Runs every edit in one pass over a
+    shared PreparedFrame instead of copying the submission once per edit.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        self.rules = []
+        self.uncompiled = []  # Catalog entries without a predicate
+        for rule in rules:
+            if rule.get("Predicate"):
+                self.rules.append(CompiledRule(rule))
+            else:
+                self.uncompiled.append(rule)
+
+    @classmethod
+    def from_json(cls, path: str) -> "RuleRegistry":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_frame(cls, table: pd.DataFrame) -> "RuleRegistry":
+        """Builds a registry from a tabular catalog, one edit per row."""
+        return cls(table.replace({np.nan: None}).to_dict(orient="records"))
+
+    def get(self, edit_number) -> "CompiledRule":
+        for compiled in self.rules:
+            if compiled.edit_number == str(edit_number):
+                return compiled
+        return None
+
+    def run(self, df: pd.DataFrame, rules: List[CompiledRule] = None) -> ErrorTable:
+        """Evaluates the catalog (or the given subset) against df and returns the hits."""
+        frame = PreparedFrame(df)
+        errors = ErrorTable()
+        for compiled in (self.rules if rules is None else rules):
+            missing = sorted(col for col in compiled.columns if not frame.has(col))
+            if missing:
+                errors.append({
+                    "row": "N/A",
+                    "validation_number": compiled.validation_number,
+                    "error": f"Required columns {missing} missing."
+                })
+                continue
+
+            errors.add_message(
+                frame.row_ids[compiled.evaluate(frame)],
+                compiled.message,
+                message_field="error_message",
+                validation_number=compiled.validation_number,
+                severity=compiled.severity,
+            )
+        return errors
+
+
+@lru_cache(maxsize=None)
+def load_registry(path: str = DEFAULT_RULES_PATH) -> RuleRegistry:
+    """Loads and compiles a rule catalog once per process."""
+    return RuleRegistry.from_json(path)
@@ -0,0 +1,169 @@
+from string import Formatter
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+
+def _escape(message: str) -> str:
+    return str(message).replace('{', '{{').replace('}', '}}')
+
+
+def _render(template: str, values: Dict[str, np.ndarray], size: int) -> np.ndarray:
+    """Formats template for every row at once; each {field} is str() of values[field]."""
+    out = np.full(size, '', dtype=object)
+    for literal, field, _, _ in Formatter().parse(template):
+        if literal:
+            out = out + literal
+        if field is not None:
+            out = out + pd.Series(values[field], dtype=object).astype(str).to_numpy()
+    return out
+
+
+class _Block:
+    """Errors produced by one mask: shared fields plus per-row ids and message codes."""
+
+    __slots__ = ('rows', 'codes', 'templates', 'values', 'message_field', 'fields')
+
+    def __init__(self, rows, codes, templates, values, message_field, fields):
+        self.rows = rows
+        self.codes = codes
+        self.templates = templates
+        self.values = values
+        self.message_field = message_field
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.rows)
+
+    def take(self, selector) -> "_Block":
+        return _Block(
+            self.rows[selector], self.codes[selector], self.templates,
+            {name: column[selector] for name, column in self.values.items()},
+            self.message_field, self.fields,
+        )
+
+    def messages(self) -> np.ndarray:
+        out = np.empty(len(self.rows), dtype=object)
+        for code, template in enumerate(self.templates):
+            selected = self.codes == code
+            if selected.any():
+                out[selected] = _render(template, {name: column[selected] for name, column in self.values.items()},
+                                        int(selected.sum()))
+        return out
+
+
+class ErrorTable:
+    """
+    Columnar collection of validation errors.
+
+    Errors are stored as arrays of row ids and message codes per producing mask,
+    with the validation number, severity and message templates kept once per
+    mask. Dicts (the historical list-of-dicts shape) and frames are only built
+    when iterated or converted, so a submission with hundreds of thousands of
+    hits costs a few arrays until the response or report actually needs them.
+    """
+
+    def __init__(self, blocks=None):
+        self._blocks = list(blocks or [])
+
+    def add(self, rows, templates, codes=None, values=None, message_field="message", **fields) -> "ErrorTable":
+        """
+        Adds one error per entry of rows.
+
+        Args:
+            rows (array-like): Row identifiers of the hits.
+            templates (str | list): Message, or list of message templates selected per row
+                by codes. Templates reference values with {field} placeholders.
+            codes (array-like): Index into templates for each row (default: all 0).
+            values (dict): Per-row arrays referenced by the templates.
+            message_field (str): Record key that receives the rendered message.
+            **fields: Constants shared by every error of this block, e.g. severity.
+        """
+        rows = np.asarray(rows).astype(np.int64)
+        if not len(rows):
+            return self
+        if isinstance(templates, str):
+            templates = [templates]
+        codes = np.zeros(len(rows), dtype=np.int8) if codes is None else np.asarray(codes)
+        values = {name: np.asarray(column, dtype=object) for name, column in (values or {}).items()}
+        self._blocks.append(_Block(rows, codes, tuple(templates), values, message_field, fields))
+        return self
+
+    def add_message(self, rows, message, message_field="message", **fields) -> "ErrorTable":
+        """Adds one error per row, all with the same literal message."""
+        return self.add(rows, _escape(message), message_field=message_field, **fields)
+
+    def append(self, record: Dict) -> "ErrorTable":
+        """Adds a single pre-built record, e.g. a missing-column error with no row."""
+        self._blocks.append(dict(record))
+        return self
+
+    def extend(self, other: "ErrorTable") -> "ErrorTable":
+        self._blocks.extend(other._blocks)
+        return self
+
+    def __len__(self):
+        return sum(len(block) if isinstance(block, _Block) else 1 for block in self._blocks)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for block in self._blocks:
+            if isinstance(block, dict):
+                yield dict(block)
+                continue
+            for row, message in zip(block.rows.tolist(), block.messages()):
+                yield {"row": row, **block.fields, block.message_field: message}
+
+    def to_records(self) -> List[Dict]:
+        """The errors as a list of dicts, ready for jsonify."""
+        return list(self)
+
+    def to_frame(self, details: bool = False) -> pd.DataFrame:
+        """
+        The errors as a DataFrame with one column per record key. With details, the
+        per-row values each block was added with (TAS, balances, ...) are included
+        as further columns, missing where a block did not have them.
+        """
+        frames = []
+        for block in self._blocks:
+            if isinstance(block, dict):
+                frames.append(pd.DataFrame([block]))
+                continue
+            columns = {"row": block.rows}
+            for name, value in block.fields.items():
+                columns[name] = pd.Categorical.from_codes(np.zeros(len(block), dtype=np.int8), [value]) \
+                    if value is not None else np.full(len(block), None, dtype=object)
+            columns[block.message_field] = block.messages()
+            if details:
+                for name, column in block.values.items():
+                    columns.setdefault(name, column)
+            frames.append(pd.DataFrame(columns))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def head(self, n: int) -> "ErrorTable":
+        """The first n errors."""
+        blocks = []
+        for block in self._blocks:
+            if n <= 0:
+                break
+            if isinstance(block, dict):
+                blocks.append(block)
+                n -= 1
+            else:
+                blocks.append(block.take(slice(0, n)))
+                n -= len(blocks[-1])
+        return ErrorTable(blocks)
+
+    def shift_rows(self, offset: int) -> "ErrorTable":
+        """A copy with every row id moved by offset, for combining partition results."""
+        blocks = []
+        for block in self._blocks:
+            if isinstance(block, dict):
+                blocks.append(block)
+            else:
+                shifted = block.take(slice(None))
+                shifted.rows = shifted.rows + offset
+                blocks.append(shifted)
+        return ErrorTable(blocks)
@@ -0,0 +1,27 @@
+# worker.py
+#
+# Runs the async jobs validate_gtas queues under JOB_DIR. Start it with the
+# function's environment, on an instance whose CPU is not throttled between
+# requests (a VM, or Cloud Run with CPU always allocated) and with JOB_DIR on
+# the volume the function mounts:
+#
+#     python worker.py
+#
+# Each process runs JOB_WORKERS worker threads (2 unless set). Jobs a dead
+# worker held are re-queued by the others once their lease expires.
+
+import os
+
+import main
+
+
+def serve():
+    runner = main.make_job_runner(workers=int(os.environ.get('JOB_WORKERS') or 2))
+    if runner is None:
+        raise SystemExit(main.JOBS_OFF)
+    main.warm_up()
+    runner.serve()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,430 @@
+"""
+Batch reconciliation of many GTAS/ERP submissions (agencies x periods) in one
+run. A manifest lists the input pairs; each pair is reconciled as run_validation
+would, gets its own exception report and FBDI journal, and its exceptions are
+added to one consolidated exception store: the Cloud Function's indexed store
+(exception_store.py), holding each submission as a run that can be paged and
+filtered on its own.
+
+Inputs named by more than one manifest entry (an agency-wide ERP extract shared
+by its TAS-level GTAS files, say) are parsed once: in the parent before the
+worker pool forks, and otherwise once per worker process. The compiled GTAS edit
+tables are likewise built once per process.
+
+Submissions run on a process pool under a memory budget: each is charged an
+estimated working set (input bytes times WORKING_SET_FACTOR, see partitions.py)
+and starts only while the running total fits, largest first. A submission too
+large for the budget on its own runs alone through the streaming path, with the
+budget as its memory limit; the streaming path partitions CSV only, so an
+oversized Parquet or Feather pair is loaded whole. A failed submission is recorded and the batch goes on.
+
+Manifest (CSV or JSON, a list of objects or {"submissions": [...]}), one entry
+per pair; relative paths are resolved against the manifest's directory. A
+submission_id names the submission's output directory and store run, so it may
+hold only letters, digits, '_' and '-':
+
+    submission_id,agency,period,gtas_path,erp_path
+    020-2025-09,020,2025-09,gtas/020_sep.csv,erp/020_sep.csv
+
+Usage:
+    python batch.py manifest.csv output_dir [--workers 4] [--memory-budget-mb 4096]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from exception_store import RUN_ID_PATTERN, ExceptionStore
+from instrumentation import Instrumentation
+from prototype import (
+    ERP_SCHEMA,
+    GTAS_COLUMN_RENAMES,
+    GTAS_SCHEMA,
+    align_key_categories,
+    generate_exception_report,
+    generate_fbdi_file,
+    read_trial_balance,
+    streamable,
+    validate_and_reconcile,
+    write_exception_report,
+)
+from streaming import WORKING_SET_FACTOR, ReportRuns, reconcile_streaming
+
+MANIFEST_COLUMNS = ['submission_id', 'agency', 'period', 'gtas_path', 'erp_path']
+# Columnar inputs are compressed; they expand more than CSV when loaded
+COLUMNAR_EXPANSION = 4
+DEFAULT_MEMORY_SHARE = 0.5  # Of MemAvailable, when no budget is given
+FALLBACK_MEMORY_BUDGET_MB = 2048
+
+# Consolidated store: an ExceptionStore (exception_store.py, shared with the Cloud
+# Function) under <output_dir>/exceptions/, one run per submission
+STORE_DIR = 'exceptions'
+SUBMISSION_FIELDS = ['submission_id', 'agency', 'period']
+STORE_COLUMNS = SUBMISSION_FIELDS + ['seq', 'row_id', 'status', 'severity', 'tas', 'ussgl', 'erp_balance',
+                                     'gtas_balance', 'amount', 'message']
+
+# Parsed shared inputs, keyed by (role, path, size, mtime); inherited by forked workers
+_shared_frames = {}
+
+
+# --- Manifest ---
+def check_submission_id(submission_id):
+    """Raises ValueError unless submission_id is a valid store run id: letters, digits, '_' and '-'."""
+    if not RUN_ID_PATTERN.fullmatch(str(submission_id)):
+        raise ValueError(f"Invalid submission_id: {submission_id!r}")
+
+
+def load_manifest(path):
+    """Reads a CSV or JSON manifest into a list of submission dicts with absolute paths."""
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries['submissions']
+    else:
+        entries = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+
+    base = os.path.dirname(os.path.abspath(path))
+    submissions = []
+    seen = set()
+    for number, entry in enumerate(entries, start=1):
+        missing = [key for key in ('gtas_path', 'erp_path') if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Manifest entry {number} is missing {', '.join(missing)}")
+        submission = {key: str(entry.get(key) or '') for key in MANIFEST_COLUMNS}
+        for key in ('gtas_path', 'erp_path'):
+            submission[key] = os.path.normpath(os.path.join(base, submission[key]))
+        if not submission['submission_id']:
+            parts = [submission['agency'], submission['period']]
+            submission['submission_id'] = '_'.join(p for p in parts if p) or f'submission_{number}'
+        try:
+            check_submission_id(submission['submission_id'])
+        except ValueError as e:
+            raise ValueError(f"Manifest entry {number}: {e}") from None
+        if submission['submission_id'] in seen:
+            raise ValueError(f"Duplicate submission_id in manifest: {submission['submission_id']}")
+        seen.add(submission['submission_id'])
+        submissions.append(submission)
+    return submissions
+
+
+# --- Memory planning ---
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo, or None where it cannot be read."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def estimate_working_set_mb(submission):
+    """Approximate peak memory of reconciling one submission in memory."""
+    total = 0
+    for key in ('gtas_path', 'erp_path'):
+        path = submission[key]
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        columnar = os.path.splitext(path)[1].lower() not in ('.csv', '.txt')
+        total += size * WORKING_SET_FACTOR * (COLUMNAR_EXPANSION if columnar else 1)
+    return total / (1024 * 1024)
+
+
+# --- Shared inputs ---
+def _file_key(role, path):
+    stat = os.stat(path)
+    return role, path, stat.st_size, stat.st_mtime_ns
+
+
+def _read_input(role, path):
+    if role == 'gtas':
+        return read_trial_balance(path, GTAS_SCHEMA, renames=GTAS_COLUMN_RENAMES)
+    return read_trial_balance(path, ERP_SCHEMA)
+
+
+def shared_inputs(submissions):
+    """(role, path) pairs named by more than one submission."""
+    counts = {}
+    for submission in submissions:
+        for role in ('gtas', 'erp'):
+            key = (role, submission[f'{role}_path'])
+            counts[key] = counts.get(key, 0) + 1
+    return {key for key, count in counts.items() if count > 1}
+
+
+def _load_input(role, path, shared):
+    # Shared inputs are parsed once per process; callers get a shallow copy, so
+    # aligning categories replaces columns on the copy, not on the cached frame
+    if (role, path) not in shared:
+        return _read_input(role, path)
+    key = _file_key(role, path)
+    if key not in _shared_frames:
+        _shared_frames[key] = _read_input(role, path)
+    return _shared_frames[key].copy(deep=False)
+
+
+def preload_shared_inputs(shared):
+    """Parses the shared inputs in this process, so forked workers start with them."""
+    for role, path in sorted(shared):
+        try:
+            _load_input(role, path, shared)
+        except Exception as e:
+            # The submissions that need it will report the error
+            print(f"Could not preload {path}: {e}")
+
+
+# --- Consolidated exception store ---
+def _text_column(exceptions, col):
+    if col not in exceptions.columns:
+        return pd.Series('', index=exceptions.index, dtype=object)
+    return exceptions[col].astype(object).fillna('').astype(str)
+
+
+def store_frame(exceptions):
+    """
+    A submission's exceptions in the store's error columns (see
+    exception_store.store_records). The GTAS edit messages become the message,
+    fatal ones first, or the STATUS where there are none; severity is 'Fatal'
+    or 'Advisory' as for the Cloud Function's rules. DIFFERENCE is left out, so
+    the stored amount is NET_BALANCE - GTAS_BALANCE as there, not the
+    GTAS-minus-ERP difference of the report.
+    """
+    fatal = _text_column(exceptions, 'GTAS_FATAL_ERROR').to_numpy()
+    advisory = _text_column(exceptions, 'GTAS_ADVISORY_NOTE').to_numpy()
+    status = _text_column(exceptions, 'STATUS').to_numpy()
+    has_fatal = fatal != ''
+    has_advisory = advisory != ''
+    message = np.where(has_fatal & has_advisory, fatal + '; ' + advisory, fatal + advisory)
+    columns = {
+        'STATUS': status,
+        'severity': np.select([has_fatal, has_advisory], ['Fatal', 'Advisory'], None),
+        'message': np.where(message == '', status, message),
+    }
+    for col in ('TAS', 'USSGL_ACCOUNT', 'NET_BALANCE', 'GTAS_BALANCE'):
+        if col in exceptions.columns:
+            columns[col] = exceptions[col].to_numpy(dtype=object)
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(exceptions)))
+
+
+def _run_summary(submission, summary):
+    return dict({field: submission[field] for field in SUBMISSION_FIELDS}, **summary)
+
+
+def write_store_run(exceptions, submission, store, summary=None):
+    """Writes one submission's exceptions to the store as the run submission_id."""
+    return store.add(submission['submission_id'], store_frame(exceptions),
+                     _run_summary(submission, summary or {'exceptions': len(exceptions)}))
+
+
+def load_exception_store(store_dir, submission_ids=None):
+    """
+    Reads the consolidated exceptions, optionally only those of submission_ids,
+    as one frame of STORE_COLUMNS. Each submission can also be paged and
+    filtered through ExceptionStore(store_dir).query(submission_id, ...).
+    """
+    frames = []
+    store = ExceptionStore(store_dir) if os.path.isdir(store_dir) else None
+    for submission_id in store.runs() if store is not None else []:
+        if submission_ids is not None and submission_id not in submission_ids:
+            continue
+        records = store.read(submission_id)
+        run = store.run(submission_id)
+        if records is None or run is None or records.empty:
+            continue
+        fields = {field: (run['summary'] or {}).get(field, '') for field in SUBMISSION_FIELDS}
+        frames.append(records.assign(**dict(fields, submission_id=submission_id))[STORE_COLUMNS])
+    if not frames:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- Submission runner ---
+def run_submission(submission, output_dir, shared=frozenset(), memory_budget_mb=None):
+    """
+    Reconciles one manifest entry into <output_dir>/<submission_id>/ and adds its
+    exceptions to the store. With memory_budget_mb, the pair is reconciled in
+    partitions (see streaming.py). Returns a result dict like run_validation's,
+    plus the submission fields and exception counts.
+    """
+    submission_id = submission['submission_id']
+    check_submission_id(submission_id)
+    out_dir = os.path.join(output_dir, submission_id)
+    os.makedirs(out_dir, exist_ok=True)
+    report_path = os.path.join(out_dir, 'exception_report.xlsx')
+    fbdi_path = os.path.join(out_dir, 'fbdi_journal.csv')
+    stages = Instrumentation(run_id=submission_id)
+    result = dict(submission)
+
+    try:
+        if memory_budget_mb is not None:
+            # As run_streaming_validation: each bucket's exceptions go to a sorted
+            # report run and to the store as the bucket finishes
+            store = ExceptionStore(os.path.join(output_dir, STORE_DIR))
+            with tempfile.TemporaryDirectory(dir=out_dir) as runs_dir, store.writer(submission_id) as writer:
+                runs = ReportRuns(runs_dir)
+
+                def add_exceptions(exceptions):
+                    runs.add(exceptions)
+                    writer.add(store_frame(exceptions))
+
+                with stages.stage('streaming') as record:
+                    summary = reconcile_streaming(submission['gtas_path'], submission['erp_path'], None,
+                                                  fbdi_path, memory_budget_mb=memory_budget_mb,
+                                                  on_exceptions=add_exceptions)
+                    record['rows'] = summary['gtas_rows'] + summary['erp_rows']
+                with stages.stage('report', rows=runs.n_rows):
+                    report_path = write_exception_report(runs.rows(), runs.n_rows, runs.widths, report_path)
+                with stages.stage('store', rows=summary['exceptions']):
+                    writer.close(_run_summary(submission, summary))
+            n_exceptions = summary['exceptions']
+            result.update(summary=summary, streamed=True)
+        else:
+            with stages.stage('load') as record:
+                gtas_df = _load_input('gtas', submission['gtas_path'], shared)
+                erp_df = _load_input('erp', submission['erp_path'], shared)
+                align_key_categories(gtas_df, erp_df)
+                record['rows'] = len(gtas_df) + len(erp_df)
+            with stages.stage('reconcile', rows=len(gtas_df) + len(erp_df)):
+                exceptions = validate_and_reconcile(gtas_df, erp_df, instrumentation=stages)
+            with stages.stage('report', rows=len(exceptions)):
+                report_path = generate_exception_report(exceptions, report_path)
+            with stages.stage('fbdi', rows=len(exceptions)):
+                generate_fbdi_file(exceptions, fbdi_path)
+            with stages.stage('store', rows=len(exceptions)):
+                write_store_run(exceptions, submission, ExceptionStore(os.path.join(output_dir, STORE_DIR)))
+            n_exceptions = len(exceptions)
+
+        result.update(
+            success=True,
+            message="Validation complete. Reports generated.",
+            exceptions=n_exceptions,
+            exception_report_path=report_path,
+            fbdi_journal_path=fbdi_path,
+        )
+    except Exception as e:
+        print(f"Error during validation of {submission_id}: {e}")
+        result.update(success=False, message=f"Validation process failed: {e}")
+    result['metrics'] = stages.summary()
+    return result
+
+
+# --- Batch runner ---
+def _pool_context():
+    # Forked workers inherit the preloaded shared inputs and compiled edit tables
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def run_batch(manifest, output_dir, workers=None, memory_budget_mb=None):
+    """
+    Reconciles every submission of a manifest (a path, or a list as returned by
+    load_manifest).
+
+    Args:
+        manifest: Manifest path or submission list.
+        output_dir: Receives one directory per submission, the consolidated store
+            (exceptions/) and batch_summary.json.
+        workers: Maximum concurrent submissions (defaults to the CPU count).
+        memory_budget_mb: Memory the running submissions may use together
+            (defaults to half of the available memory).
+
+    Returns a dict with the batch totals and one result per submission, in
+    manifest order.
+    """
+    submissions = load_manifest(manifest) if isinstance(manifest, str) else list(manifest)
+    for submission in submissions:
+        check_submission_id(submission['submission_id'])
+    workers = workers or os.cpu_count() or 1
+    if memory_budget_mb is None:
+        available = available_memory_mb()
+        memory_budget_mb = available * DEFAULT_MEMORY_SHARE if available else FALLBACK_MEMORY_BUDGET_MB
+    os.makedirs(output_dir, exist_ok=True)
+    stages = Instrumentation()
+
+    shared = frozenset(shared_inputs(submissions))
+    estimates = {s['submission_id']: estimate_working_set_mb(s) for s in submissions}
+    # Largest first packs the budget best; oversized pairs stream alone under the budget
+    pending = sorted(submissions, key=lambda s: -estimates[s['submission_id']])
+    results = {}
+
+    def streaming_budget(submission):
+        if not streamable(submission['gtas_path'], submission['erp_path']):
+            return None
+        return memory_budget_mb if estimates[submission['submission_id']] > memory_budget_mb else None
+
+    if workers == 1:
+        with stages.stage('submissions', rows=len(submissions)):
+            for submission in pending:
+                results[submission['submission_id']] = run_submission(
+                    submission, output_dir, shared, streaming_budget(submission))
+    else:
+        with stages.stage('preload', rows=len(shared)):
+            if _pool_context() is not None:
+                preload_shared_inputs(shared)
+        with stages.stage('submissions', rows=len(submissions)), \
+                ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+            running = {}
+            reserved = 0.0
+            while pending or running:
+                # Start every pending submission that fits; always keep one running
+                for submission in list(pending):
+                    if len(running) >= workers:
+                        break
+                    estimate = min(estimates[submission['submission_id']], memory_budget_mb)
+                    if running and reserved + estimate > memory_budget_mb:
+                        continue
+                    pending.remove(submission)
+                    future = pool.submit(run_submission, submission, output_dir, shared, streaming_budget(submission))
+                    running[future] = (submission, estimate)
+                    reserved += estimate
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    submission, estimate = running.pop(future)
+                    reserved -= estimate
+                    try:
+                        results[submission['submission_id']] = future.result()
+                    except Exception as e:  # The worker process itself died
+                        results[submission['submission_id']] = dict(
+                            submission, success=False, message=f"Validation process failed: {e!r}")
+
+    ordered = [results[s['submission_id']] for s in submissions]
+    batch = {
+        'success': all(result['success'] for result in ordered),
+        'submissions': len(ordered),
+        'failed': [result['submission_id'] for result in ordered if not result['success']],
+        'exceptions': sum(result.get('exceptions', 0) for result in ordered),
+        'exception_store': os.path.join(output_dir, STORE_DIR),
+        'memory_budget_mb': round(memory_budget_mb, 1),
+        'results': ordered,
+        'metrics': stages.summary(),
+    }
+    with open(os.path.join(output_dir, 'batch_summary.json'), 'w') as f:
+        json.dump(batch, f, indent=2, default=str)
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest')
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--memory-budget-mb', type=float)
+    args = parser.parse_args()
+
+    batch = run_batch(args.manifest, args.output_dir, workers=args.workers, memory_budget_mb=args.memory_budget_mb)
+    print(f"{batch['submissions']} submissions, {batch['exceptions']} exceptions, "
+          f"{len(batch['failed'])} failed -> {args.output_dir}")
+    if not batch['success']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+# exception_store.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+WRITE_BATCH_ROWS = 50_000
+RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+# Sorts after every valid UTF-8 character, so [prefix, prefix + TEXT_MAX) is a prefix range
+TEXT_MAX = "\U0010ffff"
+
+TABLES = """
+CREATE TABLE run (run_id TEXT NOT NULL, created_at REAL NOT NULL, total INTEGER NOT NULL, summary TEXT);
+CREATE TABLE exceptions (
+    seq INTEGER PRIMARY KEY,
+    row_id INTEGER,
+    status TEXT,
+    severity TEXT,
+    tas TEXT,
+    ussgl TEXT,
+    ussgl_number INTEGER,
+    erp_balance REAL,
+    gtas_balance REAL,
+    amount REAL,
+    abs_amount REAL,
+    message TEXT
+);
+"""
+# Built once a run is fully written; a bulk index build is several times faster than per-row inserts
+INDEXES = """
+CREATE INDEX exceptions_status ON exceptions (status, seq);
+CREATE INDEX exceptions_severity ON exceptions (severity, seq);
+CREATE INDEX exceptions_tas ON exceptions (tas, seq);
+CREATE INDEX exceptions_ussgl ON exceptions (ussgl_number, seq);
+CREATE INDEX exceptions_amount ON exceptions (abs_amount);
+PRAGMA analysis_limit = 1000;
+ANALYZE;
+"""
+
+RECORD_COLUMNS = ["row_id", "status", "severity", "tas", "ussgl", "erp_balance", "gtas_balance", "amount", "message"]
+
+
+def _column(frame, name):
+    import pandas as pd
+
+    if name in frame.columns:
+        return frame[name]
+    return pd.Series(None, index=frame.index, dtype=object)
+
+
+def _text(values):
+    return values.astype(str).where(values.notna(), None)
+
+
+def store_records(frame):
+    """
+    Store rows for ErrorTable.to_frame(details=True): the RECORD_COLUMNS plus
+    ussgl_number and abs_amount, with None for missing values.
+
+    The amount is the ERP minus the GTAS balance, a missing side counting as zero;
+    errors without a severity get "error".
+    """
+    import pandas as pd
+
+    ussgl = _text(_column(frame, "USSGL_ACCOUNT"))
+    erp = pd.to_numeric(_column(frame, "NET_BALANCE"), errors="coerce")
+    gtas = pd.to_numeric(_column(frame, "GTAS_BALANCE"), errors="coerce")
+    amount = pd.to_numeric(_column(frame, "DIFFERENCE"), errors="coerce")
+    amount = amount.where(amount.notna() | (erp.isna() & gtas.isna()), erp.fillna(0) - gtas.fillna(0))
+    six_digits = ussgl.str.fullmatch(r"[0-9]{6}").fillna(False).astype(bool)
+    records = pd.DataFrame({
+        "row_id": pd.to_numeric(_column(frame, "row"), errors="coerce").astype("Int64"),
+        "status": _text(_column(frame, "STATUS")),
+        "severity": _text(_column(frame, "severity")).fillna("error"),
+        "tas": _text(_column(frame, "TAS")),
+        "ussgl": ussgl,
+        # Six-digit accounts as integers for range filters; anything else stays NULL
+        "ussgl_number": pd.to_numeric(ussgl.where(six_digits), errors="coerce").astype("Int64"),
+        "erp_balance": erp,
+        "gtas_balance": gtas,
+        "amount": amount,
+        "abs_amount": amount.abs(),
+        "message": _text(_column(frame, "message")),
+    })
+    records = records.astype(object)
+    return records.where(records.notna(), None)
+
+
+class RunWriter:
+    """
+    Writes one run's errors to a private file, published by close() as a whole.
+
+    Rows go in without indexes and with journaling off; close() then builds the
+    indexes in bulk and renames the file into place, so queries never see a run
+    half written. abort() (or an exception inside a with block) discards it.
+    """
+
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+        self.total = 0
+        handle, self._part = tempfile.mkstemp(dir=store.root, prefix=f"{run_id}.", suffix=".part")
+        os.close(handle)
+        self._db = sqlite3.connect(self._part, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.executescript(TABLES)
+
+    def add(self, frame):
+        """Appends the errors of ErrorTable.to_frame(details=True)."""
+        records = store_records(frame)
+        with self._db:
+            for start in range(0, len(records), WRITE_BATCH_ROWS):
+                batch = records.iloc[start:start + WRITE_BATCH_ROWS]
+                seqs = range(self.total + start, self.total + start + len(batch))
+                self._db.executemany(
+                    "INSERT INTO exceptions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    zip(seqs, *(batch[col].tolist() for col in batch.columns)),
+                )
+        self.total += len(records)
+        return self
+
+    def close(self, summary=None):
+        """Indexes and publishes the run; returns its error count."""
+        with self._db:
+            self._db.execute("INSERT INTO run VALUES (?, ?, ?, ?)", (
+                self.run_id, time.time(), self.total, json.dumps(summary, default=str) if summary is not None else None,
+            ))
+        self._db.executescript(INDEXES)
+        self._db.close()
+        os.replace(self._part, self.store.path(self.run_id))
+        return self.total
+
+    def abort(self):
+        self._db.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._part)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None:
+            self.abort()
+
+
+class ExceptionStore:
+    """
+    Persistent, indexed store of validation errors, one SQLite file per run.
+
+    Each run is indexed on status, severity, TAS, USSGL account and absolute
+    amount. query() pages through a run with keyset pagination on the error
+    order, so a page costs an index range scan however deep into the run it is,
+    and the response and the UI no longer need the full error list. Runs older
+    than max_age_seconds are deleted as new ones are written.
+
+    Args:
+        root (str): Directory of the run files; created if missing.
+        max_age_seconds (float): Retention of a run (None keeps runs until deleted).
+    """
+
+    def __init__(self, root, max_age_seconds=None):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, run_id):
+        if not RUN_ID_PATTERN.fullmatch(str(run_id)):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        return os.path.join(self.root, f"{run_id}.sqlite3")
+
+    def writer(self, run_id):
+        """A RunWriter for a new run; replaces any earlier run with the same id when closed."""
+        self.path(run_id)  # Validates the id
+        self.prune()
+        return RunWriter(self, run_id)
+
+    def add(self, run_id, frame, summary=None):
+        """Writes a complete run from one frame; returns its error count."""
+        with self.writer(run_id) as writer:
+            return writer.add(frame).close(summary)
+
+    @contextlib.contextmanager
+    def _reader(self, run_id):
+        try:
+            path = self.path(run_id)
+        except ValueError:
+            yield None
+            return
+        try:
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        except sqlite3.OperationalError:  # No such run
+            yield None
+            return
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def run(self, run_id):
+        """The run's created_at, total and summary, or None for an unknown or expired run."""
+        with self._reader(run_id) as db:
+            if db is None:
+                return None
+            created_at, total, summary = db.execute("SELECT created_at, total, summary FROM run").fetchone()
+        return {"run_id": run_id, "created_at": created_at, "total": total,
+                "summary": json.loads(summary) if summary else None}
+
+    def runs(self):
+        """Ids of the stored runs, sorted."""
+        return sorted(name[:-len(".sqlite3")] for name in os.listdir(self.root) if name.endswith(".sqlite3"))
+
+    def read(self, run_id):
+        """
+        Every error of a run as a DataFrame with seq and the RECORD_COLUMNS, in
+        error order, or None for an unknown or expired run.
+        """
+        import pandas as pd
+
+        with self._reader(run_id) as db:
+            if db is None:
+                return None
+            rows = db.execute(f"SELECT seq, {', '.join(RECORD_COLUMNS)} FROM exceptions ORDER BY seq").fetchall()
+        return pd.DataFrame.from_records(rows, columns=["seq"] + RECORD_COLUMNS)
+
+    def query(self, run_id, status=None, severity=None, tas_prefix=None, ussgl_min=None, ussgl_max=None,
+              min_amount=None, limit=DEFAULT_PAGE_SIZE, cursor=None, count=False):
+        """
+        One page of a run's errors, in error order.
+
+        Args:
+            run_id (str): Run to read.
+            status, severity (str | list): Keep only these values.
+            tas_prefix (str): Keep TAS starting with this text.
+            ussgl_min, ussgl_max (int): Inclusive six-digit USSGL account range.
+            min_amount (float): Keep errors whose absolute amount is at least this.
+            limit (int): Page size, at most MAX_PAGE_SIZE.
+            cursor (int): next_cursor of the previous page.
+            count (bool): Also count every error matching the filters (visits them all).
+
+        Returns:
+            dict: run_id, exceptions (list of dicts, each with its seq), next_cursor
+                (None on the last page) and, with count, matched; None for an
+                unknown run.
+        """
+        where = []
+        params = []
+        for column, wanted in (("status", status), ("severity", severity)):
+            if wanted:
+                wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+                where.append(f"{column} IN ({', '.join('?' * len(wanted))})")
+                params.extend(wanted)
+        if tas_prefix:
+            where.append("tas >= ? AND tas < ?")
+            params.extend([tas_prefix, tas_prefix + TEXT_MAX])
+        if ussgl_min is not None:
+            where.append("ussgl_number >= ?")
+            params.append(int(ussgl_min))
+        if ussgl_max is not None:
+            where.append("ussgl_number <= ?")
+            params.append(int(ussgl_max))
+        if min_amount is not None:
+            where.append("abs_amount >= ?")
+            params.append(float(min_amount))
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        page_where = where + (["seq > ?"] if cursor is not None else [])
+        page_params = params + ([int(cursor)] if cursor is not None else [])
+
+        with self._reader(run_id) as db:
+            if db is None:
+                return None
+            rows = db.execute(
+                f"SELECT seq, {', '.join(RECORD_COLUMNS)} FROM exceptions"
+                f"{' WHERE ' + ' AND '.join(page_where) if page_where else ''} ORDER BY seq LIMIT ?",
+                page_params + [limit + 1],
+            ).fetchall()
+            matched = db.execute(
+                f"SELECT COUNT(*) FROM exceptions{' WHERE ' + ' AND '.join(where) if where else ''}", params
+            ).fetchone()[0] if count else None
+
+        page = {
+            "run_id": run_id,
+            "exceptions": [dict(zip(RECORD_COLUMNS, row[1:]), seq=row[0]) for row in rows[:limit]],
+            "next_cursor": rows[limit - 1][0] if len(rows) > limit else None,
+        }
+        if count:
+            page["matched"] = matched
+        return page
+
+    def delete(self, run_id):
+        """Removes a run."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path(run_id))
+
+    def prune(self):
+        """Deletes runs (and abandoned partial writes) older than max_age_seconds."""
+        if self.max_age_seconds is None:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        for name in os.listdir(self.root):
+            if name.endswith((".sqlite3", ".part")):
+                path = os.path.join(self.root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
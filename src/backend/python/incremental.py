@@ -0,0 +1,228 @@
+"""
+Incremental reconciliation. A ReconciliationState keeps both inputs and the fully
+reconciled frame of an earlier run. apply_delta takes changed ERP lines (adds,
+updates and deletes keyed by TAS, USSGL_ACCOUNT and FUND) and re-reconciles only
+the (TAS, USSGL_ACCOUNT) keys they touch: STATUS, DIFFERENCE, the GTAS edits and
+the FBDI lines of every other key are left as they are, so a correction gets
+feedback without an outer merge of the whole ledger.
+
+Rows are found through a sorted index of their key hashes and changed through
+tombstones and a small overlay of new rows (see KeyedRows), so a delta costs
+time in proportion to the keys it touches, not to the size of the ledger.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from prototype import (
+    ERP_SCHEMA,
+    build_fbdi_journal,
+    read_trial_balance,
+    reconcile_all,
+    select_exceptions,
+)
+from keys import canonical_key_text, key_hashes
+
+LINE_COLUMNS = ['TAS', 'USSGL_ACCOUNT', 'FUND']
+DELTA_ACTIONS = ('add', 'update', 'delete', 'upsert')
+DELTA_SCHEMA = dict(ERP_SCHEMA, ACTION='category')
+# Rows added since the last compaction are kept apart up to this many
+OVERLAY_ROWS = 65_536
+
+
+def _line_ids(df):
+    # Canonical, like the (TAS, USSGL_ACCOUNT) keys, so 101000 and '101000.0' are one line
+    return key_hashes(df, on=LINE_COLUMNS)
+
+
+def _concat(frames):
+    """pd.concat that keeps categorical columns categorical by unioning their categories."""
+    frames = [df for df in frames if len(df.columns)]
+    categorical = {col for df in frames for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+    for col in categorical:
+        dtypes = [df[col].dtype for df in frames if col in df.columns]
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            continue  # One categorical dtype already
+        categories = pd.Index([])
+        for df in frames:
+            if col in df.columns:
+                values = df[col].cat.categories if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].dropna().unique()
+                categories = categories.union(pd.Index(values).astype(str))
+        dtype = pd.CategoricalDtype(categories)
+        frames = [df.astype({col: dtype}) if col in df.columns and df[col].dtype != dtype else df for df in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _cast_like(values, dtype):
+    """Delta key values as the state's column dtype: numbers as numbers, anything else as canonical text."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        if is_numeric_dtype(dtype.categories.dtype):
+            return pd.Categorical(pd.to_numeric(values))
+        text = canonical_key_text(values)
+        if (dtype.categories.get_indexer(text.categories) >= 0).all():
+            text = text.set_categories(dtype.categories)  # Known keys: the state's own dtype, no union later
+        return pd.Series(text, index=values.index)
+    if is_numeric_dtype(dtype):
+        return pd.to_numeric(values).astype(dtype)
+    text = pd.Series(canonical_key_text(values), index=values.index).astype(object)
+    return text.where(text.notna(), None)
+
+
+def load_delta(path, fmt=None):
+    """Reads a delta file: ERP line columns, NET_BALANCE and an optional ACTION column."""
+    return read_trial_balance(path, DELTA_SCHEMA, fmt=fmt)
+
+
+class KeyedRows:
+    """
+    The rows of one frame, located and replaced by (TAS, USSGL_ACCOUNT) key.
+
+    The frame the rows started from (or were last compacted into) is indexed by
+    its sorted key hashes; replaced rows are only marked dead in it, and new rows
+    go to an overlay frame. take() and replace() therefore cost a binary search
+    per key plus the overlay, which is compacted into the indexed frame once it
+    reaches OVERLAY_ROWS or half the frame is dead.
+    """
+
+    def __init__(self, df):
+        self._index(df.reset_index(drop=True))
+
+    def _index(self, df):
+        self._base = df
+        keys = key_hashes(df)
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+        self._live = np.ones(len(df), dtype=bool)
+        self._dead = 0
+        self._overlay = df.iloc[:0]
+        self._overlay_keys = keys[:0]
+
+    def __len__(self):
+        return len(self._base) - self._dead + len(self._overlay)
+
+    @property
+    def dtypes(self):
+        return self._base.dtypes
+
+    def _positions(self, affected):
+        # Live positions in the indexed frame whose key is one of the sorted, unique hashes
+        start = np.searchsorted(self._sorted_keys, affected, side='left')
+        stop = np.searchsorted(self._sorted_keys, affected, side='right')
+        counts = stop - start
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = self._order[np.repeat(start, counts) + offsets]
+        return positions[self._live[positions]]
+
+    def take(self, affected):
+        """The rows of the keys in affected (sorted, unique key hashes)."""
+        rows = self._base.iloc[self._positions(affected)]
+        in_overlay = np.isin(self._overlay_keys, affected)
+        return _concat([rows, self._overlay[in_overlay]]) if in_overlay.any() else rows.reset_index(drop=True)
+
+    def replace(self, affected, rows):
+        """Drops every row of the keys in affected and adds rows (which may only hold those keys)."""
+        positions = self._positions(affected)
+        self._live[positions] = False
+        self._dead += len(positions)
+        kept = ~np.isin(self._overlay_keys, affected)
+        self._overlay = _concat([self._overlay[kept], rows])
+        self._overlay_keys = np.concatenate([self._overlay_keys[kept], key_hashes(rows)])
+        if len(self._overlay) > OVERLAY_ROWS or self._dead > len(self._base) // 2:
+            self.frame()
+
+    def frame(self):
+        """Every row as one frame (compacting the overlay into the indexed frame)."""
+        if self._dead or len(self._overlay):
+            self._index(_concat([self._base[self._live], self._overlay]))
+        return self._base
+
+
+class ReconciliationState:
+    """
+    Inputs and full reconciliation of one run, updated in place by apply_delta.
+
+    reconciled holds every merged row (not only exceptions), so the exceptions
+    and FBDI journal of the whole ledger can be rebuilt at any point.
+    """
+
+    def __init__(self, gtas_df, erp_df):
+        self._gtas = KeyedRows(gtas_df)
+        self._erp = KeyedRows(erp_df)
+        self._reconciled = KeyedRows(reconcile_all(self.gtas, self.erp))
+
+    @property
+    def gtas(self):
+        return self._gtas.frame()
+
+    @property
+    def erp(self):
+        return self._erp.frame()
+
+    @property
+    def reconciled(self):
+        return self._reconciled.frame()
+
+    def exceptions(self):
+        return select_exceptions(self.reconciled)
+
+    def fbdi(self):
+        return build_fbdi_journal(self.exceptions())
+
+    def _apply_lines(self, lines, delta):
+        """Applies delta to the ERP rows of the affected keys and returns the new rows."""
+        line_ids = _line_ids(lines)
+        delta_ids = _line_ids(delta)
+        last = ~pd.Series(delta_ids).duplicated(keep='last').to_numpy()  # The last action per line wins
+        delta, delta_ids = delta[last], delta_ids[last]
+        actions = delta['ACTION'].to_numpy()
+        present = np.isin(delta_ids, line_ids)
+
+        invalid = (np.isin(actions, ['update', 'delete']) & ~present) | ((actions == 'add') & present)
+        if invalid.any():
+            bad = delta.loc[invalid, LINE_COLUMNS + ['ACTION']].astype(object).to_dict(orient='records')
+            raise ValueError(f"Delta does not match the ERP lines: {bad}")
+
+        # Updated and deleted lines are dropped; added, updated and upserted lines are (re)appended
+        kept = lines[~np.isin(line_ids, delta_ids)]
+        written = delta[actions != 'delete'].drop(columns='ACTION')
+        return _concat([kept, written.reindex(columns=lines.columns)])
+
+    def apply_delta(self, delta_df):
+        """
+        Applies changed ERP lines and re-reconciles the keys they belong to.
+
+        Args:
+            delta_df: One row per changed line with TAS, USSGL_ACCOUNT, FUND and
+                NET_BALANCE, plus an optional ACTION of 'add', 'update', 'delete'
+                or 'upsert' (the default when ACTION is missing or blank). Adding
+                an existing line or updating/deleting a missing one is an error.
+                Key values are matched as the join matches them (101000 is
+                '101000.0') and stored with the dtypes of the ERP columns.
+
+        Returns (exceptions, fbdi) for the affected keys only: their exception
+        rows after the change and the FBDI lines that now correct them. Keys that
+        no longer have exceptions are absent from both.
+        """
+        delta = delta_df.reset_index(drop=True)
+        missing = set(LINE_COLUMNS) - set(delta.columns)
+        if missing:
+            raise ValueError(f"Delta is missing columns: {sorted(missing)}")
+        if 'NET_BALANCE' not in delta.columns:
+            delta['NET_BALANCE'] = np.nan
+        action = delta['ACTION'].astype(object) if 'ACTION' in delta.columns else pd.Series('', index=delta.index)
+        delta['ACTION'] = action.fillna('').astype(str).str.strip().str.lower().replace('', 'upsert')
+        unknown = set(delta['ACTION']) - set(DELTA_ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown delta actions: {sorted(unknown)}")
+        for col in LINE_COLUMNS:
+            delta[col] = _cast_like(delta[col], self._erp.dtypes.get(col, np.dtype(object)))
+        delta['NET_BALANCE'] = pd.to_numeric(delta['NET_BALANCE'], errors='coerce')  # As reconcile_all reads it
+
+        affected = np.unique(key_hashes(delta))
+        erp_lines = self._apply_lines(self._erp.take(affected), delta)
+        recomputed = reconcile_all(self._gtas.take(affected), erp_lines)
+        self._erp.replace(affected, erp_lines)
+        self._reconciled.replace(affected, recomputed)
+
+        exceptions = select_exceptions(recomputed)
+        return exceptions, build_fbdi_journal(exceptions)
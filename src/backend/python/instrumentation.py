@@ -0,0 +1,186 @@
+# instrumentation.py
+#
+# Shared by gcf_gtas_validator and src/backend/python, which are deployed on
+# their own; keep the two copies identical (tests/test_shared_modules.py).
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+PROFILE_TOP_FUNCTIONS = 25
+
+# tracemalloc is process-wide: it runs while any recorder traces memory
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+_tracing_started = False
+
+
+def _rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+class Instrumentation:
+    """
+    Records wall time, CPU time, row counts and memory for each pipeline stage.
+
+    Stages nest: a stage opened inside another is recorded as "outer/inner". Each
+    finished stage is logged as one JSON line (structured in Cloud Logging) and
+    kept for summary(), which is returned with the results.
+
+    CPU time is the process's (all threads), so it includes pyarrow reader
+    threads and, with concurrent runs, other runs' work. rss_mb is the resident
+    size after the stage. With trace_memory, tracemalloc also reports each
+    stage's peak Python/numpy allocation; it traces the whole process until the
+    last tracing run finishes, and concurrent traced runs share one peak. With
+    profile, cProfile watches the creating thread for the whole run and
+    summary() lists the top functions. Both slow down every thread of the
+    process, so callers should only enable them on request of an operator, and
+    must call summary() or close() (or use the recorder as a context manager)
+    however the run ends.
+
+    Args:
+        run_id (str): Identifier stamped on every log line (defaults to a new id).
+        profile (bool): Run cProfile until summary() or close().
+        trace_memory (bool): Trace allocations with tracemalloc.
+        log (bool): Emit one structured log line per stage.
+    """
+
+    def __init__(self, run_id=None, profile=False, trace_memory=False, log=True):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.stages = []
+        self.log = log
+        self._path = []
+        self._profiler = None
+        self._trace_memory = trace_memory
+        self._started_tracing = False
+        self._start = (time.perf_counter(), time.process_time())
+        if profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:  # Another profiler is already active in this thread
+                self._profiler = None
+        if trace_memory:
+            _start_tracing()
+            self._started_tracing = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops profiling and tracing without reporting; safe to call more than once."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self._started_tracing:
+            _stop_tracing()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the block as one stage. The yielded record is a dict; set
+        record["rows"] inside the block when the row count is only known there.
+        """
+        self._path.append(name)
+        record = {"stage": "/".join(self._path), "rows": rows}
+        if self._trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 4)
+            record["cpu_s"] = round(time.process_time() - cpu, 4)
+            rss = _rss_mb()
+            record["rss_mb"] = round(rss, 1) if rss is not None else None
+            if self._trace_memory:
+                import tracemalloc
+                record["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            self._path.pop()
+            self.stages.append(record)
+            if self.log:
+                self.emit("stage", **record)
+
+    def emit(self, message, **fields):
+        """Writes one structured log line for this run."""
+        print(json.dumps({"severity": "INFO", "message": message, "run_id": self.run_id, **fields}, default=str),
+              file=sys.stdout, flush=True)
+
+    def summary(self):
+        """
+        Stops profiling and tracing, and returns the run's metrics.
+
+        Returns:
+            dict: run_id, total wall and CPU seconds, the stage records in finish
+                order and, when profiling, the top functions by cumulative time.
+        """
+        metrics = {
+            "run_id": self.run_id,
+            "wall_s": round(time.perf_counter() - self._start[0], 4),
+            "cpu_s": round(time.process_time() - self._start[1], 4),
+            "stages": list(self.stages),
+        }
+        if self._profiler is not None:
+            self._profiler.disable()
+            metrics["profile"] = _top_functions(self._profiler)
+        self.close()
+        if self.log:
+            self.emit("run", wall_s=metrics["wall_s"], cpu_s=metrics["cpu_s"])
+        return metrics
+
+
+def _start_tracing():
+    global _tracing_runs, _tracing_started
+    import tracemalloc
+
+    with _tracing_lock:
+        if _tracing_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_runs += 1
+
+
+def _stop_tracing():
+    global _tracing_runs, _tracing_started
+    import tracemalloc
+
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and _tracing_started:  # Leave tracing someone else started alone
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def _top_functions(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": calls,
+            "total_s": round(total, 4),
+            "cumulative_s": round(cumulative, 4),
+        })
+    return sorted(rows, key=lambda row: -row["cumulative_s"])[:limit]
+
+
+def no_instrumentation():
+    """A recorder that keeps stage timings but writes no logs; the default for library calls."""
+    return Instrumentation(log=False)
@@ -0,0 +1,55 @@
+"""
+Multi-core reconciliation. The (TAS, USSGL_ACCOUNT) key space is split into
+hash shards, so each key and all of its duplicates live in exactly one shard.
+Each shard is reconciled and edited in its own process, and the shard results
+are combined in a fixed order, so the output does not depend on which worker
+finishes first.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from prototype import validate_and_reconcile
+from keys import KEY_COLUMNS, bucket_ids
+
+
+def split_by_key(df, n_shards):
+    """Splits a frame into n_shards frames by key hash; shard i holds the same keys on both sides."""
+    ids = bucket_ids(df, n_shards)
+    return [df[ids == shard] for shard in range(n_shards)]
+
+
+def validate_and_reconcile_parallel(gtas_df, erp_df, workers=None, shards=None, executor=None):
+    """
+    Parallel validate_and_reconcile.
+
+    Args:
+        gtas_df, erp_df: Inputs as accepted by validate_and_reconcile.
+        workers: Process count (defaults to the CPU count).
+        shards: Number of key shards (defaults to workers).
+        executor: Optional running ProcessPoolExecutor to reuse across calls.
+
+    Returns the same exception rows as validate_and_reconcile, ordered by
+    (TAS, USSGL_ACCOUNT) with a fresh index.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    gtas_shards = split_by_key(gtas_df, shards)
+    erp_shards = split_by_key(erp_df, shards)
+
+    if workers == 1 and executor is None:
+        results = [validate_and_reconcile(g, e) for g, e in zip(gtas_shards, erp_shards)]
+    else:
+        pool = executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            results = list(pool.map(validate_and_reconcile, gtas_shards, erp_shards))
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    results = [result for result in results if not result.empty]
+    if not results:
+        return validate_and_reconcile(gtas_df.iloc[:0], erp_df.iloc[:0])
+    combined = pd.concat(results, ignore_index=True)
+    return combined.sort_values(KEY_COLUMNS, kind='mergesort').reset_index(drop=True)
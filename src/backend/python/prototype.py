@@ -1,126 +1,227 @@
+import os
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_numeric_dtype
 from datetime import datetime # Added for datetime.now()
+from functools import lru_cache
+from itertools import islice
+
+from instrumentation import Instrumentation, no_instrumentation
+from keys import KEY_COLUMNS, outer_join
+import fbdi
+from fbdi import FBDI_COLUMNS, FbdiWriter  # noqa: F401
+from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories, detect_format, read_trial_balance  # noqa: F401
 
 # --- Configuration ---
 TOLERANCE = 0.01
+GTAS_COLUMN_RENAMES = {'USSGL': 'USSGL_ACCOUNT', 'GTAS_Balance': 'GTAS_BALANCE'}
+STATUS_LABELS = np.array(['Missing in GTAS', 'Missing in ERP', 'Mismatch', 'Matched'], dtype=object)
 
 # --- GTAS Edit Logic ---
-def apply_gtas_edits_expanded_safe(df):
-    df = df.copy()
-    df['GTAS_FATAL_ERROR'] = ''
-    df['GTAS_ADVISORY_NOTE'] = ''
-
-    def gtas_checks(row):
-        fatal = []
-        note = []
+GTAS_FATAL_MESSAGES = (
+    "Missing required field: TAS or USSGL",
+    "Canceled TAS must have 0 balance for USSGL 101000",
+)
+GTAS_ADVISORY_MESSAGES = (
+    "210000 series should net to zero",
+    "445000 should typically be zero",
+    "Negative balance for budgetary account",
+    "TAS format may be invalid or too short",
+)
+NON_NUMERIC_BALANCE_MESSAGE = "Non-numeric GTAS balance"
+
+
+def _parse_gtas_balance(values):
+    # Mirrors float(value) for every cell: returns the float balances plus a mask
+    # of cells float() would reject. Object columns are parsed once per unique value.
+    if is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+        balance = values.to_numpy(dtype=float, na_value=np.nan)
+        if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+            # Nullable dtypes hold pd.NA, which float() rejects
+            return balance, values.isna().to_numpy()
+        return balance, np.zeros(len(values), dtype=bool)
+
+    raw = values.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(raw)
+    parsed = np.empty(len(uniques), dtype=float)
+    rejected = np.zeros(len(uniques), dtype=bool)
+    for i, value in enumerate(uniques):
+        try:
+            parsed[i] = float(value)
+        except (ValueError, TypeError):
+            parsed[i] = np.nan
+            rejected[i] = True
+    balance = parsed[codes] if len(uniques) else np.full(len(raw), np.nan)
+    non_numeric = rejected[codes] if len(uniques) else np.zeros(len(raw), dtype=bool)
 
+    # factorize folds NaN, None and pd.NA together; only a float NaN survives float().
+    for i in np.flatnonzero(codes == -1):
         try:
-            # Ensure GTAS_BALANCE is numeric before comparison
-            float_balance = float(row['GTAS_BALANCE'])
+            balance[i] = float(raw[i])
+            non_numeric[i] = False
         except (ValueError, TypeError):
-            fatal.append("Non-numeric GTAS balance")
-            # If balance is not numeric, skip further numeric checks to avoid errors
-            return pd.Series({
-                'GTAS_FATAL_ERROR': '; '.join(fatal),
-                'GTAS_ADVISORY_NOTE': '; '.join(note)
-            })
-
-        if pd.isna(row['TAS']) or pd.isna(row['USSGL_ACCOUNT']):
-            fatal.append("Missing required field: TAS or USSGL")
-
-        # Check for X-TAS with USSGL 101000 having non-zero balance
-        if str(row['TAS']).startswith('X') and str(row['USSGL_ACCOUNT']) == '101000' and float_balance != 0:
-            fatal.append("Canceled TAS must have 0 balance for USSGL 101000")
-
-        # Advisory for 210000 series
-        if str(row['USSGL_ACCOUNT']).startswith('210') and abs(float_balance) > 0:
-            note.append("210000 series should net to zero")
-
-        # Advisory for 445000
-        if str(row['USSGL_ACCOUNT']) == '445000' and float_balance != 0:
-            note.append("445000 should typically be zero")
-
-        # Advisory for negative budgetary account balances
-        if str(row['USSGL_ACCOUNT']).startswith('4') and float_balance < 0:
-            note.append("Negative balance for budgetary account")
-
-        # Advisory for short TAS format (basic check)
-        if len(str(row['TAS'])) < 5: # Assuming a minimum valid TAS length for advisory
-            note.append("TAS format may be invalid or too short")
-
-        return pd.Series({
-            'GTAS_FATAL_ERROR': '; '.join(fatal),
-            'GTAS_ADVISORY_NOTE': '; '.join(note)
-        })
-
-    df[['GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']] = df.apply(gtas_checks, axis=1)
+            balance[i] = np.nan
+            non_numeric[i] = True
+    return balance, non_numeric
+
+
+def _dictionary(values):
+    # (codes, uniques) with -1 for missing; a categorical reuses its own dictionary
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+def _str_mask(values, predicate, na_result):
+    # Evaluates predicate on str(value) once per unique value. Missing values all
+    # stringify to short non-account text ('nan', 'None', '<NA>'), hence na_result.
+    codes, uniques = _dictionary(values)
+    outcomes = np.asarray(predicate(pd.Series(uniques, dtype=object).astype(str)), dtype=bool)
+    return np.append(outcomes, na_result)[codes]
+
+
+def ussgl_numbers(uniques):
+    """USSGL dictionary entries as int32 account numbers; -1 where str(entry) is not six digits."""
+    text = pd.Series(uniques, dtype=object).astype(str)
+    six_digits = text.str.fullmatch(r'[0-9]{6}').to_numpy(dtype=bool)
+    numbers = np.full(len(text), -1, dtype=np.int32)
+    numbers[six_digits] = text[six_digits].astype(np.int32).to_numpy()
+    return numbers
+
+
+def _ussgl_range_mask(codes, uniques, numbers, low, high, predicate):
+    # Prefix and equality edits on six-digit accounts are integer ranges [low, high);
+    # the rare non-conforming entries keep the string predicate.
+    outcomes = (numbers >= low) & (numbers < high)
+    odd = numbers < 0
+    if odd.any():
+        outcomes[odd] = np.asarray(predicate(pd.Series(uniques[odd], dtype=object).astype(str)), dtype=bool)
+    return np.append(outcomes, False)[codes]
+
+
+@lru_cache(maxsize=None)
+def _message_table(messages):
+    # Every '; '-joined combination of messages, indexed by bit code; built once per
+    # process, so repeated runs (parallel shards, streaming buckets, batches) reuse it
+    return np.array(
+        ['; '.join(m for bit, m in enumerate(messages) if code >> bit & 1) for code in range(1 << len(messages))],
+        dtype=object,
+    )
+
+
+def _join_messages(flags, messages):
+    # Packs the per-edit masks into a bit code per row and maps each code to its
+    # pre-joined '; ' message, so no string is built per row.
+    codes = np.zeros(len(flags[0]), dtype=np.int64)
+    for bit, mask in enumerate(flags):
+        codes |= mask.astype(np.int64) << bit
+    return _message_table(tuple(messages))[codes]
+
+
+def apply_gtas_edits_expanded_safe(df):
+    df = df.copy()
+
+    balance, non_numeric = _parse_gtas_balance(df['GTAS_BALANCE'])
+    checked = ~non_numeric  # Non-numeric balances skip every other edit
+    tas = df['TAS']
+    ussgl_codes, ussgl_uniques = _dictionary(df['USSGL_ACCOUNT'])
+    numbers = ussgl_numbers(ussgl_uniques)
+
+    def ussgl_in(low, high, predicate):
+        return _ussgl_range_mask(ussgl_codes, ussgl_uniques, numbers, low, high, predicate)
+
+    with np.errstate(invalid='ignore'):
+        nonzero = balance != 0
+        fatal_flags = [
+            checked & (tas.isna().to_numpy() | (ussgl_codes == -1)),
+            # X-TAS with USSGL 101000 having non-zero balance
+            checked
+            & _str_mask(tas, lambda s: s.str.startswith('X'), False)
+            & ussgl_in(101000, 101001, lambda s: s == '101000')
+            & nonzero,
+        ]
+        advisory_flags = [
+            checked & ussgl_in(210000, 211000, lambda s: s.str.startswith('210')) & (np.abs(balance) > 0),
+            checked & ussgl_in(445000, 445001, lambda s: s == '445000') & nonzero,
+            # Negative balance for budgetary (4xxxxx) accounts
+            checked & ussgl_in(400000, 500000, lambda s: s.str.startswith('4')) & (balance < 0),
+            # Short TAS format (basic check, assumes a minimum valid TAS length)
+            checked & _str_mask(tas, lambda s: s.str.len() < 5, True),
+        ]
+
+    fatal = _join_messages(fatal_flags, GTAS_FATAL_MESSAGES)
+    fatal[non_numeric] = NON_NUMERIC_BALANCE_MESSAGE
+    df['GTAS_FATAL_ERROR'] = fatal
+    df['GTAS_ADVISORY_NOTE'] = _join_messages(advisory_flags, GTAS_ADVISORY_MESSAGES)
     return df
 
 # --- Data Load ---
+# Typed, projected loading of CSV, Parquet and Feather inputs is shared with the
+# Cloud Function (loaders.py): dictionary-encoded keys and int64/float64 balances
+
 def load_data(gtas_path, erp_path):
     try:
-        gtas_df = pd.read_csv(gtas_path)
-        gtas_df = gtas_df.rename(columns={'USSGL': 'USSGL_ACCOUNT', 'GTAS_Balance': 'GTAS_BALANCE'})
-        erp_df = pd.read_csv(erp_path)
+        gtas_df = read_trial_balance(gtas_path, GTAS_SCHEMA, renames=GTAS_COLUMN_RENAMES)
+        erp_df = read_trial_balance(erp_path, ERP_SCHEMA)
+        align_key_categories(gtas_df, erp_df)
         return gtas_df, erp_df
     except Exception as e:
         print(f"Error loading data: {e}")
         raise # Re-raise to indicate failure to the caller
 
+def join_trial_balances(gtas_df, erp_df):
+    """
+    Outer join of both sides on TAS and USSGL_ACCOUNT through their integer keys
+    (see keys.outer_join).
+
+    Same rows, row order and columns as pd.merge(gtas_df, erp_df, on=KEY_COLUMNS,
+    how='outer'), plus IN_GTAS / IN_ERP presence flags. Keys come back as
+    categoricals when both sides had them and as objects otherwise; keys of
+    different types on the two sides (101000 against '101000.0') still match.
+    """
+    joined = outer_join(gtas_df, erp_df, KEY_COLUMNS, indicator=True)
+    source = joined.pop('_merge').to_numpy()
+    joined['IN_GTAS'] = source != 'right_only'
+    joined['IN_ERP'] = source != 'left_only'
+    return joined
+
 # --- Reconciliation + GTAS Edit Integration ---
-def validate_and_reconcile(gtas_df, erp_df):
-    merged_df = pd.merge(
-        gtas_df,
-        erp_df,
-        on=['TAS', 'USSGL_ACCOUNT'],
-        how='outer'
+def classify_status(in_gtas, in_erp, difference):
+    """
+    Vectorized reconciliation status. Presence comes from the merge indicator, so a
+    key that exists with a zero balance is told apart from a key that is absent.
+    """
+    in_gtas = np.asarray(in_gtas, dtype=bool)
+    in_erp = np.asarray(in_erp, dtype=bool)
+    codes = np.select(
+        [
+            in_erp & ~in_gtas,  # Present in ERP only
+            in_gtas & ~in_erp,  # Present in GTAS only
+            np.abs(np.asarray(difference, dtype=float)) > TOLERANCE,  # Mismatch if difference exceeds tolerance
+        ],
+        [0, 1, 2],
+        default=3,
     )
-
-    # Convert balance columns to numeric, coercing errors to NaN and filling NaN with 0
-    merged_df['GTAS_BALANCE'] = pd.to_numeric(merged_df['GTAS_BALANCE'], errors='coerce').fillna(0)
-    merged_df['NET_BALANCE'] = pd.to_numeric(merged_df['NET_BALANCE'], errors='coerce').fillna(0)
-    merged_df['DIFFERENCE'] = merged_df['GTAS_BALANCE'] - merged_df['NET_BALANCE']
-
-    def determine_status(row):
-        # Check if original value was truly 0 or NaN before fillna
-        gtas_original_not_zero_or_na = pd.notna(row['GTAS_Balance_Original']) and row['GTAS_Balance_Original'] != 0
-        erp_original_not_zero_or_na = pd.notna(row['NET_BALANCE_Original']) and row['NET_BALANCE_Original'] != 0
-
-        # Adjust the 'is_in_gtas' and 'is_in_erp' logic if necessary based on your exact definition
-        # For simplicity, using fillna(0) and then checking against 0 is usually fine for initial checks.
-        # The previous logic was: is_in_gtas = row['GTAS_BALANCE'] != 0 or pd.notna(row.get('FUND'))
-        # Let's revert to a slightly more robust version that checks original presence if possible
-        # For now, let's stick to the behavior that 'fillna(0)' might cause a 0 balance to be seen as present.
-        # The original code's `pd.notna(row.get('FUND'))` was an attempt to check presence.
-        # Let's simplify this. If value is not 0 AFTER fillna, or it was originally there.
-        # For robustness, we should save original presence flags before fillna.
-        # For now, let's keep the existing logic that works with filled values.
-
-        is_in_gtas_final = row['GTAS_BALANCE'] != 0 # After fillna, if 0, it means it wasn't there or was 0
-        is_in_erp_final = row['NET_BALANCE'] != 0 # After fillna, if 0, it means it wasn't there or was 0
-
-        # Also need to consider if it existed but had a 0 value.
-        # The prompt's previous check:
-        # is_in_gtas = row['GTAS_BALANCE'] != 0 or pd.notna(row.get('FUND')) # This 'FUND' part is from ERP side.
-        # Let's refine based on the data: a record is "in" a system if it has a non-zero balance OR if its TAS/USSGL combo appeared.
-        # The simplest is: if after merging and filling NaNs, a balance is 0, it wasn't there in that source (unless it was a true 0).
-        # We can add a more explicit check for original presence if needed.
-
-        # For this logic, we assume if after fillna(0), the balance is 0, it implies absence.
-        # This is simpler and matches the original prototype's intent for "Missing".
-
-        if row['GTAS_BALANCE'] == 0 and row['NET_BALANCE'] != 0: # Present in ERP, but 0 (or absent) in GTAS
-            return 'Missing in GTAS'
-        if row['NET_BALANCE'] == 0 and row['GTAS_BALANCE'] != 0: # Present in GTAS, but 0 (or absent) in ERP
-            return 'Missing in ERP'
-        if abs(row['DIFFERENCE']) > TOLERANCE: # Mismatch if difference exceeds tolerance
-            return 'Mismatch'
-        return 'Matched' # Otherwise, they match
-
-    merged_df['STATUS'] = merged_df.apply(determine_status, axis=1)
-    validated_df = apply_gtas_edits_expanded_safe(merged_df)
-
+    return STATUS_LABELS[codes]
+
+def reconcile_all(gtas_df, erp_df, instrumentation=None):
+    """Outer-joins both sides and returns every row with its STATUS, DIFFERENCE and GTAS edits."""
+    stages = instrumentation or no_instrumentation()
+    # Integer-key join; IN_GTAS / IN_ERP record which side each key came from before balances are filled
+    with stages.stage('merge', rows=len(gtas_df) + len(erp_df)):
+        merged_df = join_trial_balances(gtas_df, erp_df)
+
+    with stages.stage('status', rows=len(merged_df)):
+        # Convert balance columns to numeric, coercing errors to NaN and filling NaN with 0
+        merged_df['GTAS_BALANCE'] = pd.to_numeric(merged_df['GTAS_BALANCE'], errors='coerce').fillna(0)
+        merged_df['NET_BALANCE'] = pd.to_numeric(merged_df['NET_BALANCE'], errors='coerce').fillna(0)
+        merged_df['DIFFERENCE'] = merged_df['GTAS_BALANCE'] - merged_df['NET_BALANCE']
+
+        merged_df['STATUS'] = classify_status(merged_df['IN_GTAS'], merged_df['IN_ERP'], merged_df['DIFFERENCE'])
+    with stages.stage('edits', rows=len(merged_df)):
+        return apply_gtas_edits_expanded_safe(merged_df)
+
+def select_exceptions(validated_df):
     # Filter for exceptions: either status is not 'Matched' OR there's a fatal GTAS error
     exceptions_df = validated_df[
         (validated_df['STATUS'] != 'Matched') | (validated_df['GTAS_FATAL_ERROR'] != '')
@@ -128,107 +229,243 @@ def validate_and_reconcile(gtas_df, erp_df):
 
     return exceptions_df
 
+def validate_and_reconcile(gtas_df, erp_df, instrumentation=None):
+    stages = instrumentation or no_instrumentation()
+    validated_df = reconcile_all(gtas_df, erp_df, instrumentation=stages)
+    with stages.stage('exceptions', rows=len(validated_df)):
+        return select_exceptions(validated_df)
+
 # --- Report Generation ---
-def generate_exception_report(exceptions_df, output_path):
-    if exceptions_df.empty:
-        # Create an empty file to ensure it's always there, even if empty
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            pd.DataFrame().to_excel(writer, sheet_name='Discrepancies', index=False)
-        return
-
-    report_columns = [
-        'STATUS',
-        'TAS',
-        'USSGL_ACCOUNT',
-        'GTAS_BALANCE',
-        'NET_BALANCE',
-        'DIFFERENCE',
-        'GTAS_FATAL_ERROR',
-        'GTAS_ADVISORY_NOTE'
-    ]
-    # Ensure all report_columns exist in exceptions_df to prevent KeyError if a new column is missing
-    # Fill missing columns with empty string or NaN before selecting
-    for col in report_columns:
+REPORT_COLUMNS = [
+    'STATUS',
+    'TAS',
+    'USSGL_ACCOUNT',
+    'GTAS_BALANCE',
+    'NET_BALANCE',
+    'DIFFERENCE',
+    'GTAS_FATAL_ERROR',
+    'GTAS_ADVISORY_NOTE'
+]
+REPORT_SHEET = 'Discrepancies'
+EXCEL_SHEET_ROWS = 1_048_575  # Excel's row limit, less the header row
+# Above this many exceptions the report is written as report_fallback ('csv' or 'parquet') instead of Excel
+EXCEL_MAX_REPORT_ROWS = 2_000_000
+WIDTH_SAMPLE_ROWS = 1_000
+REPORT_CHUNK_ROWS = 50_000
+
+# Report order; USSGL_ACCOUNT makes it total, so the streaming report merges into the same order
+REPORT_SORT = ['STATUS', 'TAS', 'USSGL_ACCOUNT']
+
+def _column_widths(df):
+    # Estimated from evenly spaced sample rows rather than every cell
+    sample = df.iloc[::max(1, len(df) // WIDTH_SAMPLE_ROWS)]
+    return [max(sample[col].astype(str).map(len).max(), len(str(col))) + 2 for col in df.columns]
+
+def _cell_rows(df):
+    # Rows of plain Python values with None for missing cells, converted a chunk at a time
+    for start in range(0, len(df), REPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + REPORT_CHUNK_ROWS]
+        columns = [chunk[col].astype(object).where(chunk[col].notna(), None).tolist() for col in chunk.columns]
+        yield from zip(*columns)
+
+def report_frame(exceptions_df):
+    """The report columns of exceptions_df in report order; absent columns are left blank."""
+    # Ensure all report columns exist in exceptions_df to prevent KeyError if a new column is missing
+    for col in REPORT_COLUMNS:
         if col not in exceptions_df.columns:
-            exceptions_df[col] = '' # Or np.nan
+            exceptions_df[col] = ''
+    return exceptions_df[REPORT_COLUMNS].sort_values(by=REPORT_SORT, kind='mergesort')
 
-    formatted_df = exceptions_df[report_columns].sort_values(by=['STATUS', 'TAS'])
+def _write_report_fallback(frames, output_path, fmt):
+    # frames: the report rows as a sequence of REPORT_COLUMNS frames, appended in order
+    base = os.path.splitext(output_path)[0]
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            pass  # No Parquet engine installed; CSV needs none
+        else:
+            writer = None
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, schema=writer.schema if writer else None, preserve_index=False)
+                writer = writer or pq.ParquetWriter(base + '.parquet', table.schema)
+                writer.write_table(table)
+            if writer is not None:
+                writer.close()
+            return base + '.parquet'
+    for number, frame in enumerate(frames):
+        frame.to_csv(base + '.csv', mode='w' if number == 0 else 'a', header=number == 0, index=False)
+    return base + '.csv'
+
+def write_exception_report(rows, n_rows, widths, output_path, max_excel_rows=EXCEL_MAX_REPORT_ROWS,
+                           report_fallback='csv', sheet_rows=EXCEL_SHEET_ROWS):
+    """
+    Writes report rows through a write-only (streaming) openpyxl workbook.
+
+    rows yields n_rows tuples of REPORT_COLUMNS values (None for a blank cell) in
+    report order; widths are the column widths. Rows beyond sheet_rows continue on
+    'Discrepancies (2)', '(3)', ... and reports over max_excel_rows are written as
+    report_fallback ('csv' or 'parquet') next to output_path instead, a chunk of
+    rows at a time. Returns the path that was written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    if n_rows > max_excel_rows:
+        rows = iter(rows)
+        chunks = iter(lambda: list(islice(rows, REPORT_CHUNK_ROWS)), [])
+        return _write_report_fallback((pd.DataFrame(chunk, columns=REPORT_COLUMNS) for chunk in chunks),
+                                      output_path, report_fallback)
+
+    workbook = Workbook(write_only=True)
+    if n_rows == 0:
+        # Create an empty file to ensure it's always there, even if empty
+        workbook.create_sheet(REPORT_SHEET)
+        workbook.save(output_path)
+        return output_path
+
+    worksheet = None
+    for number, row in enumerate(rows):
+        if number % sheet_rows == 0:
+            sheet_number = number // sheet_rows + 1
+            worksheet = workbook.create_sheet(REPORT_SHEET if sheet_number == 1 else f'{REPORT_SHEET} ({sheet_number})')
+            # Write-only sheets take column widths before the first row
+            for idx, width in enumerate(widths, start=1):
+                worksheet.column_dimensions[get_column_letter(idx)].width = width
+            worksheet.append(REPORT_COLUMNS)
+        worksheet.append(row)
+    workbook.save(output_path)
+    return output_path
+
+def generate_exception_report(exceptions_df, output_path, max_excel_rows=EXCEL_MAX_REPORT_ROWS,
+                              report_fallback='csv', sheet_rows=EXCEL_SHEET_ROWS):
+    """
+    Writes the exception report of an in-memory exceptions frame (see
+    write_exception_report). Returns the path that was written.
+    """
+    if exceptions_df.empty:
+        return write_exception_report([], 0, [], output_path)
 
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        formatted_df.to_excel(writer, sheet_name='Discrepancies', index=False)
-        worksheet = writer.sheets['Discrepancies']
-        for idx, col in enumerate(formatted_df.columns):
-            # Calculate max_len safely, handling potential non-string types after fillna
-            max_len = max((formatted_df[col].astype(str).map(len).max(), len(str(col)))) + 2
-            worksheet.column_dimensions[chr(65 + idx)].width = max_len
+    formatted_df = report_frame(exceptions_df)
+    if len(formatted_df) > max_excel_rows:
+        return _write_report_fallback([formatted_df], output_path, report_fallback)
+    return write_exception_report(_cell_rows(formatted_df), len(formatted_df), _column_widths(formatted_df),
+                                  output_path, max_excel_rows, report_fallback, sheet_rows)
 
 # --- FBDI Output ---
-def generate_fbdi_file(exceptions_df, output_path):
+# Journal columns, line building and the (optionally compressed) writer are shared
+# with the Cloud Function (fbdi.py)
+FBDI_STATUSES = ['Mismatch', 'Missing in GTAS']
+FBDI_CHUNK_ROWS = 250_000
+
+def build_fbdi_journal(exceptions_df, run_date=None):
+    """
+    FBDI journal lines for the Mismatch and Missing in GTAS exceptions, built a
+    column at a time. run_date stamps JOURNAL_ENTRY_CREATION_DATE (default: today).
+    """
     if exceptions_df.empty:
-        pd.DataFrame().to_csv(output_path, index=False)
-        return
-
-    # Filter for corrections based on specific statuses OR fatal errors
-    # If a fatal error exists, we might still want an FBDI for it, or at least to highlight it.
-    # The original logic was only for Mismatch/Missing in GTAS. Let's stick to that for FBDI creation
-    # as other fatal errors might need manual intervention.
-    corrections_df = exceptions_df[exceptions_df['STATUS'].isin(['Mismatch', 'Missing in GTAS'])].copy()
-    
-    # Ensure that rows with fatal errors but 'Matched' status are not included unless specified for FBDI.
-    # Current logic correctly excludes 'Matched' status unless it's a fatal error from above.
-    # If 'Mismatch' or 'Missing in GTAS' AND has fatal error, it's included.
-    # This matches the original FBDI purpose.
+        return pd.DataFrame()
 
+    # Other fatal errors need manual intervention, so only these statuses get a journal line
+    corrections_df = exceptions_df[exceptions_df['STATUS'].isin(FBDI_STATUSES)]
     if corrections_df.empty:
-        pd.DataFrame().to_csv(output_path, index=False)
-        return
-
-    fbdi_data = []
-    for index, row in corrections_df.iterrows():
-        correction_amount = -row['DIFFERENCE']
-        fbdi_data.append({
-            'STATUS_CODE': 'NEW',
-            'LEDGER_ID': 1,
-            'EFFECTIVE_DATE': '2025-06-30',
-            'JOURNAL_SOURCE': 'FedReconcile',
-            'JOURNAL_CATEGORY': 'Reconciliation',
-            'CURRENCY_CODE': 'USD',
-            'JOURNAL_ENTRY_CREATION_DATE': datetime.now().strftime('%Y-%m-%d'),
-            'ACTUAL_FLAG': 'A',
-            'SEGMENT1': '101',
-            'SEGMENT2': 'Finance',
-            'SEGMENT3': str(row['USSGL_ACCOUNT']),
-            'SEGMENT4': str(row.get('FUND', '')), # Use .get with default for robustness
-            'SEGMENT5': str(row['TAS']),
-            'ENTERED_DEBIT_AMOUNT': max(0, correction_amount),
-            'ENTERED_CREDIT_AMOUNT': max(0, -correction_amount),
-            'REFERENCE_COLUMN_1': 'FedReconcile Correction',
-            'REFERENCE_COLUMN_2': f"Correcting {row['STATUS']}" + (f" ({row['GTAS_FATAL_ERROR']})" if row['GTAS_FATAL_ERROR'] else '')
-        })
-
-    fbdi_df = pd.DataFrame(fbdi_data)
-    fbdi_df.to_csv(output_path, index=False)
+        return pd.DataFrame()
+
+    # Few distinct (status, fatal error) pairs: format each pair once
+    status_codes, statuses = pd.factorize(corrections_df['STATUS'], use_na_sentinel=False)
+    fatal_codes, fatals = pd.factorize(corrections_df['GTAS_FATAL_ERROR'], use_na_sentinel=False)
+    references = np.array([f"Correcting {status}" + (f" ({fatal})" if fatal else '')
+                           for status in statuses for fatal in fatals], dtype=object)
+
+    # FUND is '' for keys the ERP side does not have
+    fund = corrections_df['FUND'] if 'FUND' in corrections_df.columns else np.full(len(corrections_df), '', object)
+    return fbdi.build_fbdi_journal(
+        corrections_df['USSGL_ACCOUNT'], fund, corrections_df['TAS'],
+        -corrections_df['DIFFERENCE'].to_numpy(dtype=float),
+        references[status_codes * len(fatals) + fatal_codes],
+        run_date,
+    )
+
+def write_fbdi_journal(exceptions_df, writer, run_date=None, chunk_rows=FBDI_CHUNK_ROWS):
+    # Chunks bound the size of the in-memory journal; the run date is fixed across them
+    run_date = run_date or datetime.now()
+    for start in range(0, len(exceptions_df), chunk_rows):
+        writer.write(build_fbdi_journal(exceptions_df.iloc[start:start + chunk_rows], run_date))
+    return writer.lines
+
+def generate_fbdi_file(exceptions_df, output_path, compression='infer'):
+    with FbdiWriter(output_path, compression) as writer:
+        write_fbdi_journal(exceptions_df, writer)
 
 # --- Main Runner for Module Calls ---
-def run_validation(gtas_input_path, erp_input_path, exception_output_path, fbdi_output_path):
+def streamable(*paths):
+    """Whether the streaming path can take these inputs: it partitions CSV only."""
+    return all(detect_format(path) == 'csv' for path in paths)
+
+def run_validation(gtas_input_path, erp_input_path, exception_output_path, fbdi_output_path,
+                   memory_budget_mb=None, workers=None, profile=False, trace_memory=False):
+    """
+    Runs the full validation. With memory_budget_mb set, CSV inputs are reconciled
+    in hash partitions (see streaming.py) so peak memory stays near that budget;
+    Parquet and Feather inputs are loaded whole, as without a budget.
+    With workers > 1, the in-memory reconciliation is sharded across a process
+    pool (see parallel.py). An fbdi_output_path ending in .gz or .zip is written
+    compressed. Exception reports too large for Excel are written as CSV, so
+    exception_report_path in the result may differ from exception_output_path.
+
+    Every stage is timed and logged as a JSON line (see instrumentation.py); the
+    result's 'metrics' holds the stage records. profile and trace_memory add
+    cProfile's top functions and tracemalloc peaks to them.
+    """
     print("--- Starting FedReconcile GTAS Validator Prototype (Python Module) ---")
+    stages = Instrumentation(profile=profile, trace_memory=trace_memory)
     try:
-        gtas_data, erp_data = load_data(gtas_input_path, erp_input_path)
+        if memory_budget_mb is not None and streamable(gtas_input_path, erp_input_path):
+            from streaming import run_streaming_validation
+            with stages.stage('streaming') as record:
+                summary = run_streaming_validation(
+                    gtas_input_path, erp_input_path, exception_output_path, fbdi_output_path,
+                    memory_budget_mb=memory_budget_mb
+                )
+                record['rows'] = summary['gtas_rows'] + summary['erp_rows']
+            return {
+                "success": True,
+                "message": "Validation complete. Reports generated.",
+                "exception_report_path": summary.pop("exception_report_path"),
+                "fbdi_journal_path": fbdi_output_path,
+                "summary": summary,
+                "metrics": stages.summary()
+            }
+
+        with stages.stage('load') as record:
+            gtas_data, erp_data = load_data(gtas_input_path, erp_input_path)
+            if gtas_data is not None and erp_data is not None:
+                record['rows'] = len(gtas_data) + len(erp_data)
 
         if gtas_data is not None and erp_data is not None:
-            exceptions = validate_and_reconcile(gtas_data, erp_data)
-            generate_exception_report(exceptions, exception_output_path)
-            generate_fbdi_file(exceptions, fbdi_output_path)
+            with stages.stage('reconcile', rows=len(gtas_data) + len(erp_data)):
+                if workers and workers > 1:
+                    from parallel import validate_and_reconcile_parallel
+                    exceptions = validate_and_reconcile_parallel(gtas_data, erp_data, workers=workers)
+                else:
+                    exceptions = validate_and_reconcile(gtas_data, erp_data, instrumentation=stages)
+            with stages.stage('report', rows=len(exceptions)):
+                report_path = generate_exception_report(exceptions, exception_output_path)
+            with stages.stage('fbdi', rows=len(exceptions)):
+                generate_fbdi_file(exceptions, fbdi_output_path)
             return {
                 "success": True,
                 "message": "Validation complete. Reports generated.",
-                "exception_report_path": exception_output_path,
-                "fbdi_journal_path": fbdi_output_path
+                "exception_report_path": report_path,
+                "fbdi_journal_path": fbdi_output_path,
+                "metrics": stages.summary()
             }
         else:
-            return {"success": False, "message": "Failed to load input data."}
+            return {"success": False, "message": "Failed to load input data.", "metrics": stages.summary()}
     except Exception as e:
         print(f"Error during validation process: {e}")
-        return {"success": False, "message": f"Validation process failed: {e}"}
+        return {"success": False, "message": f"Validation process failed: {e}", "metrics": stages.summary()}
     finally:
-        print("--- Python Module execution finished. ---")
\ No newline at end of file
+        stages.close()  # summary() may not have run: a failed run must not leave profiling on
+        print("--- Python Module execution finished. ---")
@@ -0,0 +1,164 @@
+"""
+Streaming, partitioned reconciliation for trial balances larger than memory.
+
+Both inputs are read in chunks and hash-partitioned by (TAS, USSGL_ACCOUNT) into
+on-disk bucket files (partitions.py, shared with the Cloud Function), so every
+key lands in the same bucket on both sides. Each bucket pair is loaded with the
+dtypes load_data gives the whole files, reconciled on its own with
+prototype.validate_and_reconcile, and its exceptions and FBDI lines are written
+out before the next bucket is loaded. Peak memory follows the configured budget,
+not the input size.
+"""
+import heapq
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories
+from partitions import WORKING_SET_FACTOR, partition_csv, plan_partitions  # noqa: F401
+from prototype import (
+    GTAS_COLUMN_RENAMES,
+    REPORT_CHUNK_ROWS,
+    REPORT_COLUMNS,
+    FbdiWriter,
+    build_fbdi_journal,
+    report_frame,
+    validate_and_reconcile,
+    write_exception_report,
+    _column_widths,
+)
+
+# Exception columns re-read from the spool as text, so '' stays '' rather than NaN.
+TEXT_COLUMNS = ['STATUS', 'TAS', 'USSGL_ACCOUNT', 'FUND', 'GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']
+NUMBER_COLUMNS = ['GTAS_BALANCE', 'NET_BALANCE', 'DIFFERENCE']
+# Fewest rows buffered per report run while merging; together the runs buffer about REPORT_CHUNK_ROWS
+MIN_RUN_CHUNK_ROWS = 1_000
+
+
+def _append_csv(df, path, first):
+    df.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+
+
+def reconcile_streaming(gtas_path, erp_path, exceptions_path, fbdi_path, memory_budget_mb=512, spill_dir=None,
+                        fbdi_compression='infer', on_exceptions=None):
+    """
+    Reconciles two CSV trial balances bucket by bucket. Exceptions are appended to
+    exceptions_path (CSV; None writes no spool) and FBDI lines to fbdi_path as each
+    bucket finishes; fbdi_compression is passed to FbdiWriter. on_exceptions, when
+    given, is called with every bucket's exceptions that are not empty.
+
+    Returns a summary dict with row, exception and bucket counts.
+    """
+    n_buckets, chunksize = plan_partitions([gtas_path, erp_path], memory_budget_mb)
+    summary = {"gtas_rows": 0, "erp_rows": 0, "exceptions": 0, "fbdi_lines": 0, "partitions": n_buckets}
+    run_date = datetime.now()
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as work_dir, FbdiWriter(fbdi_path, fbdi_compression) as fbdi:
+        gtas_parts = partition_csv(gtas_path, work_dir, 'gtas', n_buckets, chunksize, GTAS_SCHEMA,
+                                   renames=GTAS_COLUMN_RENAMES)
+        erp_parts = partition_csv(erp_path, work_dir, 'erp', n_buckets, chunksize, ERP_SCHEMA)
+
+        for bucket in range(n_buckets):
+            gtas_df = gtas_parts.read(bucket)
+            erp_df = erp_parts.read(bucket)
+            if gtas_df.empty and erp_df.empty:
+                continue
+            align_key_categories(gtas_df, erp_df)
+
+            exceptions = validate_and_reconcile(gtas_df, erp_df)
+            summary["gtas_rows"] += len(gtas_df)
+            summary["erp_rows"] += len(erp_df)
+            fbdi.write(build_fbdi_journal(exceptions, run_date))
+
+            if not exceptions.empty:
+                if exceptions_path is not None:
+                    _append_csv(exceptions, exceptions_path, first=summary["exceptions"] == 0)
+                if on_exceptions is not None:
+                    on_exceptions(exceptions)
+                summary["exceptions"] += len(exceptions)
+        summary["fbdi_lines"] = fbdi.lines
+
+    # Keep the exceptions output present even when nothing was written, as the in-memory path does
+    if exceptions_path is not None and summary["exceptions"] == 0:
+        pd.DataFrame().to_csv(exceptions_path, index=False)
+    return summary
+
+
+def read_exception_spool(path, chunk_rows=REPORT_CHUNK_ROWS):
+    """Reads a non-empty exceptions CSV written by reconcile_streaming back, chunk_rows rows at a time."""
+    # round_trip reads balances back bit for bit, as the in-memory report has them
+    chunks = pd.read_csv(path, dtype={col: str for col in TEXT_COLUMNS}, keep_default_na=False,
+                         float_precision='round_trip', chunksize=chunk_rows)
+    for chunk in chunks:
+        for col in NUMBER_COLUMNS:
+            if col in chunk.columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+        yield chunk
+
+
+def load_exception_spool(path):
+    """Reads a non-empty exceptions CSV written by reconcile_streaming back into a frame."""
+    return pd.concat(read_exception_spool(path), ignore_index=True)
+
+
+def _report_order(row):
+    # report_frame's order: missing keys (None) sort after every key, as sort_values puts them
+    status, tas, ussgl = row[:3]
+    return status, tas is None, tas or '', ussgl is None, ussgl or ''
+
+
+class ReportRuns:
+    """
+    The exception report spilled as sorted runs, one CSV per reconciled bucket.
+
+    add() writes a bucket's exceptions in report order (report_frame); rows()
+    merges the runs into the order generate_exception_report sorts a whole frame
+    into, reading each run a chunk at a time, so no more than about
+    REPORT_CHUNK_ROWS report rows are in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = []
+        self.n_rows = 0
+        self.widths = []
+
+    def add(self, exceptions):
+        formatted = report_frame(exceptions)
+        path = os.path.join(self.directory, f'run_{len(self.paths):04d}.csv')
+        formatted.to_csv(path, index=False)
+        self.paths.append(path)
+        self.n_rows += len(formatted)
+        widths = _column_widths(formatted)
+        self.widths = [max(pair) for pair in zip(self.widths, widths)] if self.widths else widths
+
+    def _read_run(self, path, chunk_rows):
+        for chunk in read_exception_spool(path, chunk_rows):
+            # A blank key was a missing key; blank messages stay ''
+            for col in ('TAS', 'USSGL_ACCOUNT'):
+                chunk[col] = chunk[col].where(chunk[col] != '', None)
+            columns = [chunk[col].astype(object).where(chunk[col].notna(), None).tolist() for col in REPORT_COLUMNS]
+            yield from zip(*columns)
+
+    def rows(self):
+        chunk_rows = max(MIN_RUN_CHUNK_ROWS, REPORT_CHUNK_ROWS // max(1, len(self.paths)))
+        return heapq.merge(*(self._read_run(path, chunk_rows) for path in self.paths), key=_report_order)
+
+
+def run_streaming_validation(gtas_input_path, erp_input_path, exception_output_path, fbdi_output_path,
+                             memory_budget_mb=512, spill_dir=None):
+    """
+    Streaming counterpart of the reconcile/report/FBDI steps of run_validation.
+    Each bucket's exceptions are spilled as a sorted run, and the report is
+    written from the merged runs through the write-only workbook.
+    """
+    with tempfile.TemporaryDirectory(dir=spill_dir) as runs_dir:
+        runs = ReportRuns(runs_dir)
+        summary = reconcile_streaming(gtas_input_path, erp_input_path, None, fbdi_output_path,
+                                      memory_budget_mb=memory_budget_mb, spill_dir=spill_dir,
+                                      on_exceptions=runs.add)
+        summary["exception_report_path"] = write_exception_report(runs.rows(), runs.n_rows, runs.widths,
+                                                                  exception_output_path)
+    return summary
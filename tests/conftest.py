@@ -0,0 +1,60 @@
+"""
+Both deployables import their modules by bare name (streaming, parallel, ...)
+and some names exist in both. Tests under tests/gcf and tests/prototype run
+against their own directory: use_deployable puts it first on sys.path and swaps
+the other deployable's modules out of sys.modules, at collection and again
+before each test module runs.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEPLOYABLES = {
+    'gcf': os.path.join(ROOT, 'gcf_gtas_validator'),
+    'prototype': os.path.join(ROOT, 'src', 'backend', 'python'),
+}
+
+_saved = {name: {} for name in DEPLOYABLES}
+_active = None
+
+
+def _owned(module, directory):
+    path = getattr(module, '__file__', None)
+    return path is not None and os.path.abspath(path).startswith(directory + os.sep)
+
+
+def use_deployable(name):
+    """Makes bare imports resolve to the modules of deployable name ('gcf' or 'prototype')."""
+    global _active
+    if name == _active:
+        return
+    if _active is not None:
+        directory = DEPLOYABLES[_active]
+        for module_name, module in list(sys.modules.items()):
+            if _owned(module, directory):
+                _saved[_active][module_name] = sys.modules.pop(module_name)
+        sys.path.remove(directory)
+    sys.path.insert(0, DEPLOYABLES[name])
+    sys.modules.update(_saved[name])
+    _active = name
+
+
+def _deployable_of(path):
+    parts = os.path.relpath(str(path), os.path.dirname(os.path.abspath(__file__))).split(os.sep)
+    return parts[0] if parts[0] in DEPLOYABLES else None
+
+
+def pytest_collectstart(collector):
+    if isinstance(collector, pytest.Module):
+        name = _deployable_of(collector.path)
+        if name is not None:
+            use_deployable(name)
+
+
+@pytest.fixture(autouse=True, scope='module')
+def _deployable(request):
+    name = _deployable_of(request.node.path)
+    if name is not None:
+        use_deployable(name)
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# main.py reads its configuration at import: keep outputs, jobs and stores in a scratch directory
+_scratch = tempfile.mkdtemp(prefix='fedreconcile-tests-')
+for name, value in {
+    'STORAGE_BACKEND': 'local',
+    'LOCAL_STORAGE_DIR': os.path.join(_scratch, 'storage'),
+    'JOB_DIR': os.path.join(_scratch, 'jobs'),
+    'RESULT_CACHE_DIR': os.path.join(_scratch, 'cache'),
+    'WARM_UP': 'lazy',
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,74 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+import main
+from cache import ResultCache, validate_cached
+from validation_logic import validate_erp_vs_gtas
+
+
+def inputs(n=120):
+    rng = np.random.default_rng(3)
+    tas = [f'TAS{i:03d}' for i in range(n // 4)]
+    erp_df = pd.DataFrame({'USSGL_ACCOUNT': np.resize([101000, 210000, 445000, 480100], n),
+                           'TAS': np.repeat(tas, 4), 'FUND': 'F1', 'NET_BALANCE': rng.integers(0, 4, n) * 100})
+    gtas_df = pd.DataFrame({'USSGL_ACCOUNT': np.resize(['101000', '210000', '445000', '480100'], n),
+                            'TAS': np.repeat(tas, 4), 'GTAS_BALANCE': rng.integers(0, 4, n) * 100})
+    return erp_df, gtas_df
+
+
+def sorted_frame(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    return ResultCache(str(tmp_path / 'cache'))
+
+
+def test_cached_results_match_the_serial_validation(result_cache):
+    erp_df, gtas_df = inputs()
+    expected = validate_erp_vs_gtas(erp_df.copy(), gtas_df.copy())
+    for cached_partitions in (0, cache.CACHE_PARTITIONS):
+        is_valid, errors, summary, fbdi = validate_cached(erp_df.copy(), gtas_df.copy(), result_cache)
+        assert summary['cached_partitions'] == cached_partitions
+        assert is_valid == expected[0] and summary['errors'] == expected[2]['errors'] > 0
+        # Partition order renumbers the rows; every error and correction is still there once
+        assert sorted(errors.to_frame()['message']) == sorted(expected[1].to_frame()['message'])
+        pd.testing.assert_frame_equal(sorted_frame(fbdi), sorted_frame(expected[3]), check_dtype=False)
+
+
+def test_a_changed_line_only_recomputes_its_partition(result_cache):
+    erp_df, gtas_df = inputs()
+    validate_cached(erp_df.copy(), gtas_df.copy(), result_cache)
+    erp_df.loc[5, 'NET_BALANCE'] += 1
+    summary = validate_cached(erp_df.copy(), gtas_df.copy(), result_cache)[2]
+    assert summary['cached_partitions'] == cache.CACHE_PARTITIONS - 1
+
+
+def test_keys_change_with_the_cache_version(monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_VERSION', cache.CACHE_VERSION + 1)
+    assert cache._logic_version() != cache.LOGIC_VERSION
+    assert set(cache.RESULT_MODULES) >= {'loaders', 'keys', 'validation_logic', 'fbdi', 'parallel', 'cache'}
+
+
+def test_eviction_keeps_the_most_recent_entries_within_the_size(tmp_path):
+    store = ResultCache(str(tmp_path), max_bytes=2500)
+    for i, key in enumerate(['a', 'b', 'c']):
+        store.put(key, b'x' * 1000)
+        os.utime(store._path(key), (time.time() - 10 + i,) * 2)
+    store.evict()
+    assert store.get('a') is None
+    assert store.get('c') == b'x' * 1000
+
+
+def test_the_cache_is_off_by_default():
+    if 'RESULT_CACHE_MB' in os.environ:
+        pytest.skip('RESULT_CACHE_MB is set')
+    main.warm_up()
+    assert main.RESULT_CACHE_MB == 0
+    assert main.result_cache is None
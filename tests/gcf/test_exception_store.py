@@ -0,0 +1,107 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import main
+from exception_store import ExceptionStore, store_records
+
+ERRORS = pd.DataFrame({
+    'row': [0, 1, 2, 3, 4],
+    'STATUS': ['Mismatch', 'Missing in GTAS', 'Missing in ERP', 'Mismatch', 'Mismatch'],
+    'TAS': ['020X', '020Y', '021X', '020X', None],
+    'USSGL_ACCOUNT': ['101000', '210000', '480100', 'ABC', '101000'],
+    'NET_BALANCE': [100.0, 5.0, None, 7.0, 1.0],
+    'GTAS_BALANCE': [90.0, None, 12.0, 7.5, 1.0],
+    'message': ['m0', 'm1', 'm2', 'm3', 'm4'],
+})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ExceptionStore(str(tmp_path / 'store'))
+    store.add('run-1', ERRORS, {'errors': len(ERRORS)})
+    return store
+
+
+def test_records_derive_amounts_and_account_numbers():
+    records = store_records(ERRORS)
+    assert records['amount'].tolist() == [10.0, 5.0, -12.0, -0.5, 0.0]
+    assert records['ussgl_number'].tolist() == [101000, 210000, 480100, None, 101000]
+    assert records['severity'].tolist() == ['error'] * 5
+    assert records['tas'].tolist()[-1] is None
+
+
+def test_filters_and_pages(store):
+    first = store.query('run-1', status='Mismatch', limit=2, count=True)
+    assert [e['message'] for e in first['exceptions']] == ['m0', 'm3']
+    assert first['matched'] == 3
+    second = store.query('run-1', status='Mismatch', limit=2, cursor=first['next_cursor'])
+    assert [e['message'] for e in second['exceptions']] == ['m4']
+    assert second['next_cursor'] is None
+
+    assert [e['message'] for e in store.query('run-1', tas_prefix='020')['exceptions']] == ['m0', 'm1', 'm3']
+    assert [e['message'] for e in store.query('run-1', ussgl_min=200000, ussgl_max=480100)['exceptions']] == ['m1', 'm2']
+    assert [e['message'] for e in store.query('run-1', min_amount=5)['exceptions']] == ['m0', 'm1', 'm2']
+
+
+def test_runs_are_listed_and_read_whole(store):
+    assert store.runs() == ['run-1']
+    assert store.run('run-1')['summary'] == {'errors': 5}
+    frame = store.read('run-1')
+    assert frame['seq'].tolist() == [0, 1, 2, 3, 4]
+    assert frame['message'].tolist() == ERRORS['message'].tolist()
+    assert store.read('unknown') is None
+    assert store.query('unknown') is None
+
+
+@pytest.mark.parametrize('run_id', ['../run', 'a/b', '..', ''])
+def test_run_ids_must_be_plain_names(store, run_id):
+    with pytest.raises(ValueError):
+        store.writer(run_id)
+    assert store.run(run_id) is None
+
+
+def test_a_failed_write_publishes_nothing(store):
+    with pytest.raises(RuntimeError):
+        with store.writer('run-2') as writer:
+            writer.add(ERRORS)
+            raise RuntimeError('validation failed')
+    assert store.runs() == ['run-1']
+    assert not [name for name in os.listdir(store.root) if name.endswith('.part')]
+
+
+def test_expired_runs_are_pruned(tmp_path):
+    store = ExceptionStore(str(tmp_path), max_age_seconds=60)
+    store.add('old', ERRORS)
+    os.utime(store.path('old'), (0, 0))
+    store.add('new', ERRORS)
+    assert store.runs() == ['new']
+
+
+def _inputs(n_mismatches):
+    erp = 'USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n' + ''.join(f'{100000 + i},F1,T{i},{i}\n' for i in range(n_mismatches))
+    gtas = 'USSGL_ACCOUNT,TAS,GTAS_BALANCE\n' + ''.join(f'{100000 + i},T{i},{i + 1}\n' for i in range(n_mismatches))
+    return io.BytesIO(erp.encode()), io.BytesIO(gtas.encode())
+
+
+def test_responses_keep_every_error_inline_without_a_store(monkeypatch):
+    monkeypatch.setattr(main, 'exception_store', None)
+    monkeypatch.setattr(main, 'RESPONSE_ERRORS', 10)
+    erp, gtas = _inputs(25)
+    result = main.reconcile_files(erp, 'csv', gtas, 'csv')
+    assert len(result['errors']) == 25
+    assert 'run_id' not in result
+    assert 'errors_truncated' not in result['summary']
+
+
+def test_a_configured_store_holds_every_error_and_the_response_the_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'exception_store', ExceptionStore(str(tmp_path)))
+    monkeypatch.setattr(main, 'RESPONSE_ERRORS', 10)
+    erp, gtas = _inputs(25)
+    result = main.reconcile_files(erp, 'csv', gtas, 'csv')
+    assert len(result['errors']) == 10
+    assert result['summary']['errors_truncated']
+    assert main.exception_store.run(result['run_id'])['total'] == 25
+
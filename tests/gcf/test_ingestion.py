@@ -0,0 +1,63 @@
+import io
+
+import pandas as pd
+import pytest
+from flask import Flask, request
+
+import main
+
+ERP_CSV = ('USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n'
+           '101000,F1,A0001,100\n210000,F1,A0001,5.5\n480100,F2,B0002,7\n101000,F1,A0001,1\n')
+GTAS_CSV = 'USSGL_ACCOUNT,TAS,GTAS_BALANCE\n101000.0,A0001,100\n210000,A0001,5\n445000,C0003,2\n'
+
+
+def comparable(result):
+    # Outputs are uploaded under a fresh prefix per run; metrics are timings
+    return {key: value for key, value in result.items() if key not in ('fbdi_file', 'exception_file', 'metrics')}
+
+
+def saved_outputs(result):
+    return [open(url[len('file://'):], 'rb').read() for url in (result['fbdi_file'], result['exception_file'])]
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    erp_path, gtas_path = tmp_path / 'erp.csv', tmp_path / 'gtas.csv'
+    erp_path.write_text(ERP_CSV)
+    gtas_path.write_text(GTAS_CSV)
+    return str(erp_path), str(gtas_path)
+
+
+def test_upload_streams_validate_like_saved_files(inputs, monkeypatch):
+    monkeypatch.setattr(main, 'exception_store', None)
+    from_paths = main.reconcile_files(inputs[0], 'csv', inputs[1], 'csv')
+    from_streams = main.reconcile_files(io.BytesIO(ERP_CSV.encode()), 'csv', io.BytesIO(GTAS_CSV.encode()), 'csv')
+    assert comparable(from_streams) == comparable(from_paths)
+    assert from_paths['summary']['errors'] > 0
+    assert saved_outputs(from_streams)[1] == saved_outputs(from_paths)[1]  # The exception report
+
+
+def test_columnar_upload_streams_validate_like_csv(monkeypatch):
+    monkeypatch.setattr(main, 'exception_store', None)
+    parquet = io.BytesIO()
+    pd.read_csv(io.StringIO(ERP_CSV)).to_parquet(parquet, index=False)
+    from_csv = main.reconcile_files(io.BytesIO(ERP_CSV.encode()), 'csv', io.BytesIO(GTAS_CSV.encode()), 'csv')
+    from_parquet = main.reconcile_files(parquet, 'parquet', io.BytesIO(GTAS_CSV.encode()), 'csv')
+    assert comparable(from_parquet) == comparable(from_csv)
+
+
+def test_a_synchronous_post_parses_the_uploads_in_place(monkeypatch):
+    monkeypatch.setattr(main, 'exception_store', None)
+    data = {'erp_file': (io.BytesIO(ERP_CSV.encode()), 'erp.csv'),
+            'gtas_file': (io.BytesIO(GTAS_CSV.encode()), 'gtas.csv')}
+    with Flask(__name__).test_request_context('/', method='POST', data=data, content_type='multipart/form-data'):
+        body = main.validate_gtas(request).get_json()
+    expected = main.reconcile_files(io.BytesIO(ERP_CSV.encode()), 'csv', io.BytesIO(GTAS_CSV.encode()), 'csv')
+    assert comparable(body) == comparable(expected)
+
+
+def test_a_post_without_both_files_is_rejected():
+    data = {'erp_file': (io.BytesIO(ERP_CSV.encode()), 'erp.csv')}
+    with Flask(__name__).test_request_context('/', method='POST', data=data, content_type='multipart/form-data'):
+        response, status = main.validate_gtas(request)
+    assert status == 400
@@ -0,0 +1,75 @@
+import cProfile
+import io
+import tracemalloc
+
+import flask
+import pytest
+
+import instrumentation
+import main
+from instrumentation import Instrumentation
+
+
+def test_stages_nest_and_are_summarized():
+    stages = Instrumentation(log=False)
+    with stages.stage('load', rows=10):
+        with stages.stage('parse') as record:
+            record['rows'] = 4
+    metrics = stages.summary()
+    assert [(s['stage'], s['rows']) for s in metrics['stages']] == [('load/parse', 4), ('load', 10)]
+    assert {'wall_s', 'cpu_s', 'rss_mb'} <= set(metrics['stages'][0])
+
+
+def test_tracing_runs_until_the_last_tracing_run_finishes():
+    assert not tracemalloc.is_tracing()
+    first = Instrumentation(trace_memory=True, log=False)
+    second = Instrumentation(trace_memory=True, log=False)
+    with first.stage('work'):
+        pass
+    first.summary()
+    assert tracemalloc.is_tracing()
+    with second.stage('work') as record:
+        pass
+    second.summary()
+    assert 'traced_peak_mb' in record
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        Instrumentation(trace_memory=True, log=False).summary()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('allowed, expected', [(False, False), (True, True)])
+def test_profiling_switches_need_allow_profiling(monkeypatch, allowed, expected):
+    monkeypatch.setattr(main, 'ALLOW_PROFILING', allowed)
+    with flask.Flask(__name__).test_request_context('/?profile=1&trace_memory=true', method='POST'):
+        assert main._diagnostics(flask.request) == {'profile': expected, 'trace_memory': expected}
+
+
+def test_close_stops_profiling_and_tracing_once():
+    with Instrumentation(profile=True, trace_memory=True, log=False) as stages:
+        assert tracemalloc.is_tracing()
+    stages.close()
+    assert not tracemalloc.is_tracing() and instrumentation._tracing_runs == 0
+    profiler = cProfile.Profile()
+    profiler.enable()  # Raises while another profiler is still active in this thread
+    profiler.disable()
+
+
+def test_a_failed_request_leaves_no_profiling_or_tracing(monkeypatch):
+    monkeypatch.setattr(main, 'ALLOW_PROFILING', True)
+    data = {'erp_file': (io.BytesIO(b'PAR1 not parquet'), 'erp.parquet'),
+            'gtas_file': (io.BytesIO(b'USSGL_ACCOUNT,TAS,GTAS_BALANCE\n'), 'gtas.csv')}
+    with flask.Flask(__name__).test_request_context('/?profile=1&trace_memory=1', method='POST', data=data,
+                                                    content_type='multipart/form-data'):
+        response, status = main.validate_gtas(flask.request)
+    assert status == 500
+    assert not tracemalloc.is_tracing() and instrumentation._tracing_runs == 0
+    profiler = cProfile.Profile()
+    profiler.enable()
+    profiler.disable()
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+from flask import Flask, request
+
+import main
+from jobs import FileJobStore, FileQueue, JobRunner
+
+
+@pytest.fixture
+def job_dir(tmp_path):
+    return str(tmp_path)
+
+
+def runner(job_dir, handler, lease_seconds=300, max_attempts=3, abandon=None):
+    # One instance's view of a shared JOB_DIR; workers=0, as in the function
+    return JobRunner(handler, FileJobStore(os.path.join(job_dir, 'records')),
+                     FileQueue(os.path.join(job_dir, 'queue'), poll_seconds=0.01, lease_seconds=lease_seconds,
+                               max_attempts=max_attempts),
+                     workers=0, abandon=abandon)
+
+
+def expire_claims(queue):
+    for name in os.listdir(queue.claimed):
+        os.utime(os.path.join(queue.claimed, name), (0, 0))
+
+
+def test_a_job_submitted_on_one_instance_runs_and_polls_on_others(job_dir):
+    api = runner(job_dir, handler=None)
+    worker = runner(job_dir, handler=lambda job_id, payload, progress: {'echo': payload['n']})
+    job_id = api.submit({'n': 7})
+    assert api.status(job_id)['status'] == 'queued'
+
+    assert worker.queue.get(timeout=0) == job_id
+    worker.run_one(job_id)
+    status = runner(job_dir, handler=None).status(job_id)
+    assert status['status'] == 'succeeded' and status['result'] == {'echo': 7}
+    assert 'payload' not in status
+    assert os.listdir(worker.queue.claimed) == []  # Acknowledged
+
+
+def test_each_job_is_claimed_once(job_dir):
+    first, second = runner(job_dir, None).queue, runner(job_dir, None).queue
+    first.put('a')
+    first.put('b')
+    assert [first.get(timeout=0), second.get(timeout=0), second.get(timeout=0)] == ['a', 'b', None]
+
+
+def test_a_job_whose_worker_died_is_requeued_in_its_place(job_dir):
+    api = runner(job_dir, handler=None)
+    first, second = api.submit({}), api.submit({})
+    dead_worker = runner(job_dir, handler=None)
+    assert dead_worker.queue.get(timeout=0) == first
+    expire_claims(dead_worker.queue)
+
+    worker = runner(job_dir, handler=lambda job_id, payload, progress: 'done')
+    worker.recover()
+    assert worker.status(first)['progress'] == {'stage': 'requeued'}
+    assert worker.queue.get(timeout=0) == first  # Ahead of the later submission
+    worker.run_one(first)
+    assert worker.queue.get(timeout=0) == second
+
+
+def test_a_live_claim_is_not_requeued(job_dir):
+    worker = runner(job_dir, handler=None, lease_seconds=60)
+    worker.queue.put('a')
+    assert worker.queue.get(timeout=0) == 'a'
+    worker.queue.heartbeat('a')
+    assert worker.queue.recover() == ([], [])
+
+
+def test_a_job_is_abandoned_after_max_attempts(job_dir):
+    abandoned = []
+    api = runner(job_dir, handler=None)
+    job_id = api.submit({'input_dir': 'x'})
+    worker = runner(job_dir, handler=None, max_attempts=2,
+                    abandon=lambda job_id, payload: abandoned.append((job_id, payload)))
+    for _ in range(2):
+        assert worker.queue.get(timeout=0) == job_id
+        expire_claims(worker.queue)
+        worker.recover()
+    assert worker.status(job_id)['status'] == 'failed'
+    assert abandoned == [(job_id, {'input_dir': 'x'})]
+    assert worker.queue.get(timeout=0) is None
+
+
+def test_old_records_are_pruned(job_dir):
+    store = FileJobStore(job_dir, max_age_seconds=60)
+    store.create('old', {'status': 'succeeded'})
+    os.utime(store._path('old'), (0, 0))
+    store.create('new', {'status': 'queued'})
+    assert store.get('old') is None and store.get('new') is not None
+
+
+def test_job_results_keep_the_first_errors(monkeypatch, tmp_path):
+    result = {'summary': {'errors': 5}, 'errors': [{'row': i} for i in range(5)]}
+    monkeypatch.setattr(main, 'reconcile_files', lambda *args, **kwargs: dict(result))
+    monkeypatch.setattr(main, 'JOB_RESULT_ERRORS', 2)
+    payload = {'input_dir': str(tmp_path), 'erp_path': 'e', 'erp_format': 'csv', 'gtas_path': 'g',
+               'gtas_format': 'csv'}
+    stored = main.run_job('job', payload, lambda stage, **details: None)
+    assert stored['errors'] == [{'row': 0}, {'row': 1}]
+    assert stored['summary'] == {'errors': 5, 'errors_truncated': True}
+    assert not tmp_path.exists()
+
+
+def test_async_mode_needs_a_shared_job_dir(monkeypatch):
+    monkeypatch.setattr(main, 'job_runner', None)
+    with Flask(__name__).test_request_context('/?job_id=abc'):
+        response, status = main.validate_gtas(request)
+    assert status == 404 and 'JOB_DIR' in response.get_json()['error']
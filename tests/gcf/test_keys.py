@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from keys import canonical_key_text, outer_join
+
+ON = ['USSGL_ACCOUNT', 'TAS']
+
+
+def _cells(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def assert_merge_parity(left, right, expected=None):
+    joined = outer_join(left, right, ON, suffixes=('_ERP', '_GTAS'), indicator=True)
+    if expected is None:
+        expected = pd.merge(left, right, on=ON, how='outer', suffixes=('_ERP', '_GTAS'), indicator=True)
+    assert list(joined.columns) == list(expected.columns)
+    assert _cells(joined) == _cells(expected)
+    return joined
+
+
+def erp(ussgl, tas, balance=None):
+    balance = list(range(len(ussgl))) if balance is None else balance
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'TAS': tas, 'NET_BALANCE': balance})
+
+
+def gtas(ussgl, tas, balance=None):
+    balance = list(range(len(ussgl))) if balance is None else balance
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'TAS': tas, 'GTAS_BALANCE': balance})
+
+
+def test_object_keys_match_pd_merge():
+    assert_merge_parity(erp(['101000', '210000', '445000'], ['A', 'B', 'C']),
+                        gtas(['210000', '101000', '480100'], ['B', 'A', 'C']))
+
+
+def test_int_and_float_keys_match_pd_merge():
+    # A missing account makes the GTAS column float64; pd.merge still joins by value
+    joined = assert_merge_parity(erp([101000, 210000, 445000], ['A', 'B', 'C']),
+                                 gtas([101000.0, np.nan, 445000.0], ['A', 'B', 'C']))
+    assert list(joined['_merge']) == ['both', 'left_only', 'both', 'right_only']
+
+
+def test_categorical_keys_match_pd_merge():
+    left = erp(['101000', '210000', None], ['A', 'B', 'C']).astype({'USSGL_ACCOUNT': 'category', 'TAS': 'category'})
+    right = gtas(['210000', '480100', None], ['B', 'C', 'C']).astype({'USSGL_ACCOUNT': 'category', 'TAS': 'category'})
+    assert_merge_parity(left, right)
+
+
+def test_repeated_keys_match_pd_merge():
+    assert_merge_parity(erp(['101000', '101000', '210000', '101000'], ['A', 'A', 'B', 'C']),
+                        gtas(['101000', '210000', '101000', '210000'], ['A', 'B', 'A', 'B']))
+
+
+def test_missing_keys_match_each_other():
+    assert_merge_parity(erp(['101000', None], [None, 'B']), gtas(['101000', None], [None, 'B']))
+
+
+@pytest.mark.parametrize('side', ['left', 'right', 'both'])
+def test_empty_sides_match_pd_merge(side):
+    left = erp(['101000', '210000'], ['A', 'B'])
+    right = gtas(['210000', '480100'], ['B', 'C'])
+    if side in ('left', 'both'):
+        left = left.iloc[:0]
+    if side in ('right', 'both'):
+        right = right.iloc[:0]
+    assert_merge_parity(left, right)
+
+
+def test_text_and_numeric_keys_join_as_canonical_text():
+    # pd.merge refuses int64 against object keys; the join compares canonical text
+    left = erp([101000, 210000, 445000], ['A', 'B', 'C'])
+    right = gtas(['101000', '210000.0', None], ['A', 'B', 'C'])
+    expected = pd.merge(left.astype({'USSGL_ACCOUNT': str}), right.assign(USSGL_ACCOUNT=['101000', '210000', None]),
+                        on=ON, how='outer', suffixes=('_ERP', '_GTAS'), indicator=True)
+    joined = assert_merge_parity(left, right, expected)
+    assert (joined['_merge'] == 'both').sum() == 2
+
+
+def test_categorical_against_numeric_keys_join():
+    left = erp(['101000', '210000'], ['A', 'B']).astype({'USSGL_ACCOUNT': 'category', 'TAS': 'category'})
+    right = gtas([101000.0, np.nan], ['A', 'B'])
+    joined = outer_join(left, right, ON, indicator=True)
+    assert list(joined['_merge']) == ['both', 'left_only', 'right_only']
+    assert list(joined['USSGL_ACCOUNT'][:2]) == ['101000', '210000']
+
+
+def test_canonical_key_text():
+    values = pd.Series([101000, 101000.0, '101000', '101000.0', '-5.00', '1.5', None, 'X101'], dtype=object)
+    text = canonical_key_text(values)
+    assert list(text.astype(object)[:6]) == ['101000'] * 4 + ['-5', '1.5']
+    assert pd.isna(text[6])
+    assert text[7] == 'X101'
+    assert canonical_key_text(pd.Series(['B', 'A'], dtype='category')) is not None
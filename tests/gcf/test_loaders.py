@@ -0,0 +1,104 @@
+import io
+
+import pandas as pd
+import pytest
+
+from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories, detect_format, read_trial_balance
+from validation_logic import validate_erp_vs_gtas
+
+from tests.gcf import baseline
+
+ERP_CSV = (
+    'USSGL_ACCOUNT,FUND,TAS,NET_BALANCE,COST_CENTER\n'
+    '101000,F1,AAAAA,100,C1\n'
+    '210000,F1,BBBBB,-25,C2\n'
+    '445000,F2,CCCCC,7,C3\n'
+    '480100,F2,DDDDD,0,C4\n'
+)
+GTAS_CSV = (
+    'ussgl_account, tas ,gtas_balance\n'
+    '101000,AAAAA,90\n'
+    '210000,BBBBB,-25\n'
+    '445000,CCCCC,{balance}\n'
+    '490200,EEEEE,12\n'
+)
+
+
+def load(erp_csv, gtas_csv):
+    erp_df = read_trial_balance(io.BytesIO(erp_csv.encode()), ERP_SCHEMA)
+    gtas_df = read_trial_balance(io.BytesIO(gtas_csv.encode()), GTAS_SCHEMA)
+    align_key_categories(erp_df, gtas_df)
+    return erp_df, gtas_df
+
+
+def assert_baseline_messages(erp_csv, gtas_csv):
+    expected = baseline.validate_erp_vs_gtas(pd.read_csv(io.StringIO(erp_csv)), pd.read_csv(io.StringIO(gtas_csv)))
+    actual = validate_erp_vs_gtas(*load(erp_csv, gtas_csv))
+    assert actual[1].to_records() == expected[1]
+    assert actual[2] == expected[2]
+
+
+@pytest.mark.parametrize('balance', ['7', '7.5', 'n/a', 'abc'])
+def test_messages_match_the_inferred_read_csv_baseline(balance):
+    assert_baseline_messages(ERP_CSV, GTAS_CSV.format(balance=balance))
+
+
+@pytest.mark.parametrize('balances', [('', 'abc'), ('abc', ''), ('n/a', 'abc'), ('', '')])
+def test_blank_cells_beside_text_balances_match_the_baseline(balances):
+    # A text cell makes the column text; its blank cells must still compare as NaN
+    erp_rows = ''.join(f'{tas},101000,F1,{balance}\n' for tas, balance in zip(['A1234', 'B1234'], balances))
+    gtas_rows = ''.join(f'{tas},101000,{balance}\n' for tas, balance in zip(['A1234', 'B1234'], balances))
+    assert_baseline_messages('TAS,USSGL_ACCOUNT,FUND,NET_BALANCE\n' + erp_rows,
+                             'TAS,USSGL_ACCOUNT,GTAS_BALANCE\nA1234,101000,5\nB1234,101000,\n')
+    assert_baseline_messages('TAS,USSGL_ACCOUNT,FUND,NET_BALANCE\nA1234,101000,F1,5\nB1234,101000,F1,\n',
+                             'TAS,USSGL_ACCOUNT,GTAS_BALANCE\n' + gtas_rows)
+
+
+def test_matched_integer_balances_print_without_a_fraction():
+    erp_csv = 'USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n101000,F1,AAAAA,100\n'
+    gtas_csv = 'USSGL_ACCOUNT,TAS,GTAS_BALANCE\n101000,AAAAA,90\n'
+    assert_baseline_messages(erp_csv, gtas_csv)
+    errors = validate_erp_vs_gtas(*load(erp_csv, gtas_csv))[1].to_records()
+    assert errors[0]['message'].endswith('ERP NET_BALANCE=100, GTAS_BALANCE=90')
+
+
+def test_balance_types_follow_the_file():
+    erp_df, gtas_df = load(ERP_CSV, GTAS_CSV.format(balance='7.5'))
+    assert erp_df['NET_BALANCE'].dtype == 'int64'
+    assert gtas_df['GTAS_BALANCE'].dtype == 'float64'
+    assert isinstance(erp_df['USSGL_ACCOUNT'].dtype, pd.CategoricalDtype)
+    _, text = load(ERP_CSV, GTAS_CSV.format(balance='abc'))
+    assert list(text['GTAS_BALANCE']) == ['90', '-25', 'abc', '12']
+
+
+def test_a_fraction_past_the_first_block_makes_the_column_float():
+    rows = ''.join(f'{100000 + i % 900000},F1,T{i:07d},{i}\n' for i in range(80_000))
+    source = io.BytesIO(('USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n' + rows + '101000,F1,ZZZZZ,1.5\n').encode())
+    df = read_trial_balance(source, ERP_SCHEMA)
+    assert df['NET_BALANCE'].dtype == 'float64'
+    assert df['NET_BALANCE'].iloc[-1] == 1.5
+
+
+def test_columns_outside_the_schema_are_projected_away_unless_asked_for():
+    assert 'COST_CENTER' not in read_trial_balance(io.BytesIO(ERP_CSV.encode()), ERP_SCHEMA).columns
+    df = read_trial_balance(io.BytesIO(ERP_CSV.encode()), ERP_SCHEMA, columns=list(ERP_SCHEMA) + ['COST_CENTER'])
+    assert list(df['COST_CENTER']) == ['C1', 'C2', 'C3', 'C4']
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_columnar_inputs_load_like_csv(tmp_path, fmt):
+    frame = pd.read_csv(io.StringIO(ERP_CSV))
+    path = str(tmp_path / f'erp.{fmt}')
+    getattr(frame, f'to_{fmt}')(path)
+    from_csv = read_trial_balance(io.BytesIO(ERP_CSV.encode()), ERP_SCHEMA)
+    pd.testing.assert_frame_equal(read_trial_balance(path, ERP_SCHEMA), from_csv)
+
+
+def test_renames_apply_before_normalizing():
+    source = io.BytesIO(b'USSGL,TAS,GTAS_Balance\n101000,AAAAA,5\n')
+    df = read_trial_balance(source, GTAS_SCHEMA, renames={'USSGL': 'USSGL_ACCOUNT'})
+    assert list(df.columns) == ['USSGL_ACCOUNT', 'TAS', 'GTAS_BALANCE']
+
+
+def test_detect_format():
+    assert [detect_format(n) for n in ('a.CSV', 'a.pq', 'a.arrow', None)] == ['csv', 'parquet', 'feather', 'csv']
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from keys import bucket_ids, key_hashes
+from parallel import shared_executor, validate_erp_vs_gtas_parallel
+from validation_logic import validate_erp_vs_gtas
+
+
+def erp(ussgl, tas, balance):
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'TAS': tas, 'NET_BALANCE': balance})
+
+
+def gtas(ussgl, tas, balance):
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'TAS': tas, 'GTAS_BALANCE': balance})
+
+
+def test_equal_keys_share_a_bucket_whatever_their_type():
+    frames = [
+        pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': [101000]}),
+        pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': [101000.0]}),
+        pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': ['101000']}),
+        pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': ['101000.0']}),
+        pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': ['101000']}, dtype='category'),
+    ]
+    hashes = {int(key_hashes(frame)[0]) for frame in frames}
+    assert len(hashes) == 1
+    assert len({int(bucket_ids(frame, 7)[0]) for frame in frames}) == 1
+
+
+def test_missing_keys_hash_equally():
+    left = pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': [np.nan]})
+    right = pd.DataFrame({'TAS': ['A'], 'USSGL_ACCOUNT': [None]}, dtype=object)
+    assert key_hashes(left)[0] == key_hashes(right)[0]
+
+
+@pytest.mark.parametrize('erp_ussgl', [
+    [101000, 210000, 445000, 480100],
+    [101000.0, 210000.0, 445000.0, np.nan],
+])
+def test_sharded_validation_matches_serial(erp_ussgl):
+    rng = np.random.default_rng(7)
+    tas = [f'TAS{i:03d}' for i in range(40)]
+    erp_df = erp(np.resize(erp_ussgl, 160), np.repeat(tas, 4), rng.integers(0, 5, 160) * 100)
+    gtas_df = gtas(np.resize(['101000', '210000', '445000', '480100'], 160), np.repeat(tas, 4),
+                   rng.integers(0, 5, 160) * 100)
+
+    expected = validate_erp_vs_gtas(erp_df.copy(), gtas_df.copy())
+    actual = validate_erp_vs_gtas_parallel(erp_df.copy(), gtas_df.copy(), workers=1, shards=5)
+    assert actual[0] == expected[0]
+    assert actual[2] == expected[2]
+    # Shards reorder the rows; every error and correction is still reported once
+    assert sorted(actual[1].to_frame()['message']) == sorted(expected[1].to_frame()['message'])
+    assert len(actual[1]) > 0
+    pd.testing.assert_frame_equal(
+        actual[3].sort_values(list(actual[3].columns)).reset_index(drop=True),
+        expected[3].sort_values(list(expected[3].columns)).reset_index(drop=True), check_dtype=False)
+
+
+def test_shared_executor_is_kept_per_worker_count():
+    assert shared_executor(2) is shared_executor(2)
+    assert shared_executor(2) is not shared_executor(3)
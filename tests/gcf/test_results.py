@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from validation_logic import validate_erp_vs_gtas
+from validators.results import ErrorTable
+
+from tests.gcf import baseline
+
+
+def table():
+    errors = ErrorTable()
+    errors.add([3, 1], ['Only in {SIDE}.', 'At {TAS}/{USSGL}: {AMOUNT}'], codes=[1, 0],
+               values={'SIDE': ['ERP', 'GTAS'], 'TAS': ['X1', None], 'USSGL': [101000, 'A'],
+                       'AMOUNT': [np.float64(2.5), 7]})
+    errors.append({'row': None, 'message': 'Missing ERP columns: FUND'})
+    errors.add_message(np.array([4]), 'Literal {braces}', message_field='error_message', severity='Fatal')
+    return errors
+
+
+def test_records_render_each_row_in_block_order():
+    assert table().to_records() == [
+        {'row': 3, 'message': 'At X1/101000: 2.5'},
+        {'row': 1, 'message': 'Only in GTAS.'},
+        {'row': None, 'message': 'Missing ERP columns: FUND'},
+        {'row': 4, 'severity': 'Fatal', 'error_message': 'Literal {braces}'},
+    ]
+    assert len(table()) == 4
+
+
+def test_frames_hold_the_records_and_optionally_the_values():
+    frame = table().to_frame()
+    assert frame['message'].tolist()[:3] == ['At X1/101000: 2.5', 'Only in GTAS.', 'Missing ERP columns: FUND']
+    assert frame['severity'].astype(object).tolist()[3] == 'Fatal'
+    details = table().to_frame(details=True)
+    assert details['TAS'].tolist()[:2] == ['X1', None]
+    assert ErrorTable().to_frame().empty
+
+
+def test_head_and_shift_rows_span_blocks_without_changing_the_source():
+    errors = table()
+    assert [record['row'] for record in errors.head(3)] == [3, 1, None]
+    assert [record['row'] for record in errors.shift_rows(10)] == [13, 11, None, 14]
+    assert [record['row'] for record in errors] == [3, 1, None, 4]
+    assert len(ErrorTable().extend(errors).extend(errors.head(1))) == 5
+
+
+def test_no_rows_add_no_block():
+    assert len(ErrorTable().add([], 'never')) == 0
+
+
+def assert_baseline(erp_df, gtas_df):
+    expected = baseline.validate_erp_vs_gtas(erp_df.copy(), gtas_df.copy())
+    actual = validate_erp_vs_gtas(erp_df.copy(), gtas_df.copy())
+    assert actual[1].to_records() == expected[1]
+    assert actual[:1] + actual[2:3] == expected[:1] + expected[2:3]
+
+
+def erp(ussgl, tas, balance):
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'FUND': ['F1'] * len(tas), 'TAS': tas, 'NET_BALANCE': balance})
+
+
+def gtas(ussgl, tas, balance):
+    return pd.DataFrame({'USSGL_ACCOUNT': ussgl, 'TAS': tas, 'GTAS_BALANCE': balance})
+
+
+def test_repeated_keys_match_the_row_wise_baseline():
+    assert_baseline(erp([101000, 101000, 210000], ['A', 'A', 'B'], [1.0, 2.0, 3.0]),
+                    gtas([101000, 101000, 480100], ['A', 'A', 'C'], [1.0, 5.0, 'n/a']))
+
+
+def test_comparison_errors_match_the_row_wise_baseline():
+    assert_baseline(erp([101000, 210000], ['A', 'B'], ['1', None]),
+                    gtas([101000, 210000], ['A', 'B'], ['x', 2]))
+
+
+@pytest.mark.parametrize('empty', ['erp', 'gtas', 'both'])
+def test_empty_sides_match_the_row_wise_baseline(empty):
+    e = erp([101000, 210000], ['A', 'B'], [1.0, 2.0])
+    g = gtas([101000, 480100], ['A', 'C'], [1.0, 3.0])
+    assert_baseline(e.iloc[:0] if empty in ('erp', 'both') else e, g.iloc[:0] if empty in ('gtas', 'both') else g)
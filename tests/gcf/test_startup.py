@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+from tests.conftest import DEPLOYABLES
+
+PROBE = '''
+import json, sys
+import main
+before = [m for m in ('pandas', 'numpy', 'pyarrow') if m in sys.modules]
+formats = [main.detect_format(name) for name in ('a.CSV', 'b.parquet', 'c.arrow', None)]
+main.warm_up()
+print(json.dumps({'before': before, 'formats': formats, 'registry': main.rule_registry is not None}))
+'''
+
+
+def test_main_detects_formats_without_pandas_and_compiles_the_catalog_at_warm_up(tmp_path):
+    env = dict(os.environ, WARM_UP='lazy', STORAGE_BACKEND='local', LOCAL_STORAGE_DIR=str(tmp_path))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=DEPLOYABLES['gcf'], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    probe = json.loads(output.strip().splitlines()[-1])
+    assert probe == {'before': [], 'formats': ['csv', 'parquet', 'feather', 'csv'], 'registry': True}
@@ -0,0 +1,126 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from loaders import ERP_SCHEMA, GTAS_SCHEMA, align_key_categories, read_trial_balance
+from partitions import number_type, partition_csv
+from streaming import validate_streaming
+from validation_logic import validate_erp_vs_gtas
+
+# A tiny budget splits even these inputs into many buckets
+TINY_BUDGET_MB = 0.002
+
+
+def write_inputs(tmp_path, erp_rows, gtas_rows):
+    erp_path = tmp_path / 'erp.csv'
+    gtas_path = tmp_path / 'gtas.csv'
+    pd.DataFrame(erp_rows, columns=['USSGL_ACCOUNT', 'FUND', 'TAS', 'NET_BALANCE']).to_csv(erp_path, index=False)
+    pd.DataFrame(gtas_rows, columns=['USSGL_ACCOUNT', 'TAS', 'GTAS_BALANCE']).to_csv(gtas_path, index=False)
+    return str(erp_path), str(gtas_path)
+
+
+def in_memory(erp_path, gtas_path):
+    erp_df = read_trial_balance(erp_path, ERP_SCHEMA)
+    gtas_df = read_trial_balance(gtas_path, GTAS_SCHEMA)
+    align_key_categories(erp_df, gtas_df)
+    return validate_erp_vs_gtas(erp_df, gtas_df)
+
+
+def streamed(tmp_path, erp_path, gtas_path, **kwargs):
+    exceptions = tmp_path / 'exceptions.csv'
+    fbdi = tmp_path / 'fbdi.csv'
+    result = validate_streaming(erp_path, gtas_path, str(exceptions), str(fbdi), spill_dir=str(tmp_path), **kwargs)
+    return result, pd.read_csv(exceptions) if exceptions.stat().st_size > 1 else pd.DataFrame(), pd.read_csv(fbdi)
+
+
+def ledger(n, seed):
+    rng = np.random.default_rng(seed)
+    ussgl = rng.choice([101000, 210000, 445000, 480100], n)
+    tas = [f'T{i % 37:03d}' for i in range(n)]
+    return ussgl, tas, np.round(rng.uniform(-1000, 1000, n), 2)
+
+
+def test_streaming_matches_the_in_memory_run(tmp_path):
+    ussgl, tas, balance = ledger(400, seed=1)
+    erp_rows = [(u, f'F{i % 3}', t, b) for i, (u, t, b) in enumerate(zip(ussgl, tas, balance))]
+    erp_rows = list({(u, t): row for row, u, t in zip(erp_rows, ussgl, tas)}.values())
+    gtas_rows = [(u, t, b if i % 4 else b + 1.5) for i, (u, _, t, b) in enumerate(erp_rows[40:])]
+    gtas_rows += [(490200, f'G{i:03d}', 12.5) for i in range(30)]  # Missing in ERP
+    erp_path, gtas_path = write_inputs(tmp_path, erp_rows, gtas_rows)
+
+    _, expected, expected_summary, expected_fbdi = in_memory(erp_path, gtas_path)
+    (is_valid, sample, summary, _), exceptions, fbdi = streamed(tmp_path, erp_path, gtas_path,
+                                                                 memory_budget_mb=TINY_BUDGET_MB, max_errors=10)
+
+    assert summary['partitions'] > 1
+    assert not is_valid
+    assert summary['total_rows'] == expected_summary['total_rows']
+    assert summary['errors'] == len(expected) == len(exceptions)
+    assert sorted(exceptions['message']) == sorted(record['message'] for record in expected)
+    assert exceptions['row'].is_unique
+    assert len(sample) == 10 and summary['errors_truncated']
+    assert len(fbdi) == len(expected_fbdi)
+    assert np.isclose(fbdi['ENTERED_DEBIT_AMOUNT'].sum(), expected_fbdi['ENTERED_DEBIT_AMOUNT'].sum())
+
+
+def test_keys_formatted_differently_in_each_file_still_match(tmp_path):
+    erp_path = tmp_path / 'erp.csv'
+    gtas_path = tmp_path / 'gtas.csv'
+    erp_path.write_text('USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n101000,F1,A,100\n210000,F1,B,5\n')
+    gtas_path.write_text('USSGL_ACCOUNT,TAS,GTAS_BALANCE\n101000.0,A,100\n210000.0,B,7\n')
+
+    (_, _, summary, _), exceptions, _ = streamed(tmp_path, str(erp_path), str(gtas_path),
+                                                 memory_budget_mb=TINY_BUDGET_MB)
+    assert summary['total_rows'] == 2
+    assert list(exceptions['message']) == [
+        'Balance mismatch at USSGL 210000, TAS B: ERP NET_BALANCE=5, GTAS_BALANCE=7']
+
+
+def test_empty_inputs_write_empty_outputs(tmp_path):
+    erp_path, gtas_path = write_inputs(tmp_path, [], [])
+    (is_valid, sample, summary, _), exceptions, fbdi = streamed(tmp_path, erp_path, gtas_path)
+    assert is_valid and len(sample) == 0
+    assert summary['total_rows'] == 0
+    assert exceptions.empty and fbdi.empty
+
+
+def test_missing_columns_are_reported_before_partitioning(tmp_path):
+    erp_path = tmp_path / 'erp.csv'
+    gtas_path = tmp_path / 'gtas.csv'
+    erp_path.write_text('USSGL_ACCOUNT,TAS,NET_BALANCE\n101000,A,1\n')
+    gtas_path.write_text('USSGL_ACCOUNT,TAS,GTAS_BALANCE\n101000,A,1\n')
+    (is_valid, sample, _, _), _, _ = streamed(tmp_path, str(erp_path), str(gtas_path))
+    assert not is_valid
+    assert sample.to_records()[0]['message'] == 'Missing ERP columns: FUND'
+
+
+@pytest.mark.parametrize('values, expected', [
+    (['1', '-2'], 'int64'),
+    (['1', None], 'float64'),  # Missing values make a whole-number column float64 in memory too
+    (['1', '2.5'], 'float64'),
+    (['1', 'abc'], 'text'),
+    ([None, None], 'float64'),
+])
+def test_number_type(values, expected):
+    assert number_type(pd.Series(values, dtype=object)) == expected
+
+
+def test_buckets_keep_the_file_wide_balance_type(tmp_path):
+    # The fraction is in one bucket only; every bucket still reads float64, as the whole file does
+    rows = ''.join(f'{100000 + i},F1,T{i},{i}\n' for i in range(50)) + '999999,F1,TX,0.5\n'
+    source = io.BytesIO(('USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n' + rows).encode())
+    parts = partition_csv(source, str(tmp_path), 'erp', 8, 1000, ERP_SCHEMA)
+
+    assert parts.schema['NET_BALANCE'] == 'float64'
+    frames = [parts.read(bucket) for bucket in range(8)]
+    assert {str(df['NET_BALANCE'].dtype) for df in frames} == {'float64'}
+    assert all(isinstance(df['TAS'].dtype, pd.CategoricalDtype) for df in frames if len(df))
+    assert sum(len(df) for df in frames) == 51
+
+
+def test_partitioning_requires_the_key_columns(tmp_path):
+    source = io.BytesIO(b'USSGL_ACCOUNT,FUND,NET_BALANCE\n101000,F1,1\n')
+    with pytest.raises(ValueError, match='missing key columns: TAS'):
+        partition_csv(source, str(tmp_path), 'erp', 2, 1000, ERP_SCHEMA)
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+import main
+import utils
+from fbdi import COMPRESSION_CONTENT_TYPES, COMPRESSION_SUFFIXES
+from utils import GcsStorage, guess_content_type, upload_and_get_signed_url
+
+
+class FakeBlob:
+    def __init__(self, uploads, name):
+        self.uploads = uploads
+        self.name = name
+
+    def upload_from_file(self, stream, content_type=None, retry=None):
+        self.uploads.append((self.name, content_type, stream.read()))
+
+    def generate_signed_url(self, expiration, credentials):
+        return f'https://signed/{self.name}'
+
+
+class FakeClient:
+    def __init__(self):
+        self.uploads = []
+
+    def bucket(self, name):
+        return self
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self.uploads, name)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(utils, 'get_storage_client', lambda: (client, None))
+    return client
+
+
+def test_every_fbdi_compression_has_a_content_type():
+    assert COMPRESSION_CONTENT_TYPES.keys() == COMPRESSION_SUFFIXES.keys()
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        assert guess_content_type('journal' + suffix) == COMPRESSION_CONTENT_TYPES[compression]
+
+
+def test_uploads_carry_their_content_type(client):
+    GcsStorage('bucket').upload(io.BytesIO(b'a,b\n'), 'runs/x/report.csv', 'text/csv')
+    assert client.uploads == [('runs/x/report.csv', 'text/csv', b'a,b\n')]
+    with pytest.raises(ValueError, match='content type'):
+        GcsStorage('bucket').upload(io.BytesIO(b''), 'runs/x/report.csv', None)
+
+
+def test_file_uploads_guess_the_content_type(client, tmp_path):
+    path = tmp_path / 'journal.csv.gz'
+    path.write_bytes(b'\x1f\x8b')
+    assert upload_and_get_signed_url(str(path), 'bucket', 'runs/x/journal.csv.gz') == 'https://signed/runs/x/journal.csv.gz'
+    assert client.uploads[0][1] == 'application/gzip'
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'zip'])
+def test_reconciliation_outputs_are_uploaded_with_their_types(monkeypatch, compression):
+    uploads = []
+
+    class RecordingStorage:
+        def upload(self, stream, blob_name, content_type):
+            uploads.append((blob_name.rsplit('/', 1)[1], content_type))
+            return blob_name
+
+    monkeypatch.setattr(main, 'storage', RecordingStorage())
+    monkeypatch.setattr(main, 'FBDI_COMPRESSION', compression)
+    erp = io.BytesIO(b'USSGL_ACCOUNT,FUND,TAS,NET_BALANCE\n101000,F1,T1,5\n')
+    gtas = io.BytesIO(b'USSGL_ACCOUNT,TAS,GTAS_BALANCE\n101000,T1,4\n')
+    main.reconcile_files(erp, 'csv', gtas, 'csv')
+    assert sorted(uploads) == sorted([
+        ('exception_report.csv', 'text/csv'),
+        ('fbdi_journal_corrections' + COMPRESSION_SUFFIXES[compression], COMPRESSION_CONTENT_TYPES[compression]),
+    ])
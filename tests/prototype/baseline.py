@@ -0,0 +1,97 @@
+"""
+The prototype's reconciliation, GTAS edits and FBDI builder as they were before
+any optimization (row by row with apply and iterrows), kept as the reference for
+parity tests.
+"""
+from datetime import datetime
+
+import pandas as pd
+
+TOLERANCE = 0.01
+
+
+def apply_gtas_edits_expanded_safe(df):
+    df = df.copy()
+    df['GTAS_FATAL_ERROR'] = ''
+    df['GTAS_ADVISORY_NOTE'] = ''
+
+    def gtas_checks(row):
+        fatal = []
+        note = []
+        try:
+            float_balance = float(row['GTAS_BALANCE'])
+        except (ValueError, TypeError):
+            fatal.append("Non-numeric GTAS balance")
+            return pd.Series({'GTAS_FATAL_ERROR': '; '.join(fatal), 'GTAS_ADVISORY_NOTE': '; '.join(note)})
+
+        if pd.isna(row['TAS']) or pd.isna(row['USSGL_ACCOUNT']):
+            fatal.append("Missing required field: TAS or USSGL")
+        if str(row['TAS']).startswith('X') and str(row['USSGL_ACCOUNT']) == '101000' and float_balance != 0:
+            fatal.append("Canceled TAS must have 0 balance for USSGL 101000")
+        if str(row['USSGL_ACCOUNT']).startswith('210') and abs(float_balance) > 0:
+            note.append("210000 series should net to zero")
+        if str(row['USSGL_ACCOUNT']) == '445000' and float_balance != 0:
+            note.append("445000 should typically be zero")
+        if str(row['USSGL_ACCOUNT']).startswith('4') and float_balance < 0:
+            note.append("Negative balance for budgetary account")
+        if len(str(row['TAS'])) < 5:
+            note.append("TAS format may be invalid or too short")
+        return pd.Series({'GTAS_FATAL_ERROR': '; '.join(fatal), 'GTAS_ADVISORY_NOTE': '; '.join(note)})
+
+    df[['GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']] = df.apply(gtas_checks, axis=1)
+    return df
+
+
+def determine_status(row):
+    # Presence inferred from non-zero balances, before the merge indicator was used
+    if row['GTAS_BALANCE'] == 0 and row['NET_BALANCE'] != 0:
+        return 'Missing in GTAS'
+    if row['NET_BALANCE'] == 0 and row['GTAS_BALANCE'] != 0:
+        return 'Missing in ERP'
+    if abs(row['DIFFERENCE']) > TOLERANCE:
+        return 'Mismatch'
+    return 'Matched'
+
+
+def validate_and_reconcile(gtas_df, erp_df):
+    merged_df = pd.merge(gtas_df, erp_df, on=['TAS', 'USSGL_ACCOUNT'], how='outer')
+    merged_df['GTAS_BALANCE'] = pd.to_numeric(merged_df['GTAS_BALANCE'], errors='coerce').fillna(0)
+    merged_df['NET_BALANCE'] = pd.to_numeric(merged_df['NET_BALANCE'], errors='coerce').fillna(0)
+    merged_df['DIFFERENCE'] = merged_df['GTAS_BALANCE'] - merged_df['NET_BALANCE']
+    merged_df['STATUS'] = merged_df.apply(determine_status, axis=1)
+    validated_df = apply_gtas_edits_expanded_safe(merged_df)
+    return validated_df[(validated_df['STATUS'] != 'Matched') | (validated_df['GTAS_FATAL_ERROR'] != '')].copy()
+
+
+def build_fbdi_rows(exceptions_df):
+    """The rows the baseline generate_fbdi_file wrote, as a frame."""
+    if exceptions_df.empty:
+        return pd.DataFrame()
+    corrections_df = exceptions_df[exceptions_df['STATUS'].isin(['Mismatch', 'Missing in GTAS'])].copy()
+    if corrections_df.empty:
+        return pd.DataFrame()
+
+    fbdi_data = []
+    for index, row in corrections_df.iterrows():
+        correction_amount = -row['DIFFERENCE']
+        fbdi_data.append({
+            'STATUS_CODE': 'NEW',
+            'LEDGER_ID': 1,
+            'EFFECTIVE_DATE': '2025-06-30',
+            'JOURNAL_SOURCE': 'FedReconcile',
+            'JOURNAL_CATEGORY': 'Reconciliation',
+            'CURRENCY_CODE': 'USD',
+            'JOURNAL_ENTRY_CREATION_DATE': datetime.now().strftime('%Y-%m-%d'),
+            'ACTUAL_FLAG': 'A',
+            'SEGMENT1': '101',
+            'SEGMENT2': 'Finance',
+            'SEGMENT3': str(row['USSGL_ACCOUNT']),
+            'SEGMENT4': str(row.get('FUND', '')),
+            'SEGMENT5': str(row['TAS']),
+            'ENTERED_DEBIT_AMOUNT': max(0, correction_amount),
+            'ENTERED_CREDIT_AMOUNT': max(0, -correction_amount),
+            'REFERENCE_COLUMN_1': 'FedReconcile Correction',
+            'REFERENCE_COLUMN_2': f"Correcting {row['STATUS']}" + (
+                f" ({row['GTAS_FATAL_ERROR']})" if row['GTAS_FATAL_ERROR'] else ''),
+        })
+    return pd.DataFrame(fbdi_data)
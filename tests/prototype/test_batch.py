@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from batch import load_exception_store, load_manifest, run_batch, run_submission, store_frame
+from exception_store import ExceptionStore
+
+GTAS_CSV = 'TAS,USSGL,GTAS_Balance\n' + ''.join(f'T{i:03d},{101000 + i % 4},{i * 1.5}\n' for i in range(60))
+ERP_CSV = 'TAS,USSGL_ACCOUNT,FUND,NET_BALANCE\n' + ''.join(
+    f'T{i:03d},{101000 + i % 4},F1,{i * 1.5 + (i % 7 == 0)}\n' for i in range(10, 70))
+
+
+@pytest.fixture
+def submission(tmp_path):
+    (tmp_path / 'gtas.csv').write_text(GTAS_CSV)
+    (tmp_path / 'erp.csv').write_text(ERP_CSV)
+    return {'submission_id': 'in-memory', 'agency': '020', 'period': '2025-09',
+            'gtas_path': str(tmp_path / 'gtas.csv'), 'erp_path': str(tmp_path / 'erp.csv')}
+
+
+def report_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    return [row for sheet in workbook.worksheets for row in sheet.iter_rows(values_only=True)]
+
+
+def test_streamed_submission_matches_the_in_memory_one(tmp_path, submission):
+    output_dir = str(tmp_path / 'out')
+    in_memory = run_submission(submission, output_dir)
+    streamed = run_submission(dict(submission, submission_id='streamed'), output_dir, memory_budget_mb=0.002)
+
+    assert in_memory['success'] and streamed['success']
+    assert streamed['summary']['partitions'] > 1
+    assert streamed['exceptions'] == in_memory['exceptions'] > 0
+    assert report_rows(streamed['exception_report_path']) == report_rows(in_memory['exception_report_path'])
+
+    store = load_exception_store(str(tmp_path / 'out' / 'exceptions'))
+    columns = ['status', 'severity', 'tas', 'ussgl', 'amount', 'message']
+    parts = [store[store['submission_id'] == sid][columns].sort_values(columns).reset_index(drop=True)
+             for sid in ('in-memory', 'streamed')]
+    pd.testing.assert_frame_equal(parts[0], parts[1])
+
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_columnar_submissions_over_the_budget_load_whole(tmp_path, submission, fmt):
+    for role in ('gtas', 'erp'):
+        path = str(tmp_path / f'{role}.{fmt}')
+        getattr(pd.read_csv(submission[f'{role}_path'], dtype=str), f'to_{fmt}')(path)
+        submission[f'{role}_path'] = path
+    expected = run_submission(dict(submission, submission_id='expected'), str(tmp_path / 'expected'))
+    batch = run_batch([submission], str(tmp_path / 'out'), workers=1, memory_budget_mb=0.05)
+    result = batch['results'][0]
+
+    assert result['success'], result['message']
+    assert not result.get('streamed')
+    assert result['exceptions'] == expected['exceptions'] > 0
+    assert report_rows(result['exception_report_path']) == report_rows(expected['exception_report_path'])
+
+
+def test_store_rows_carry_the_edit_messages_and_the_erp_minus_gtas_amount():
+    exceptions = pd.DataFrame({
+        'STATUS': ['Mismatch', 'Missing in ERP', 'Mismatch'],
+        'TAS': ['T1', 'T2', 'T3'],
+        'USSGL_ACCOUNT': ['101000', '210000', '480100'],
+        'GTAS_BALANCE': [10.0, 4.0, 1.0],
+        'NET_BALANCE': [7.0, 0.0, 3.0],
+        'DIFFERENCE': [3.0, 4.0, -2.0],
+        'GTAS_FATAL_ERROR': ['Bad account', '', ''],
+        'GTAS_ADVISORY_NOTE': ['Check TAS', 'Check TAS', ''],
+    })
+    frame = store_frame(exceptions)
+    assert frame['message'].tolist() == ['Bad account; Check TAS', 'Check TAS', 'Mismatch']
+    assert frame['severity'].tolist() == ['Fatal', 'Advisory', None]
+    assert 'DIFFERENCE' not in frame.columns
+
+
+def test_each_submission_is_a_run_of_the_store(tmp_path, submission):
+    run_submission(submission, str(tmp_path / 'out'))
+    store = ExceptionStore(str(tmp_path / 'out' / 'exceptions'))
+    run = store.run('in-memory')
+    assert run['summary']['agency'] == '020' and run['total'] > 0
+    mismatches = store.query('in-memory', status='Mismatch', count=True)
+    assert mismatches['matched'] == sum(1 for i in range(10, 60) if i % 7 == 0)
+    assert all(record['amount'] == 1.0 for record in mismatches['exceptions'])
+
+
+def test_a_submission_without_exceptions_leaves_an_empty_store_run(tmp_path, submission):
+    (tmp_path / 'erp.csv').write_text(ERP_CSV.split('\n')[0] + '\n')
+    (tmp_path / 'gtas.csv').write_text(GTAS_CSV.split('\n')[0] + '\n')
+    result = run_submission(submission, str(tmp_path / 'out'), memory_budget_mb=0.002)
+    assert result['success'] and result['exceptions'] == 0
+    assert ExceptionStore(str(tmp_path / 'out' / 'exceptions')).run('in-memory')['total'] == 0
+    assert load_exception_store(str(tmp_path / 'out' / 'exceptions')).empty
+
+
+@pytest.mark.parametrize('submission_id', ['../escape', 'a/b', '..', 'a b', 'x' * 129])
+def test_manifest_rejects_submission_ids_that_are_not_plain_names(tmp_path, submission_id):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text(f'submission_id,agency,period,gtas_path,erp_path\n{submission_id},020,09,g.csv,e.csv\n')
+    with pytest.raises(ValueError, match='Invalid submission_id'):
+        load_manifest(str(manifest))
+
+
+def test_run_batch_rejects_unsafe_submission_ids_before_writing(tmp_path, submission):
+    with pytest.raises(ValueError, match='Invalid submission_id'):
+        run_batch([dict(submission, submission_id='../escape')], str(tmp_path / 'out'), workers=1)
+    assert not (tmp_path / 'escape').exists()
+
+
+def test_run_batch_consolidates_every_submission(tmp_path, submission):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('submission_id,agency,period,gtas_path,erp_path\n'
+                        'a,020,09,gtas.csv,erp.csv\n'
+                        ',021,10,gtas.csv,erp.csv\n')
+    batch = run_batch(str(manifest), str(tmp_path / 'out'), workers=1, memory_budget_mb=1024)
+    assert batch['success']
+    assert [result['submission_id'] for result in batch['results']] == ['a', '021_10']
+    store = load_exception_store(batch['exception_store'])
+    assert len(store) == batch['exceptions'] == 2 * batch['results'][0]['exceptions']
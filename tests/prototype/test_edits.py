@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from prototype import apply_gtas_edits_expanded_safe
+
+from tests.prototype import baseline
+
+TAS = ['X0201', 'X0201', 'A0210', 'X02', None, 'B0480', 'B0480', 'C0445', 'X0201', 'D0999']
+BALANCES = [5.0, 0.0, 3.0, -1.0, 2.0, -7.0, 7.0, 1.0, 5.0, 0.0]
+
+ACCOUNTS = {
+    'text': ['101000', '101000', '210100', '101000', '480100', '480100', '480100', '445000', '101000', 'ABC'],
+    'int': [101000, 101000, 210100, 101000, 480100, 480100, 480100, 445000, 101000, 999999],
+    'float': [101000.0, 101000.0, 210100.0, np.nan, 480100.0, 480100.0, 480100.0, 445000.0, 101000.0, 42.0],
+    'object with None': ['101000', '101000', '210100', None, '480100', '480100', '4801', '445000', '101000', '2100'],
+}
+
+
+def frame(ussgl, balance=BALANCES, tas=TAS):
+    return pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl, 'GTAS_BALANCE': balance})
+
+
+def assert_baseline(df):
+    actual = apply_gtas_edits_expanded_safe(df)
+    expected = baseline.apply_gtas_edits_expanded_safe(df)
+    for col in ('GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE'):
+        assert actual[col].tolist() == expected[col].tolist(), col
+
+
+@pytest.mark.parametrize('kind', sorted(ACCOUNTS))
+def test_edits_match_the_row_wise_baseline(kind):
+    assert_baseline(frame(ACCOUNTS[kind]))
+
+
+@pytest.mark.parametrize('kind', ['text', 'int'])
+def test_categorical_columns_match_the_baseline(kind):
+    df = frame(ACCOUNTS[kind]).astype({'TAS': 'category', 'USSGL_ACCOUNT': 'category'})
+    assert_baseline(df)
+    # A slice keeps every category of the whole column
+    assert_baseline(df.iloc[2:5])
+
+
+def test_non_numeric_balances_only_report_themselves():
+    balances = ['5', 'abc', None, np.nan, '1e3', '', '-7', 'nan', 0, 'x']
+    assert_baseline(frame(ACCOUNTS['text'], balance=pd.Series(balances, dtype=object)))
+
+
+def test_nullable_balances_match_the_baseline():
+    assert_baseline(frame(ACCOUNTS['text'], balance=pd.array([5, 0, 3, -1, None, -7, 7, 1, 5, 0], dtype='Int64')))
+
+
+def test_repeated_rows_get_the_same_messages():
+    df = frame(ACCOUNTS['text'])
+    assert_baseline(pd.concat([df, df, df.iloc[::-1]], ignore_index=True))
+
+
+def test_an_empty_frame_gets_empty_message_columns():
+    edited = apply_gtas_edits_expanded_safe(frame(ACCOUNTS['text']).iloc[:0])
+    assert edited.empty
+    assert {'GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE'} <= set(edited.columns)
@@ -0,0 +1,92 @@
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fbdi import FBDI_COLUMNS, FbdiWriter, zip_entry_name
+from prototype import build_fbdi_journal, generate_fbdi_file, write_fbdi_journal
+
+from tests.prototype import baseline
+
+
+def exceptions(with_fund=True):
+    df = pd.DataFrame({
+        'STATUS': ['Mismatch', 'Missing in GTAS', 'Missing in ERP', 'Mismatch', 'Matched'],
+        'TAS': ['AAAAA', 'BBBBB', 'CCCCC', 'XAAAA', 'DDDDD'],
+        'USSGL_ACCOUNT': ['101000', '210000', '445000', '101000', '480100'],
+        'FUND': ['F1', np.nan, 'F2', 'F3', 'F4'],
+        'GTAS_BALANCE': [10.0, 0.0, 5.0, 7.0, 1.0],
+        'NET_BALANCE': [4.0, 12.5, 0.0, 0.0, 1.0],
+        'GTAS_FATAL_ERROR': ['', '', '', 'Canceled TAS must have 0 balance for USSGL 101000', 'Non-numeric GTAS balance'],
+    })
+    df['DIFFERENCE'] = df['GTAS_BALANCE'] - df['NET_BALANCE']
+    return df if with_fund else df.drop(columns='FUND')
+
+
+@pytest.mark.parametrize('with_fund', [True, False])
+def test_journal_matches_the_row_wise_baseline(with_fund):
+    df = exceptions(with_fund)
+    pd.testing.assert_frame_equal(build_fbdi_journal(df), baseline.build_fbdi_rows(df), check_dtype=False)
+
+
+def test_categorical_segments_match_the_baseline():
+    df = exceptions().astype({'TAS': 'category', 'USSGL_ACCOUNT': 'category', 'FUND': 'category'})
+    pd.testing.assert_frame_equal(build_fbdi_journal(df), baseline.build_fbdi_rows(df), check_dtype=False)
+
+
+def test_no_corrections_give_an_empty_journal():
+    assert build_fbdi_journal(exceptions().iloc[2:3]).empty
+    assert build_fbdi_journal(exceptions().iloc[:0]).empty
+
+
+def read_journal(path):
+    if path.endswith('.gz'):
+        return pd.read_csv(gzip.open(path))
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == [zip_entry_name(path)]
+            return pd.read_csv(archive.open(archive.namelist()[0]))
+    return pd.read_csv(path)
+
+
+@pytest.mark.parametrize('name', ['fbdi.csv', 'fbdi.csv.gz', 'fbdi.zip', 'fbdi.csv.zip'])
+def test_generate_fbdi_file_infers_compression(tmp_path, name):
+    path = str(tmp_path / name)
+    generate_fbdi_file(exceptions(), path)
+    journal = read_journal(path)
+    assert list(journal.columns) == FBDI_COLUMNS
+    assert list(journal['ENTERED_DEBIT_AMOUNT']) == [0.0, 12.5, 0.0]
+    assert list(journal['SEGMENT5']) == ['AAAAA', 'BBBBB', 'XAAAA']
+
+
+def test_empty_journal_keeps_the_header(tmp_path):
+    path = str(tmp_path / 'fbdi.csv')
+    generate_fbdi_file(exceptions().iloc[:0], path)
+    assert open(path).read() == ','.join(FBDI_COLUMNS) + '\n'
+
+
+def test_writer_streams_chunks_into_a_caller_stream():
+    buffer = io.BytesIO()
+    with FbdiWriter(buffer, 'zip', entry_name='journal.csv') as writer:
+        assert write_fbdi_journal(exceptions(), writer, chunk_rows=2) == 3
+    assert not buffer.closed
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as archive:
+        journal = pd.read_csv(archive.open('journal.csv'))
+    assert len(journal) == 3
+
+
+def test_writer_stamps_its_run_date():
+    buffer = io.BytesIO()
+    journal = build_fbdi_journal(exceptions(), run_date=pd.Timestamp('2020-01-01'))
+    with FbdiWriter(buffer, run_date=pd.Timestamp('2024-09-30')) as writer:
+        writer.write(journal)
+    buffer.seek(0)
+    assert set(pd.read_csv(buffer)['JOURNAL_ENTRY_CREATION_DATE']) == {'2024-09-30'}
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        FbdiWriter(str(tmp_path / 'fbdi.csv'), 'bz2')
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental
+from incremental import ReconciliationState
+from prototype import load_data, reconcile_all
+
+COLUMNS = ['TAS', 'USSGL_ACCOUNT', 'FUND', 'GTAS_BALANCE', 'NET_BALANCE', 'DIFFERENCE', 'STATUS',
+           'GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']
+
+
+def _plain(value):
+    return value if value is None or isinstance(value, float) else str(value)
+
+
+def rows(df):
+    """Reconciled rows as sorted tuples of plain values, whatever the key dtypes."""
+    cells = df.reindex(columns=COLUMNS).astype(object)
+    cells = cells.where(cells.notna(), None)
+    return sorted(tuple(_plain(value) for value in record) for record in cells.itertuples(index=False))
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    gtas_path = tmp_path / 'gtas.csv'
+    erp_path = tmp_path / 'erp.csv'
+    gtas_path.write_text('TAS,USSGL,GTAS_Balance\n' + ''.join(
+        f'T{i:02d},{101000 + i % 3},{i}\n' for i in range(40)))
+    erp_path.write_text('TAS,USSGL_ACCOUNT,FUND,NET_BALANCE\n' + ''.join(
+        f'T{i:02d},{101000 + i % 3},F{i % 2},{i if i % 5 else i + 1}\n' for i in range(5, 45)))
+    return load_data(str(gtas_path), str(erp_path))
+
+
+def apply_reference(erp_df, delta):
+    """The ERP lines after delta, by plain pandas on text keys."""
+    erp_df = erp_df.astype({col: str for col in ['TAS', 'USSGL_ACCOUNT', 'FUND']})
+    for record in delta.to_dict('records'):
+        key = (erp_df['TAS'] == record['TAS']) & (erp_df['USSGL_ACCOUNT'] == str(record['USSGL_ACCOUNT'])) \
+            & (erp_df['FUND'] == record['FUND'])
+        erp_df = erp_df[~key]
+        if record.get('ACTION') != 'delete':
+            line = {col: str(record[col]) for col in ['TAS', 'USSGL_ACCOUNT', 'FUND']}
+            erp_df = pd.concat([erp_df, pd.DataFrame([dict(line, NET_BALANCE=record['NET_BALANCE'])])])
+    return erp_df.reset_index(drop=True)
+
+
+DELTAS = [
+    pd.DataFrame({'TAS': ['T05', 'T06', 'T50'], 'USSGL_ACCOUNT': ['101002', '101000', '101000'],
+                  'FUND': ['F1', 'F0', 'F0'], 'NET_BALANCE': [5, 99, 7], 'ACTION': ['update', 'update', 'add']}),
+    # Integer keys against the categorical text the loaders produce
+    pd.DataFrame({'TAS': ['T07', 'T08'], 'USSGL_ACCOUNT': [101001, 101002], 'FUND': ['F1', 'F0'],
+                  'NET_BALANCE': [np.nan, 8.0], 'ACTION': ['delete', '']}),
+    # Repeated lines: the last action wins
+    pd.DataFrame({'TAS': ['T09', 'T09', 'T51'], 'USSGL_ACCOUNT': ['101000', '101000', '101002'],
+                  'FUND': ['F1', 'F1', 'F1'], 'NET_BALANCE': [1, 2, 3], 'ACTION': ['upsert', 'upsert', 'upsert']}),
+]
+
+
+@pytest.mark.parametrize('overlay_rows', [65_536, 2])
+def test_deltas_match_a_full_reconciliation(inputs, monkeypatch, overlay_rows):
+    monkeypatch.setattr(incremental, 'OVERLAY_ROWS', overlay_rows)
+    gtas_df, erp_df = inputs
+    state = ReconciliationState(gtas_df, erp_df)
+    expected_erp = erp_df
+    for delta in DELTAS:
+        exceptions, fbdi = state.apply_delta(delta)
+        expected_erp = apply_reference(expected_erp, delta.drop_duplicates(['TAS', 'USSGL_ACCOUNT', 'FUND'], keep='last'))
+        assert set(exceptions['TAS'].astype(str)) <= set(delta['TAS'])
+        assert len(fbdi) == (exceptions['STATUS'].isin(['Mismatch', 'Missing in GTAS'])).sum()
+
+    expected = reconcile_all(gtas_df.astype({'TAS': str, 'USSGL_ACCOUNT': str}), expected_erp)
+    assert rows(state.reconciled) == rows(expected)
+    assert rows(state.erp) == rows(expected_erp)
+
+
+def test_delta_keys_take_the_erp_dtypes(inputs):
+    gtas_df, erp_df = inputs
+    state = ReconciliationState(gtas_df, erp_df)
+    state.apply_delta(DELTAS[1])
+    assert state.erp['USSGL_ACCOUNT'].dtype == erp_df['USSGL_ACCOUNT'].dtype
+    assert isinstance(state.reconciled['TAS'].dtype, pd.CategoricalDtype)
+    assert '101002' in set(state.erp['USSGL_ACCOUNT'])
+
+
+def test_an_untouched_key_is_not_recomputed(inputs, monkeypatch):
+    gtas_df, erp_df = inputs
+    state = ReconciliationState(gtas_df, erp_df)
+    seen = []
+    monkeypatch.setattr(incremental, 'reconcile_all', lambda g, e: seen.append((len(g), len(e))) or reconcile_all(g, e))
+    state.apply_delta(DELTAS[0])
+    assert seen == [(2, 3)]
+
+
+@pytest.mark.parametrize('action', ['update', 'delete'])
+def test_changing_a_missing_line_is_an_error(inputs, action):
+    state = ReconciliationState(*inputs)
+    delta = pd.DataFrame({'TAS': ['T99'], 'USSGL_ACCOUNT': ['101000'], 'FUND': ['F0'], 'NET_BALANCE': [1],
+                          'ACTION': [action]})
+    with pytest.raises(ValueError, match='does not match'):
+        state.apply_delta(delta)
+
+
+def test_adding_an_existing_line_is_an_error(inputs):
+    state = ReconciliationState(*inputs)
+    delta = pd.DataFrame({'TAS': ['T05'], 'USSGL_ACCOUNT': [101002.0], 'FUND': ['F1'], 'NET_BALANCE': [1],
+                          'ACTION': ['add']})
+    with pytest.raises(ValueError, match='does not match'):
+        state.apply_delta(delta)
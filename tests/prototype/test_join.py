@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from prototype import join_trial_balances, validate_and_reconcile
+
+KEYS = ['TAS', 'USSGL_ACCOUNT']
+
+
+def _cells(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def reference_join(gtas_df, erp_df):
+    merged = pd.merge(gtas_df, erp_df, on=KEYS, how='outer', indicator=True)
+    source = merged.pop('_merge')
+    merged['IN_GTAS'] = (source != 'right_only').to_numpy()
+    merged['IN_ERP'] = (source != 'left_only').to_numpy()
+    return merged
+
+
+def gtas(tas, ussgl, balance=None):
+    return pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl,
+                         'GTAS_BALANCE': list(range(len(tas))) if balance is None else balance})
+
+
+def erp(tas, ussgl, balance=None):
+    return pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl, 'FUND': ['F'] * len(tas),
+                         'NET_BALANCE': list(range(len(tas))) if balance is None else balance})
+
+
+@pytest.mark.parametrize('gtas_ussgl, erp_ussgl', [
+    (['101000', '210000', '445000'], ['210000', '101000', '480100']),
+    ([101000, 210000, 445000], [210000.0, np.nan, 480100.0]),
+    ([101000, 101000, 210000], [101000, 210000, 101000]),
+])
+def test_join_matches_pd_merge(gtas_ussgl, erp_ussgl):
+    g = gtas(['A', 'A', 'B'], gtas_ussgl)
+    e = erp(['A', 'B', 'A'], erp_ussgl)
+    joined = join_trial_balances(g, e)
+    expected = reference_join(g, e)
+    assert list(joined.columns) == list(expected.columns)
+    assert _cells(joined) == _cells(expected)
+
+
+@pytest.mark.parametrize('empty', ['gtas', 'erp', 'both'])
+def test_join_with_an_empty_side(empty):
+    g = gtas(['A', 'B'], ['101000', '210000'])
+    e = erp(['B', 'C'], ['210000', '480100'])
+    g = g.iloc[:0] if empty in ('gtas', 'both') else g
+    e = e.iloc[:0] if empty in ('erp', 'both') else e
+    assert _cells(join_trial_balances(g, e)) == _cells(reference_join(g, e))
+
+
+def test_reconcile_with_mixed_key_dtypes():
+    # int64 accounts on one side and float64 (a missing account) on the other used to raise
+    g = gtas(['A', 'B', 'C'], [101000, 210000, 445000], [10.0, 20.0, 30.0])
+    e = erp(['A', 'B', 'C'], [101000.0, 210000.0, np.nan], [10.0, 25.0, 5.0])
+    exceptions = validate_and_reconcile(g, e)
+    assert list(zip(exceptions['TAS'], exceptions['STATUS'])) == [
+        ('B', 'Mismatch'), ('C', 'Missing in ERP'), ('C', 'Missing in GTAS')]
+
+
+def test_reconcile_matches_text_against_numeric_keys():
+    g = gtas(['AAAAA', 'BBBBB'], ['101000', '210000.0'], [10.0, 20.0])
+    e = erp(['AAAAA', 'BBBBB'], [101000, 210000], [10.0, 20.0])
+    assert validate_and_reconcile(g, e).empty
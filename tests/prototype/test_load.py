@@ -0,0 +1,18 @@
+import pandas as pd
+
+from prototype import load_data
+
+
+def test_load_data_renames_gtas_columns_and_aligns_keys(tmp_path):
+    gtas_path = tmp_path / 'gtas.csv'
+    erp_path = tmp_path / 'erp.csv'
+    gtas_path.write_text('TAS,USSGL,GTAS_Balance\nAAAAA,101000,100\nBBBBB,210000,2.5\n')
+    erp_path.write_text('TAS,USSGL_ACCOUNT,FUND,NET_BALANCE,EXTRA\nAAAAA,101000,F1,100,x\nCCCCC,480100,F2,4,y\n')
+
+    gtas_df, erp_df = load_data(str(gtas_path), str(erp_path))
+    assert list(gtas_df.columns) == ['TAS', 'USSGL_ACCOUNT', 'GTAS_BALANCE']
+    assert list(erp_df.columns) == ['TAS', 'USSGL_ACCOUNT', 'FUND', 'NET_BALANCE']
+    assert gtas_df['GTAS_BALANCE'].dtype == 'float64'
+    assert erp_df['NET_BALANCE'].dtype == 'int64'
+    assert gtas_df['USSGL_ACCOUNT'].dtype == erp_df['USSGL_ACCOUNT'].dtype
+    assert isinstance(gtas_df['TAS'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from keys import KEY_COLUMNS
+from parallel import split_by_key, validate_and_reconcile_parallel
+from prototype import validate_and_reconcile
+
+COLUMNS = ['TAS', 'USSGL_ACCOUNT', 'STATUS', 'GTAS_BALANCE', 'NET_BALANCE', 'DIFFERENCE',
+           'GTAS_FATAL_ERROR', 'GTAS_ADVISORY_NOTE']
+
+
+def rows(df):
+    cells = df[COLUMNS].astype(object)
+    return sorted(tuple(str(value) for value in record) for record in cells.where(cells.notna(), None).itertuples(False))
+
+
+def inputs(gtas_ussgl, erp_ussgl):
+    rng = np.random.default_rng(11)
+    tas = np.repeat([f'X{i:04d}' if i % 3 == 0 else f'A{i:04d}' for i in range(30)], 4)
+    gtas_df = pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': np.resize(gtas_ussgl, 120),
+                            'GTAS_BALANCE': rng.integers(-2, 3, 120) * 50.0})
+    erp_df = pd.DataFrame({'TAS': tas[::-1], 'USSGL_ACCOUNT': np.resize(erp_ussgl, 120), 'FUND': 'F1',
+                           'NET_BALANCE': rng.integers(-2, 3, 120) * 50.0})
+    return gtas_df, erp_df
+
+
+@pytest.mark.parametrize('gtas_ussgl, erp_ussgl', [
+    (['101000', '210000', '445000', '480100'], ['101000', '210000', '445000', '480100']),
+    ([101000, 210000, 445000, 480100], [101000.0, 210000.0, 445000.0, np.nan]),
+    ([101000, 101000, 210000, 210000], ['101000', '101000', '210000', '210000']),  # Repeated keys, mixed types
+])
+def test_sharded_reconciliation_matches_serial(gtas_ussgl, erp_ussgl):
+    gtas_df, erp_df = inputs(gtas_ussgl, erp_ussgl)
+    expected = validate_and_reconcile(gtas_df, erp_df)
+    actual = validate_and_reconcile_parallel(gtas_df, erp_df, workers=1, shards=7)
+    assert len(expected) > 0
+    assert rows(actual) == rows(expected)
+    # Ordered by key, whatever the shard order
+    keys = actual[KEY_COLUMNS].astype(str)
+    assert keys.equals(keys.sort_values(KEY_COLUMNS, kind='mergesort'))
+
+
+def test_each_key_lands_in_one_shard_on_both_sides():
+    gtas_df, erp_df = inputs([101000, 210000, 445000, 480100], ['101000', '210000', '445000', '480100'])
+
+    def shard_of(df):
+        shards = {}
+        for shard, part in enumerate(split_by_key(df, 5)):
+            for key in zip(part['TAS'], part['USSGL_ACCOUNT'].astype(str)):
+                shards.setdefault(key, set()).add(shard)
+        return shards
+
+    gtas_shards, erp_shards = shard_of(gtas_df), shard_of(erp_df)
+    assert all(len(shards) == 1 for shards in list(gtas_shards.values()) + list(erp_shards.values()))
+    shared = gtas_shards.keys() & erp_shards.keys()
+    assert shared and all(gtas_shards[key] == erp_shards[key] for key in shared)
+
+
+def test_a_process_pool_gives_the_serial_result():
+    gtas_df, erp_df = inputs(['101000', '210000', '445000', '480100'], ['101000', '210000', '445000', '480100'])
+    pd.testing.assert_frame_equal(validate_and_reconcile_parallel(gtas_df, erp_df, workers=2, shards=4),
+                                  validate_and_reconcile_parallel(gtas_df, erp_df, workers=1, shards=4))
+
+
+@pytest.mark.parametrize('empty', ['gtas', 'erp', 'both'])
+def test_empty_sides_match_serial(empty):
+    gtas_df, erp_df = inputs(['101000', '210000', '445000', '480100'], ['101000', '210000', '445000', '480100'])
+    gtas_df = gtas_df.iloc[:0] if empty in ('gtas', 'both') else gtas_df
+    erp_df = erp_df.iloc[:0] if empty in ('erp', 'both') else erp_df
+    actual = validate_and_reconcile_parallel(gtas_df, erp_df, workers=1, shards=3)
+    assert rows(actual) == rows(validate_and_reconcile(gtas_df, erp_df))
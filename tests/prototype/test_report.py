@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from prototype import REPORT_COLUMNS, generate_exception_report
+
+
+def exceptions():
+    return pd.DataFrame({
+        'STATUS': ['Mismatch', 'Missing in ERP', 'Mismatch', 'Missing in GTAS', 'Mismatch', 'Mismatch'],
+        'TAS': pd.Categorical(['B0210', 'A0101', 'A0101', None, 'A0101', 'C0480']),
+        'USSGL_ACCOUNT': pd.Categorical([210000, 101000, 480100, 445000, 101000, np.nan]),
+        'FUND': ['F1'] * 6,
+        'GTAS_BALANCE': [1.5, 2.0, 0.0, np.nan, 4.0, 6.0],
+        'NET_BALANCE': [0.0, 0.0, 1.0, 3.0, 4.5, 7.0],
+        'DIFFERENCE': [1.5, 2.0, -1.0, -3.0, -0.5, -1.0],
+        'GTAS_FATAL_ERROR': ['', '', 'Bad {account}', '', '', ''],
+        'GTAS_ADVISORY_NOTE': ['210000 series should net to zero', '', '', '', '', ''],
+    })
+
+
+def reference_rows(df, tmp_path):
+    """The report as pandas' own Excel writer lays it out, sorted as the report sorts."""
+    path = str(tmp_path / 'reference.xlsx')
+    df[REPORT_COLUMNS].sort_values(['STATUS', 'TAS', 'USSGL_ACCOUNT'], kind='mergesort').to_excel(
+        path, sheet_name='Discrepancies', index=False)
+    return workbook_rows(path)['Discrepancies']
+
+
+def workbook_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+
+
+def test_report_matches_the_pandas_writer(tmp_path):
+    path = generate_exception_report(exceptions(), str(tmp_path / 'report.xlsx'))
+    assert workbook_rows(path) == {'Discrepancies': reference_rows(exceptions(), tmp_path)}
+
+
+def test_columns_get_widths_from_their_contents(tmp_path):
+    path = generate_exception_report(exceptions(), str(tmp_path / 'report.xlsx'))
+    dimensions = load_workbook(path).active.column_dimensions
+    assert dimensions['A'].width == len('Missing in GTAS') + 2
+    assert dimensions['H'].width == len('210000 series should net to zero') + 2
+
+
+def test_sheets_split_at_sheet_rows_and_keep_the_order(tmp_path):
+    path = generate_exception_report(exceptions(), str(tmp_path / 'report.xlsx'), sheet_rows=4)
+    sheets = workbook_rows(path)
+    assert list(sheets) == ['Discrepancies', 'Discrepancies (2)']
+    header, *expected = reference_rows(exceptions(), tmp_path)
+    assert all(rows[0] == header for rows in sheets.values())
+    assert [row for rows in sheets.values() for row in rows[1:]] == expected
+
+
+@pytest.mark.parametrize('fallback', ['csv', 'parquet'])
+def test_large_reports_fall_back_to_a_flat_file(tmp_path, fallback):
+    path = generate_exception_report(exceptions(), str(tmp_path / 'report.xlsx'), max_excel_rows=3,
+                                     report_fallback=fallback)
+    assert path == str(tmp_path / f'report.{fallback}')
+    report = pd.read_csv(path) if fallback == 'csv' else pd.read_parquet(path)
+    assert list(report.columns) == REPORT_COLUMNS
+    assert report['DIFFERENCE'].tolist() == [row[5] for row in reference_rows(exceptions(), tmp_path)[1:]]
+
+
+def test_missing_report_columns_are_blank(tmp_path):
+    df = exceptions().drop(columns=['GTAS_ADVISORY_NOTE'])
+    path = generate_exception_report(df, str(tmp_path / 'report.xlsx'))
+    assert {row[-1] for row in workbook_rows(path)['Discrepancies'][1:]} == {None}
+
+
+def test_no_exceptions_leave_an_empty_sheet(tmp_path):
+    path = generate_exception_report(exceptions().iloc[:0], str(tmp_path / 'report.xlsx'))
+    assert workbook_rows(path) == {'Discrepancies': []}
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from prototype import TOLERANCE, classify_status, reconcile_all
+
+from tests.prototype import baseline
+
+
+def reference_status(gtas_df, erp_df):
+    """Row by row over pd.merge, with presence from the merge indicator."""
+    merged = pd.merge(gtas_df, erp_df, on=['TAS', 'USSGL_ACCOUNT'], how='outer', indicator=True)
+    statuses = []
+    for _, row in merged.iterrows():
+        difference = (0 if pd.isna(row['GTAS_BALANCE']) else row['GTAS_BALANCE']) \
+            - (0 if pd.isna(row['NET_BALANCE']) else row['NET_BALANCE'])
+        if row['_merge'] == 'right_only':
+            statuses.append('Missing in GTAS')
+        elif row['_merge'] == 'left_only':
+            statuses.append('Missing in ERP')
+        elif abs(difference) > TOLERANCE:
+            statuses.append('Mismatch')
+        else:
+            statuses.append('Matched')
+    return statuses
+
+
+def gtas(tas, ussgl, balance):
+    return pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl, 'GTAS_BALANCE': balance})
+
+
+def erp(tas, ussgl, balance):
+    return pd.DataFrame({'TAS': tas, 'USSGL_ACCOUNT': ussgl, 'FUND': ['F1'] * len(tas), 'NET_BALANCE': balance})
+
+
+def test_presence_comes_from_the_join_not_from_zero_balances():
+    g = gtas(['A', 'B', 'C'], ['101000', '101000', '101000'], [0.0, 5.0, 0.0])
+    e = erp(['A', 'C', 'D'], ['101000', '101000', '101000'], [0.0, 3.0, 0.0])
+    reconciled = reconcile_all(g, e)
+    statuses = dict(zip(reconciled['TAS'].astype(str), reconciled['STATUS']))
+    assert statuses == {'A': 'Matched', 'B': 'Missing in ERP', 'C': 'Mismatch', 'D': 'Missing in GTAS'}
+    # The old balance-based rule could not see D (absent from GTAS with a zero ERP balance)
+    old = baseline.validate_and_reconcile(g, e)
+    assert 'D' not in set(old['TAS'])
+
+
+@pytest.mark.parametrize('difference, status', [
+    (TOLERANCE, 'Matched'), (-TOLERANCE, 'Matched'), (TOLERANCE * 1.5, 'Mismatch'), (np.nan, 'Matched'),
+])
+def test_the_tolerance_is_inclusive(difference, status):
+    assert classify_status([True], [True], [difference]).tolist() == [status]
+
+
+@pytest.mark.parametrize('gtas_ussgl, erp_ussgl', [
+    (['101000', '210000', '101000'], ['101000', '101000', '480100']),
+    ([101000, 210000, 101000], [101000.0, 101000.0, np.nan]),
+])
+def test_statuses_match_the_reference_with_repeated_and_mixed_keys(gtas_ussgl, erp_ussgl):
+    g = gtas(['A', 'A', 'A'], gtas_ussgl, [1.0, 2.0, 3.0])
+    e = erp(['A', 'A', 'B'], erp_ussgl, [1.0, 2.5, 0.0])
+    assert reconcile_all(g, e)['STATUS'].tolist() == reference_status(g, e)
+
+
+@pytest.mark.parametrize('empty', ['gtas', 'erp', 'both'])
+def test_an_empty_side_makes_every_key_missing_on_it(empty):
+    g = gtas(['A', 'B'], ['101000', '210000'], [1.0, 0.0])
+    e = erp(['A', 'C'], ['101000', '480100'], [0.0, 2.0])
+    g = g.iloc[:0] if empty in ('gtas', 'both') else g
+    e = e.iloc[:0] if empty in ('erp', 'both') else e
+    assert reconcile_all(g, e)['STATUS'].tolist() == reference_status(g, e)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from prototype import (generate_exception_report, load_data, run_validation, validate_and_reconcile,
+                       write_exception_report)
+from streaming import ReportRuns, reconcile_streaming, run_streaming_validation
+
+# A tiny budget splits even these inputs into many buckets
+TINY_BUDGET_MB = 0.002
+
+
+def write_inputs(tmp_path, gtas_rows, erp_rows):
+    gtas_path = tmp_path / 'gtas.csv'
+    erp_path = tmp_path / 'erp.csv'
+    pd.DataFrame(gtas_rows, columns=['TAS', 'USSGL', 'GTAS_Balance']).to_csv(gtas_path, index=False)
+    pd.DataFrame(erp_rows, columns=['TAS', 'USSGL_ACCOUNT', 'FUND', 'NET_BALANCE']).to_csv(erp_path, index=False)
+    return str(gtas_path), str(erp_path)
+
+
+def sample_inputs(tmp_path):
+    rng = np.random.default_rng(3)
+    keys = sorted({(f'T{rng.integers(60):03d}', str(rng.choice([101000, 211000, 480100, 999000]))) for _ in range(300)})
+    balances = np.round(rng.uniform(-500, 500, len(keys)), 2)
+    erp_rows = [(tas, ussgl, 'F1', balance) for (tas, ussgl), balance in zip(keys[20:], balances[20:])]
+    gtas_rows = [(tas, ussgl, balance if i % 5 else balance + 3.25)
+                 for i, ((tas, ussgl), balance) in enumerate(zip(keys[:-20], balances[:-20]))]
+    return write_inputs(tmp_path, gtas_rows, erp_rows)
+
+
+def sheet_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+
+
+def test_streaming_report_matches_the_in_memory_report(tmp_path):
+    gtas_path, erp_path = sample_inputs(tmp_path)
+    expected_path = str(tmp_path / 'expected.xlsx')
+    generate_exception_report(validate_and_reconcile(*load_data(gtas_path, erp_path)), expected_path)
+
+    summary = run_streaming_validation(gtas_path, erp_path, str(tmp_path / 'streamed.xlsx'),
+                                       str(tmp_path / 'fbdi.csv'), memory_budget_mb=TINY_BUDGET_MB)
+    assert summary['partitions'] > 1
+    assert sheet_rows(summary['exception_report_path']) == sheet_rows(expected_path)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_a_budget_loads_columnar_inputs_whole(tmp_path, fmt):
+    paths = []
+    for path in sample_inputs(tmp_path):
+        columnar = path.replace('.csv', f'.{fmt}')
+        getattr(pd.read_csv(path, dtype=str), f'to_{fmt}')(columnar)
+        paths.append(columnar)
+    expected = run_validation(*paths, str(tmp_path / 'expected.xlsx'), str(tmp_path / 'expected.csv'))
+    result = run_validation(*paths, str(tmp_path / 'budget.xlsx'), str(tmp_path / 'fbdi.csv'),
+                            memory_budget_mb=TINY_BUDGET_MB)
+    assert result['success'], result['message']
+    assert 'summary' not in result
+    assert sheet_rows(result['exception_report_path']) == sheet_rows(expected['exception_report_path'])
+
+
+def test_report_runs_continue_on_further_sheets(tmp_path):
+    gtas_path, erp_path = sample_inputs(tmp_path)
+    runs = ReportRuns(str(tmp_path))
+    reconcile_streaming(gtas_path, erp_path, None, str(tmp_path / 'fbdi.csv'), memory_budget_mb=TINY_BUDGET_MB,
+                        on_exceptions=runs.add)
+    assert len(runs.paths) > 1
+
+    path = write_exception_report(runs.rows(), runs.n_rows, runs.widths, str(tmp_path / 'report.xlsx'),
+                                  sheet_rows=25)
+    sheets = sheet_rows(path)
+    assert list(sheets)[:2] == ['Discrepancies', 'Discrepancies (2)']
+    rows = [row for sheet in sheets.values() for row in sheet[1:]]
+    assert len(rows) == runs.n_rows
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+
+def test_report_runs_fall_back_to_csv_in_report_order(tmp_path):
+    gtas_path, erp_path = sample_inputs(tmp_path)
+    runs = ReportRuns(str(tmp_path))
+    reconcile_streaming(gtas_path, erp_path, None, str(tmp_path / 'fbdi.csv'), memory_budget_mb=TINY_BUDGET_MB,
+                        on_exceptions=runs.add)
+
+    path = write_exception_report(runs.rows(), runs.n_rows, runs.widths, str(tmp_path / 'report.xlsx'),
+                                  max_excel_rows=10)
+    assert path.endswith('report.csv')
+    report = pd.read_csv(path, dtype={'TAS': str, 'USSGL_ACCOUNT': str})
+    assert len(report) == runs.n_rows
+    assert report.equals(report.sort_values(['STATUS', 'TAS', 'USSGL_ACCOUNT'], kind='mergesort'))
+
+
+def test_empty_inputs_write_an_empty_report(tmp_path):
+    gtas_path, erp_path = write_inputs(tmp_path, [], [])
+    summary = run_streaming_validation(gtas_path, erp_path, str(tmp_path / 'report.xlsx'),
+                                       str(tmp_path / 'fbdi.csv'))
+    assert summary['exceptions'] == 0
+    assert sheet_rows(summary['exception_report_path']) == {'Discrepancies': []}
@@ -0,0 +1,24 @@
+"""Modules both deployables ship must stay byte-identical."""
+import os
+
+import pytest
+
+from tests.conftest import DEPLOYABLES
+
+SHARED_MODULES = ['instrumentation.py', 'fbdi.py', 'keys.py', 'loaders.py', 'partitions.py', 'exception_store.py',
+                  'formats.py']
+
+
+@pytest.mark.parametrize('name', SHARED_MODULES)
+def test_shared_module_copies_are_identical(name):
+    copies = []
+    for directory in DEPLOYABLES.values():
+        with open(os.path.join(directory, name), 'rb') as f:
+            copies.append(f.read())
+    assert copies[0] == copies[1], f'{name} differs between the deployables'
+
+
+@pytest.mark.parametrize('name', SHARED_MODULES)
+def test_shared_module_is_marked_shared(name):
+    with open(os.path.join(DEPLOYABLES['gcf'], name)) as f:
+        assert 'keep the two copies identical' in f.read(500)